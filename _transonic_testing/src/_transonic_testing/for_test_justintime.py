@@ -36,6 +36,27 @@ def func_identity(a):
     return a
 
 
+@jit(incremental=True)
+def func_incremental(a):
+    return 2 * a
+
+
+@jit(hot_calls=3)
+def func_hot(a):
+    return a + 1
+
+
+@jit
+def func_mem_layout(a):
+    return a.sum() + a[0, 1]
+
+
+@jit
+def func_fail(a):
+    # not supported by Pythran
+    return type(a).__name__
+
+
 @jit
 def func_dict(d: "str: float dict"):
     return d.popitem()
@@ -0,0 +1,203 @@
+"""Measure the per-call overhead of Transonic's layers
+
+The kernels (defined in kernels.py) are tiny so that the time of a call is
+dominated by what Transonic adds. With the Python backend, the extensions are
+copies of the Python functions, so the difference with the plain Python
+functions (the baseline) is exactly the overhead of Transonic::
+
+  make python
+  TRANSONIC_BACKEND="python" python bench.py -o results_new.json
+  python bench.py --compare results_old.json results_new.json
+
+"""
+
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+import transonic
+from transonic import typeof, wait_for_all_extensions
+from transonic.aheadoftime import CheckCompiling
+from transonic.config import backend_default
+from transonic.util import timeit
+
+import kernels
+from kernels import (
+    add,
+    add_boost,
+    add_jit,
+    add_block,
+    add_no_block,
+    Adder,
+    AdderBoost,
+)
+
+objects_typeof = {
+    "int": 1,
+    "float": 1.0,
+    "complex": 1j,
+    "str": "foo",
+    "array1d": np.ones(4),
+    "array3d": np.ones((2, 2, 2), dtype=np.int32),
+    "list_int_10": list(range(10)),
+    "list_int_1000": list(range(1000)),
+    "dict_str_float": {str(i): float(i) for i in range(10)},
+    "tuple_int_float": (1, 1.0),
+}
+
+
+def make_check_compiling():
+    """CheckCompiling while the extension is being compiled and once
+    the function has been replaced"""
+    process = SimpleNamespace(is_alive=lambda raise_if_error=False: True)
+    ts_compiling = SimpleNamespace(is_compiling=True, process=process)
+    ts_compiled = SimpleNamespace(is_compiling=False, module_backend=kernels)
+    check_compiling_replaced = CheckCompiling(ts_compiled, add)
+    check_compiling_replaced(1, 2)
+    assert check_compiling_replaced.has_been_replaced
+    return CheckCompiling(ts_compiling, add), check_compiling_replaced
+
+
+def make_cases():
+    """Return a dict {name: (statement, baseline statement)}"""
+    check_compiling, check_compiling_replaced = make_check_compiling()
+    namespace = dict(
+        add=add,
+        add_boost=add_boost,
+        add_jit=add_jit,
+        add_block=add_block,
+        add_no_block=add_no_block,
+        adder=Adder(),
+        adder_boost=AdderBoost(),
+        check_compiling=check_compiling,
+        check_compiling_replaced=check_compiling_replaced,
+        array=np.ones(4),
+        typeof=typeof,
+    )
+
+    cases = {
+        "jit_int": ("add_jit(1, 2)", "add(1, 2)"),
+        "jit_array": ("add_jit(array, array)", "add(array, array)"),
+        "jit_kwargs": ("add_jit(1, b=2)", "add(1, b=2)"),
+        "boost_function": ("add_boost(1, 2)", "add(1, 2)"),
+        "check_compiling": ("check_compiling(1, 2)", "add(1, 2)"),
+        "check_compiling_replaced": (
+            "check_compiling_replaced(1, 2)",
+            "add(1, 2)",
+        ),
+        "use_block": ("add_block(1, 2)", "add_no_block(1, 2)"),
+        "boost_method": ("adder_boost.add(2)", "adder.add(2)"),
+    }
+    for name, obj in objects_typeof.items():
+        namespace["obj_" + name] = obj
+        cases["typeof_" + name] = (f"typeof(obj_{name})", None)
+    return cases, namespace
+
+
+def warmup():
+    """Call the jitted function for all cases (and wait for the extensions)"""
+    for _ in range(2):
+        add_jit(1, 2)
+        add_jit(np.ones(4), np.ones(4))
+        add_jit(1, b=2)
+        wait_for_all_extensions()
+
+
+def run_benchmarks(total_duration=0.5):
+    warmup()
+    cases, namespace = make_cases()
+    results = {}
+    for name, (stmt, stmt_baseline) in cases.items():
+        time = timeit(stmt, globals=namespace, total_duration=total_duration)
+        result = {"time": time}
+        if stmt_baseline is not None:
+            time_baseline = timeit(
+                stmt_baseline, globals=namespace, total_duration=total_duration
+            )
+            result["time_baseline"] = time_baseline
+            result["overhead"] = time - time_baseline
+        else:
+            result["overhead"] = time
+        results[name] = result
+        print(f"{name:30s}: overhead = {1e9 * result['overhead']:8.1f} ns")
+
+    return {
+        "transonic_version": transonic.__version__,
+        "python_version": platform.python_version(),
+        "numpy_version": np.__version__,
+        "backend": backend_default,
+        "is_transpiled": kernels.ts.is_transpiled,
+        "machine": platform.machine(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+
+
+def compare(path_old, path_new):
+    with open(path_old) as file:
+        old = json.load(file)
+    with open(path_new) as file:
+        new = json.load(file)
+
+    print(
+        f"Overheads (ns): {old['transonic_version']} ({path_old}) -> "
+        f"{new['transonic_version']} ({path_new})"
+    )
+    for name, result_new in new["results"].items():
+        overhead_new = 1e9 * result_new["overhead"]
+        try:
+            overhead_old = 1e9 * old["results"][name]["overhead"]
+        except KeyError:
+            print(f"{name:30s}: {'':8s} -> {overhead_new:8.1f}")
+            continue
+        print(f"{name:30s}: {overhead_old:8.1f} -> {overhead_new:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "-o", "--output", help="path of the JSON file for the results"
+    )
+    parser.add_argument(
+        "-t",
+        "--total-duration",
+        help="approximate duration (in s) of the measurement of one statement",
+        type=float,
+        default=0.5,
+    )
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="compare two JSON result files",
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if not kernels.ts.is_transpiled:
+        print(
+            "Warning: kernels.py has not been transpiled for the backend "
+            f"{backend_default} (run `make {backend_default}`)",
+            file=sys.stderr,
+        )
+
+    data = run_benchmarks(args.total_duration)
+
+    path_output = args.output
+    if path_output is None:
+        path_output = f"results_{backend_default}_{transonic.__version__}.json"
+    with open(path_output, "w") as file:
+        json.dump(data, file, indent=2)
+    print(f"Results saved in {path_output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Tiny kernels used to measure the overhead of Transonic's layers"""
+
+from transonic import Transonic, boost, jit
+
+ts = Transonic()
+
+
+def add(a, b):
+    return a + b
+
+
+@boost
+def add_boost(a: int, b: int):
+    return a + b
+
+
+@jit
+def add_jit(a, b):
+    return a + b
+
+
+def add_block(a, b):
+    if ts.is_transpiled:
+        result = ts.use_block("add")
+    else:
+        # transonic block (int a, b)
+        result = a + b
+    return result
+
+
+def add_no_block(a, b):
+    result = a + b
+    return result
+
+
+class Adder:
+    def __init__(self):
+        self.attr = 1
+
+    def add(self, b):
+        return self.attr + b
+
+
+@boost
+class AdderBoost:
+    attr: int
+
+    def __init__(self):
+        self.attr = 1
+
+    @boost
+    def add(self, b: int):
+        return self.attr + b
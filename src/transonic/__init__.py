@@ -1,26 +1,78 @@
-from transonic._version import __version__
-
-from transonic.aheadoftime import Transonic, boost
-from transonic.backends import set_backend_for_this_module
-from transonic.config import set_backend
-from transonic.compiler import wait_for_all_extensions
-from transonic.justintime import jit, set_compile_jit
-from transonic.util import set_compile_at_import
-from transonic.typing import (
-    Array,
-    NDim,
-    Type,
-    Union,
-    List,
-    Tuple,
-    Dict,
-    Set,
-    str2type,
-    typeof,
-    Optional,
-    const,
-)
+from importlib import import_module as _import_module
 
+# not imported from typing (slow to import), understood by type checkers
+TYPE_CHECKING = False
+
+# The objects of the API are imported from the submodules at first access
+# (PEP 562) so that `import transonic` is fast. For example, the analyses, the
+# code generation, the formatting and the compilation machinery are only
+# imported when they are needed (see tests/test_import.py).
+_modules_objects = {
+    "__version__": "_version",
+    "Transonic": "aheadoftime",
+    "boost": "aheadoftime",
+    "set_backend_for_this_module": "backends",
+    "set_backend": "config",
+    "wait_for_all_extensions": "compiler",
+    "jit": "justintime",
+    "set_compile_jit": "justintime",
+    "set_compile_at_import": "util",
+    "Array": "typing",
+    "NDim": "typing",
+    "Type": "typing",
+    "Union": "typing",
+    "List": "typing",
+    "Tuple": "typing",
+    "Dict": "typing",
+    "Set": "typing",
+    "str2type": "typing",
+    "typeof": "typing",
+    "Optional": "typing",
+    "const": "typing",
+}
+
+
+def __getattr__(name):
+    try:
+        module_name = _modules_objects[name]
+    except KeyError:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r}"
+        ) from None
+    value = getattr(_import_module(f"{__name__}.{module_name}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_modules_objects))
+
+
+if TYPE_CHECKING:
+    from transonic._version import __version__
+
+    from transonic.aheadoftime import Transonic, boost
+    from transonic.backends import set_backend_for_this_module
+    from transonic.config import set_backend
+    from transonic.compiler import wait_for_all_extensions
+    from transonic.justintime import jit, set_compile_jit
+    from transonic.util import set_compile_at_import
+    from transonic.typing import (
+        Array,
+        NDim,
+        Type,
+        Union,
+        List,
+        Tuple,
+        Dict,
+        Set,
+        str2type,
+        typeof,
+        Optional,
+        const,
+    )
+
+del TYPE_CHECKING
 
 __all__ = [
     "__version__",
@@ -23,13 +23,13 @@ Internal API
 
 import inspect
 import time
-import subprocess
 import os
 import functools
 import sys
 from importlib import import_module
 
 from transonic.backends import backends, get_backend_name_module
+from transonic.compiler import scheduler
 from transonic.config import has_to_replace, backend_default
 from transonic.log import logger
 from transonic import mpi
@@ -102,6 +102,7 @@ def boost(
     cdivision=False,
     nonecheck=True,
     nogil=False,
+    priority: float = None,
 ):
     """Decorator to declare that an object can be accelerated
 
@@ -110,6 +111,11 @@ def boost(
 
     obj: a function, a method or a class
 
+    priority: float (optional)
+
+      If the extension of the module is waiting to be compiled, its priority
+      is raised to this value (larger is compiled first).
+
     """
     if backend is not None and not isinstance(backend, str):
         raise TypeError
@@ -123,6 +129,7 @@ def boost(
         wraparound=wraparound,
         cdivision=cdivision,
         nonecheck=nonecheck,
+        priority=priority,
     )
     if callable(obj) or isinstance(obj, type):
         return decor(obj)
@@ -131,12 +138,19 @@ def boost(
 
 
 class CheckCompiling:
-    """Check if the module is being compiled and replace the module and the function"""
+    """Check if the module is being compiled and replace the module and the function
+
+    When the compilation is done, the name of the function in the namespace
+    of the user module (:code:`namespace`) is rebound to the native function,
+    so that the next calls do not go through this wrapper.
 
-    def __init__(self, ts, func):
+    """
+
+    def __init__(self, ts, func, namespace=None):
         self.has_been_replaced = False
         self.ts = ts
         self.func = func
+        self.namespace = namespace
 
     def __call__(self, *args, **kwargs):
         if self.has_been_replaced:
@@ -144,20 +158,25 @@ class CheckCompiling:
 
         ts = self.ts
         if ts.is_compiling and not ts.process.is_alive(raise_if_error=True):
-            ts.is_compiling = False
-            time.sleep(0.1)
-            ts.module_backend = import_from_path(
-                ts.path_extension, ts.module_backend.__name__
-            )
-            assert ts.backend.check_if_compiled(self.ts.module_backend)
-            ts.is_compiled = True
+            ts._on_compilation_done()
 
-        if not ts.is_compiling:
-            self.func = getattr(ts.module_backend, self.func.__name__)
-            self.has_been_replaced = True
+        if not ts.is_compiling and not self.has_been_replaced:
+            self.replace()
 
         return self.func(*args, **kwargs)
 
+    def replace(self):
+        """Use the native function (and rebind its name in the user module)"""
+        name = self.func.__name__
+        try:
+            self.func = getattr(self.ts.module_backend, name)
+        except AttributeError:
+            # not in the extension (see Transonic.transonic_def)
+            pass
+        self.has_been_replaced = True
+        if self.namespace is not None and self.namespace.get(name) is self:
+            self.namespace[name] = self.func
+
 
 class Transonic:
     """
@@ -215,6 +234,9 @@ class Transonic:
             return
 
         self.is_compiling = False
+        # objects to be replaced at the end of the compilation
+        self._functions_compiling = []
+        self._methods_compiling = []
 
         if not use_transonified or not has_to_replace:
             self.is_transpiled = False
@@ -237,6 +259,14 @@ class Transonic:
             path_mod.parent / f"__{backend.name}__" / (module_short_name + suffix)
         )
 
+        def take_snapshot():
+            # state of the files (only one MPI collective operation)
+            return mpi.FileSystemSnapshot(
+                directories=[path_backend.parent], paths=[path_mod]
+            )
+
+        snapshot = take_snapshot()
+
         # for Meson, we try to import module_backend_name
         try:
             _module_backend = import_module(module_backend_name)
@@ -250,35 +280,33 @@ class Transonic:
             else:
                 path_ext = None
 
-        if has_to_compile_at_import() and path_mod.exists() and path_ext is None:
-            if mpi.has_to_build(path_backend, path_mod):
-                if path_backend.exists():
+        if (
+            has_to_compile_at_import()
+            and snapshot.exists(path_mod)
+            and path_ext is None
+        ):
+            if snapshot.has_to_build(path_backend, path_mod):
+                if snapshot.exists(path_backend):
                     time_backend = mpi.modification_date(path_backend)
                 else:
                     time_backend = 0
 
-                returncode = None
+                # the backend file is produced in this process (no new
+                # interpreter, and the analysis modules are imported once)
+                error = None
                 if mpi.rank == 0:
                     print(f"Running transonic on file {path_mod}... ", end="")
-                    # better to do this in another process because the file is already run...
-                    os.environ["TRANSONIC_NO_MPI"] = "1"
-                    returncode = subprocess.call(
-                        [
-                            sys.executable,
-                            "-m",
-                            "transonic.run",
-                            "-nc",
-                            str(path_mod),
-                        ]
-                    )
-                    del os.environ["TRANSONIC_NO_MPI"]
-                returncode = mpi.bcast(returncode)
-
-                if returncode != 0:
+                    try:
+                        backend.make_backend_file(mpi.PathSeq(path_mod))
+                    except Exception as exc:
+                        error = exc
+                failed = mpi.bcast(error is not None)
+
+                if failed:
                     raise RuntimeError(
                         f"transonic does not manage to produce the {backend.name_capitalized} "
                         f"file for {path_mod}"
-                    )
+                    ) from error
 
                 if mpi.rank == 0:
                     print("Done!")
@@ -292,11 +320,13 @@ class Transonic:
                 if time_backend_after == time_backend and mpi.rank == 0:
                     if not has_to_build(path_ext, path_backend):
                         path_backend.touch()
-                        if path_ext.exists():
+                        if mpi.PathSeq(path_ext).exists():
                             path_ext.touch()
                     else:
                         path_backend.touch()
 
+                snapshot = take_snapshot()
+
         path_ext = path_ext or path_backend.with_name(
             backend.name_ext_from_path_backend(path_backend)
         )
@@ -304,8 +334,8 @@ class Transonic:
         self.path_extension = path_ext
         if (
             has_to_compile_at_import()
-            and path_mod.exists()
-            and not self.path_extension.exists()
+            and snapshot.exists(path_mod)
+            and not snapshot.exists(self.path_extension)
         ):
             if mpi.rank == 0:
                 print(
@@ -315,15 +345,16 @@ class Transonic:
                 path_backend, name_ext_file=self.path_extension.name
             )
             self.is_compiled = not self.is_compiling
+            snapshot = take_snapshot()
 
         self.is_transpiled = True
 
-        if not path_ext.exists() and not self.is_compiling:
+        if not snapshot.exists(path_ext) and not self.is_compiling:
             path_ext_alt = path_backend.with_suffix(backend.suffix_extension)
-            if path_ext_alt.exists():
+            if snapshot.exists(path_ext_alt):
                 self.path_extension = path_ext = path_ext_alt
 
-        self.reload_module_backend(module_backend_name)
+        self.reload_module_backend(module_backend_name, snapshot)
 
         if not self.is_transpiled:
             logger.warning(
@@ -347,14 +378,21 @@ class Transonic:
 
         modules[module_name] = self
 
-    def reload_module_backend(self, module_backend_name=None):
+    def reload_module_backend(self, module_backend_name=None, snapshot=None):
         if module_backend_name is None:
             module_backend_name = self.module_backend.__name__
-        if self.path_extension.exists() and not self.is_compiling:
+        if snapshot is not None:
+            exists = snapshot.exists
+        else:
+
+            def exists(path):
+                return path.exists()
+
+        if exists(self.path_extension) and not self.is_compiling:
             self.module_backend = import_from_path(
                 self.path_extension, module_backend_name
             )
-        elif self.path_backend.exists():
+        elif exists(self.path_backend):
             self.module_backend = import_from_path(
                 self.path_backend, module_backend_name
             )
@@ -391,10 +429,33 @@ class Transonic:
             func_tmp = func
 
         if self.is_compiling:
-            return functools.wraps(func)(CheckCompiling(self, func_tmp))
+            check_compiling = functools.wraps(func)(
+                CheckCompiling(self, func_tmp, func.__globals__)
+            )
+            self._functions_compiling.append(check_compiling)
+            return check_compiling
 
         return func_tmp
 
+    def _on_compilation_done(self):
+        """Import the extension and rebind the boosted functions and methods"""
+        self.is_compiling = False
+        time.sleep(0.1)
+        self.module_backend = import_from_path(
+            self.path_extension, self.module_backend.__name__
+        )
+        assert self.backend.check_if_compiled(self.module_backend)
+        self.is_compiled = True
+
+        for check_compiling in self._functions_compiling:
+            if not check_compiling.has_been_replaced:
+                check_compiling.replace()
+        self._functions_compiling.clear()
+
+        for cls, key, func in self._methods_compiling:
+            setattr(cls, key, self._make_new_method(cls.__name__, func))
+        self._methods_compiling.clear()
+
     def transonic_def_method(self, func):
         """Decorator used for methods
 
@@ -415,6 +476,9 @@ class Transonic:
 
         Used for functions, methods and classes.
         """
+        priority = kwargs.get("priority")
+        if priority is not None and getattr(self, "is_compiling", False):
+            scheduler.set_priority(self.process, priority, only_raise=True)
         return self._boost_decor
 
     def _boost_decor(self, obj):
@@ -453,36 +517,58 @@ class Transonic:
 
         cls_name = cls.__name__
 
-        for key, value in cls.__dict__.items():
+        for key, value in list(cls.__dict__.items()):
             if not isinstance(value, TransonicTemporaryMethod):
                 continue
             func = value.func
-            func_name = func.__name__
+            new_method = self._make_new_method(cls_name, func)
+            if self.is_compiling:
+                new_method = self._make_method_checking_compilation(
+                    cls, key, new_method
+                )
+                self._methods_compiling.append((cls, key, func))
+            setattr(cls, key, new_method)
+        return cls
 
-            name_backend_func = f"__for_method__{cls_name}__{func_name}"
-            name_var_code_new_method = (
-                f"__code_new_method__{cls_name}__{func_name}"
-            )
+    def _make_method_checking_compilation(self, cls, key, new_method):
+        """Wrap a method to replace it when the compilation is done"""
+        ts = self
 
-            if not hasattr(self.module_backend, name_backend_func):
-                self.reload_module_backend()
+        @functools.wraps(new_method)
+        def method_checking_compilation(self, *args, **kwargs):
+            if ts.is_compiling and not ts.process.is_alive(raise_if_error=True):
+                ts._on_compilation_done()
+            if ts.is_compiling:
+                return new_method(self, *args, **kwargs)
+            # the class attribute is now the native method
+            return cls.__dict__[key](self, *args, **kwargs)
 
-            try:
-                backend_func = getattr(self.module_backend, name_backend_func)
-                code_new_method = getattr(
-                    self.module_backend, name_var_code_new_method
-                )
-            except AttributeError:
-                # TODO: improve what happens in this case
-                raise RuntimeError(
-                    f"{self.backend.name_capitalized} file does not seem to be up-to-date."
-                )
-                # setattr(cls, key, func)
-            else:
-                namespace = {"backend_func": backend_func}
-                exec(code_new_method, namespace)
-                setattr(cls, key, functools.wraps(func)(namespace["new_method"]))
-        return cls
+        return method_checking_compilation
+
+    def _make_new_method(self, cls_name, func):
+        """Create the method calling the backend function"""
+        func_name = func.__name__
+
+        name_backend_func = f"__for_method__{cls_name}__{func_name}"
+        name_var_code_new_method = f"__code_new_method__{cls_name}__{func_name}"
+
+        if not hasattr(self.module_backend, name_backend_func):
+            self.reload_module_backend()
+
+        try:
+            backend_func = getattr(self.module_backend, name_backend_func)
+            code_new_method = getattr(
+                self.module_backend, name_var_code_new_method
+            )
+        except AttributeError:
+            # TODO: improve what happens in this case
+            raise RuntimeError(
+                f"{self.backend.name_capitalized} file does not seem to be up-to-date."
+            )
+
+        namespace = {"backend_func": backend_func}
+        exec(code_new_method, namespace)
+        return functools.wraps(func)(namespace["new_method"])
 
     def use_block(self, name):
         """Use the pythranized version of a code block
@@ -501,13 +587,7 @@ class Transonic:
             )
 
         if self.is_compiling and not self.process.is_alive(raise_if_error=True):
-            self.is_compiling = False
-            time.sleep(0.1)
-            self.module_backend = import_from_path(
-                self.path_extension, self.module_backend.__name__
-            )
-            assert self.backend.check_if_compiled(self.module_backend)
-            self.is_compiled = True
+            self._on_compilation_done()
 
         func = getattr(self.module_backend, name)
         argument_names = self.arguments_blocks[name]
@@ -577,10 +657,12 @@ def jit_class(cls, jit_methods, backend):
         from transonic.justintime import _get_module_jit
 
         mod = _get_module_jit(backend_name=backend.name, depth_frame=5)
+        # the analysis (if not already done) has to be done by all processes
+        info_analysis = mod.info_analysis
         if mpi.rank == 0:
             python_path = mpi.PathSeq(python_path)
             python_code = (
-                mod.info_analysis["codes_dependance_classes"][cls_name] + "\n"
+                info_analysis["codes_dependance_classes"][cls_name] + "\n"
             )
             python_code += backend.jit.produce_code_class(cls)
             write_if_has_to_write(python_path, python_code)
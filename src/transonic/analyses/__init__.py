@@ -5,6 +5,7 @@
    :toctree:
 
     blocks_if
+    cache
     capturex
     extast
     justintime
@@ -28,10 +29,12 @@ from .util import (
     print_dumped,
     print_unparsed,
     find_path,
+    reset_code_ext,
     get_exterior_code,
     extract_variable_annotations,
     extract_returns_annotation,
 )
+from .cache import cached_analysis
 from .capturex import CaptureX
 from .blocks_if import get_block_definitions
 from .parser import parse_transonic_def_commands
@@ -282,9 +285,11 @@ def analyse_files(paths_py):
     return analyses
 
 
+@cached_analysis("aot")
 def analyse_aot(code, pathfile):
     """Gather the informations for ``@boost`` and blocks"""
     debug = logger.debug
+    reset_code_ext()
 
     debug("extast.parse")
     module = extast.parse(code)
@@ -304,8 +309,6 @@ def analyse_aot(code, pathfile):
 
     from transonic import aheadoftime
 
-    aheadoftime.is_transpiling = True
-
     def_nodes = [
         def_node
         for boosted_dict in boosted_dicts.values()
@@ -325,9 +328,14 @@ def analyse_aot(code, pathfile):
     code_dependance_annotations = capturex.make_code_external()
 
     namespace = {}
-    exec(code_dependance_annotations, namespace)
-
-    aheadoftime.is_transpiling = False
+    # the analysis can be done in a process importing modules using
+    # Transonic (see Transonic.__init__) so the state has to be restored
+    is_transpiling_before = aheadoftime.is_transpiling
+    aheadoftime.is_transpiling = True
+    try:
+        exec(code_dependance_annotations, namespace)
+    finally:
+        aheadoftime.is_transpiling = is_transpiling_before
 
     annotations = {}
 
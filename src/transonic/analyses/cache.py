@@ -0,0 +1,132 @@
+"""Persistent cache of the analyses
+==================================
+
+The results of the analyses (:func:`transonic.analyses.analyse_aot` and
+:func:`transonic.analyses.justintime.analysis_jit`) are pickled in
+:code:`$TRANSONIC_DIR/analyses/`. They are keyed by the kind of analysis, its
+arguments (source, path of the file, backend) and the version of Transonic so
+that importing an unmodified module does not require a new analysis.
+
+The local modules read during an analysis (to get the exterior code) are
+recorded in the cache with a hash of their source, so that a modification of
+these files also invalidates the cached result.
+
+Results that cannot be pickled (for example annotations with Transonic types)
+are not cached. The cache can be disabled with the environment variable
+:code:`TRANSONIC_NO_ANALYSIS_CACHE`.
+
+Internal API
+------------
+
+.. autofunction:: cached_analysis
+
+"""
+
+import functools
+import hashlib
+import os
+import pickle
+
+from transonic import __version__, mpi
+from transonic.config import path_root
+from transonic.log import logger
+
+from . import util
+
+use_cache = "TRANSONIC_NO_ANALYSIS_CACHE" not in os.environ
+path_cache = path_root / "analyses"
+
+
+def _make_hex(src):
+    return hashlib.md5(src.encode("utf8")).hexdigest()
+
+
+def _hash_file(path):
+    try:
+        with open(path) as file:
+            return _make_hex(file.read())
+    except OSError:
+        return None
+
+
+def _load(path, key):
+    try:
+        with open(path, "rb") as file:
+            key_saved, dependencies, result = pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as error:
+        logger.debug(f"Cannot load cached analysis {path}: {error!r}")
+        return None
+    if key_saved != key:
+        return None
+    for path_dependency, hex_dependency in dependencies.items():
+        if _hash_file(path_dependency) != hex_dependency:
+            return None
+    return result
+
+
+def _save(path, key, result):
+    dependencies = {
+        str(path_dependency): _hash_file(path_dependency)
+        for path_dependency in util.paths_found
+    }
+    try:
+        data = pickle.dumps(
+            (key, dependencies, result), protocol=pickle.HIGHEST_PROTOCOL
+        )
+    except Exception as error:
+        logger.debug(f"Analysis not cached (cannot be pickled): {error!r}")
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path_tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    path_tmp.write_bytes(data)
+    os.replace(path_tmp, path)
+
+
+def cached_analysis(kind, collective=False):
+    """Decorator to cache the results of an analysis on disk
+
+    The decorated function has to take as first arguments the source and the
+    path of the analysed file. For collective analyses (done by all MPI
+    processes), the cached result is loaded by the process 0 and broadcast so
+    that all processes get the same result.
+
+    """
+
+    def decorator(analysis):
+        @functools.wraps(analysis)
+        def new_analysis(code, pathfile, *args):
+            if not use_cache:
+                return analysis(code, pathfile, *args)
+
+            key = (
+                kind,
+                __version__,
+                _make_hex(code),
+                os.path.abspath(pathfile),
+            ) + tuple(str(arg) for arg in args)
+            hex_key = _make_hex(repr(key))
+            path = path_cache / kind / f"{hex_key}.pkl"
+
+            result = None
+            if not collective or mpi.rank == 0:
+                result = _load(path, key)
+            if collective:
+                result = mpi.bcast(result)
+            if result is not None:
+                logger.debug(f"cached analysis of {pathfile} loaded")
+                return result
+
+            util.paths_found.clear()
+            result = analysis(code, pathfile, *args)
+            if mpi.rank == 0:
+                try:
+                    _save(path, key, result)
+                except OSError as error:
+                    logger.debug(f"Cannot save analysis in {path}: {error!r}")
+            return result
+
+        return new_analysis
+
+    return decorator
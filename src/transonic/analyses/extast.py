@@ -17,7 +17,7 @@ class CommentLine(gast.AST):
 
     _fields = ("s",)
 
-    def __init__(self, s, lineno=None):
+    def __init__(self, s=None, lineno=None):
         super().__init__()
         self.s = s
         if lineno is not None:
@@ -5,15 +5,18 @@
 
 from transonic.analyses import extast
 from transonic.analyses import compute_ancestors_chains, get_decorated_dicts
+from transonic.analyses.cache import cached_analysis
 from transonic.analyses.capturex import CaptureX
 
 from transonic.log import logger
-from transonic.analyses.util import get_exterior_code
+from transonic.analyses.util import get_exterior_code, reset_code_ext
 
 
+@cached_analysis("jit", collective=True)
 def analysis_jit(code, pathfile, backend_name):
     """Gather the informations for ``@jit`` with an ast analysis"""
     debug = logger.debug
+    reset_code_ext()
 
     debug("extast.parse")
     module = extast.parse(code)
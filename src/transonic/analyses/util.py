@@ -10,6 +10,7 @@ import gast as ast
 
 from transonic.analyses import beniget
 from transonic.analyses import extast
+from transonic.util import format_str
 
 try:
     import astunparse
@@ -210,6 +211,11 @@ packages_supported_by_pythran = [
 ]
 
 
+# paths of the local modules found by find_path (needed to invalidate the
+# cached analyses, see transonic.analyses.cache)
+paths_found = set()
+
+
 def find_path(node: object, pathfile: str):
     """Return the path of node (instance of ast.Import or ast.ImportFrom)"""
     # FIXME find path in non local imports
@@ -223,6 +229,7 @@ def find_path(node: object, pathfile: str):
         else:
             parent = Path(pathfile).parent
             path = parent / (str(name.replace(".", "/")) + ".py")
+            paths_found.add(path)
     else:
         if node.names[0].name in packages_supported_by_pythran:
             pass
@@ -361,6 +368,17 @@ def adapt_code_dependance(func: str, codes_dependance: str, jitted_dicts: dict):
 code_ext = {"function": {}, "class": {}}
 
 
+def reset_code_ext():
+    """Forget the exterior codes gathered by :func:`get_exterior_code`
+
+    Has to be called at the beginning of the analysis of a module so that the
+    exterior codes of the previously analysed modules are not included.
+
+    """
+    global code_ext
+    code_ext = {"function": {}, "class": {}}
+
+
 def get_exterior_code(
     codes_dependance: dict,
     pathfile: str,
@@ -462,3 +480,51 @@ def extract_returns_annotation(returns, namespace):
         return
     source = extast.unparse(returns)
     return eval(source, namespace)
+
+
+class TypeHintRemover(ast.NodeTransformer):
+    """Strip the type hints
+
+    from https://stackoverflow.com/a/42734810/1779806
+    """
+
+    def visit_FunctionDef(self, fdef):
+        # remove the return type defintion
+        fdef.returns = None
+        # remove all argument annotations
+        if fdef.args.args:
+            for arg in fdef.args.args:
+                arg.annotation = None
+
+        body = []
+        for node in fdef.body:
+            if isinstance(node, ast.AnnAssign):
+                if node.value is None:
+                    continue
+                node = ast.Assign(
+                    targets=[node.target], value=node.value, type_comment=None
+                )
+            body.append(node)
+        fdef.body = body
+
+        return fdef
+
+
+def strip_typehints(source):
+    """Strip the type hints from a function"""
+    source = format_str(source)
+    # parse the source code into an AST
+    parsed_source = ast.parse(source)
+    # remove all type annotations, function return type definitions
+    # and import statements from 'typing'
+    transformed = TypeHintRemover().visit(parsed_source)
+    # convert the AST back to source code
+    striped_code = extast.unparse(transformed)
+    return striped_code
+
+
+def make_code_from_fdef_node(fdef):
+    transformed = TypeHintRemover().visit(fdef)
+    # convert the AST back to source code
+    code = extast.unparse(transformed)
+    return format_str(code)
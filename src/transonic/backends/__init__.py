@@ -23,12 +23,18 @@ User API
 
 .. autofunction:: make_backend_files
 
+Internal API
+------------
+
+.. autofunction:: make_backend_files_parallel
+
 """
 
 from pathlib import Path
 from typing import Iterable
 
 from transonic.config import backend_default
+from transonic.log import logger
 from transonic.util import get_module_name, get_frame
 
 from .py import PythonBackend
@@ -69,3 +75,66 @@ def make_backend_files(
     """Create Pythran files from a list of Python files"""
     backend = backends[backend]
     backend.make_backend_files(paths, force, log_level)
+
+
+def _make_backend_files_1_path(path, backend_names, force, log_level, kwargs):
+    """Analyse one file and create its backend files (in a worker process)"""
+    if log_level is not None:
+        logger.set_level(log_level)
+    from transonic.analyses import analyse_files
+
+    analysis = analyse_files([path])[path]
+    return [
+        backends[backend_name].make_backend_file(
+            path, analysis, force=force, **kwargs
+        )
+        for backend_name in backend_names
+    ]
+
+
+def make_backend_files_parallel(
+    paths: Iterable[Path],
+    backend_names: Iterable[str],
+    nb_jobs: int = None,
+    force=False,
+    log_level=None,
+    **kwargs,
+):
+    """Create the backend files of Python files with a pool of processes
+
+    Each file is analysed only once for all backends. The analyses cannot
+    always be pickled so that they are done in the worker processes. The
+    files produced are the same as with :code:`Backend.make_backend_files`.
+
+    Returns a dictionary containing for each backend the list of the paths
+    of the files created or updated.
+
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    paths = tuple(paths)
+    backend_names = tuple(backend_names)
+    # "spawn" because the main process can have threads (compilation scheduler)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=nb_jobs, mp_context=context) as executor:
+        futures = [
+            executor.submit(
+                _make_backend_files_1_path,
+                path,
+                backend_names,
+                force,
+                log_level,
+                kwargs,
+            )
+            for path in paths
+        ]
+        results = [future.result() for future in futures]
+
+    paths_out = {}
+    for index, backend_name in enumerate(backend_names):
+        paths_out[backend_name] = paths_out_backend = [
+            result[index] for result in results if result[index]
+        ]
+        backends[backend_name]._log_files_created(paths_out_backend)
+    return paths_out
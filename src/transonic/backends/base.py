@@ -10,6 +10,8 @@ Internal API
 
 """
 
+import json
+import os
 from pathlib import Path
 from textwrap import indent
 from typing import Iterable, Optional
@@ -18,19 +20,22 @@ from typing import Iterable, Optional
 
 import transonic
 
-from transonic.analyses import extast, analyse_aot, analyse_files
 from transonic.log import logger
-from transonic.compiler import compile_extension, ext_suffix
+from transonic.compiler import (
+    compile_extension,
+    ext_suffix,
+    make_accelerator_flags,
+    make_build_fingerprint,
+)
 from transonic import mpi
 from transonic.mpi import PathSeq
 from transonic.signatures import compute_signatures_from_typeobjects
-from transonic.config import backend_default
+from transonic.config import backend_default, path_root
 
 from transonic.util import (
     has_to_build,
     format_str,
     write_if_has_to_write,
-    TypeHintRemover,
     make_hex,
 )
 
@@ -50,6 +55,8 @@ class Backend:
     _SubBackendJIT = SubBackendJIT
     needs_compilation = True
     _TypeFormatter = TypeFormatter
+    # exceptions raised by the extensions when called with unsupported types
+    exceptions_wrong_types = (TypeError,)
 
     def __init__(self):
         self.name = self.backend_name
@@ -57,7 +64,15 @@ class Backend:
         self.type_formatter = self._TypeFormatter(self.name)
         self.jit = self._SubBackendJIT(self.name, self.type_formatter)
 
+    def is_wrong_types_error(self, error):
+        """Check if an exception (one of :code:`exceptions_wrong_types`) was
+        raised because the types of the arguments are not supported"""
+        return True
+
     def _make_code_from_fdef_node(self, fdef):
+        from transonic.analyses import extast
+        from transonic.analyses.util import TypeHintRemover
+
         transformed = TypeHintRemover().visit(fdef)
         # convert the AST back to source code
         code = extast.unparse(transformed)
@@ -73,6 +88,8 @@ class Backend:
 
         paths_py = tuple(paths_py)
         if analyses is None:
+            from transonic.analyses import analyse_files
+
             analyses = analyse_files(paths_py)
 
         paths_out = []
@@ -84,6 +101,10 @@ class Backend:
             if path_out:
                 paths_out.append(path_out)
 
+        self._log_files_created(paths_out)
+        return paths_out
+
+    def _log_files_created(self, paths_out):
         if paths_out:
             nb_files = len(paths_out)
             if nb_files == 1:
@@ -97,8 +118,6 @@ class Backend:
                     f" to be {self.name}ized"
                 )
 
-        return paths_out
-
     def make_backend_file(
         self, path_py: Path, analysis=None, force=False, log_level=None, **kwargs
     ):
@@ -131,6 +150,8 @@ class Backend:
             return
 
         if not analysis:
+            from transonic.analyses import analyse_aot
+
             with open(path_py) as file:
                 code = file.read()
             analysis = analyse_aot(code, path_py)
@@ -228,6 +249,8 @@ class Backend:
         pass
 
     def _make_code_blocks(self, blocks):
+        from transonic.analyses import extast
+
         code = []
         signatures_blocks = []
         for block in blocks:
@@ -274,6 +297,8 @@ class Backend:
     def _make_code_method(
         self, class_name, fdef, meth_name, annotations, boosted_dicts
     ):
+        from transonic.analyses import extast
+
         class_def = boosted_dicts["classes"][class_name]
 
         if class_name in annotations["classes"]:
@@ -358,8 +383,20 @@ class Backend:
     ):
         raise NotImplementedError
 
-    def name_ext_from_path_backend(self, path_backend):
-        """Return an extension name given the path of a Pythran file"""
+    def name_ext_from_path_backend(
+        self, path_backend, str_accelerator_flags: Optional[str] = None
+    ):
+        """Return an extension name given the path of a Pythran file
+
+        The name depends on the build fingerprint of this host (toolchain,
+        accelerator flags and, for native builds, CPU features, see
+        :func:`transonic.compiler.make_build_fingerprint`), so that an
+        extension built with another toolchain is not selected. By default,
+        the flags of the last compilation of this file (recorded in the
+        Transonic directory) are used. With :code:`str_accelerator_flags`,
+        the name of a new compilation with these flags is returned.
+
+        """
 
         name = None
         if mpi.rank == 0:
@@ -376,10 +413,45 @@ class Backend:
             else:
                 src = ""
 
+            flags = None
+            if str_accelerator_flags is None:
+                flags = self._load_build_flags(path_backend)
+            if flags is None:
+                flags = make_accelerator_flags(
+                    str_accelerator_flags=str_accelerator_flags
+                )
+            src += make_build_fingerprint(self.name, flags)
+
             name = path_backend.stem + "_" + make_hex(src) + self.suffix_extension
 
         return mpi.bcast(name)
 
+    def _get_path_build_record(self, path_backend):
+        """Path of the record of the last compilation of a backend file"""
+        hex_path = make_hex(str(Path(path_backend).absolute()))
+        return path_root / "aot_builds" / self.name / f"{hex_path}.json"
+
+    def _load_build_flags(self, path_backend):
+        """Load the flags of the last compilation of a backend file"""
+        try:
+            with open(self._get_path_build_record(path_backend)) as file:
+                return json.load(file)["flags"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_build_flags(self, path_backend, flags):
+        if mpi.rank != 0:
+            return
+        path = self._get_path_build_record(path_backend)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path_tmp = path.with_name(f"{path.name}.{os.getpid()}")
+        path_tmp.write_text(
+            json.dumps(
+                {"path": str(Path(path_backend).absolute()), "flags": flags}
+            )
+        )
+        os.replace(path_tmp, path)
+
     def compile_extensions(
         self,
         paths: Iterable[Path],
@@ -405,6 +477,7 @@ class Backend:
         str_accelerator_flags: Optional[str] = None,
         parallel=True,
         force=True,
+        priority=0,
     ):
         raise NotImplementedError
 
@@ -445,7 +518,14 @@ class BackendAOT(Backend):
         str_accelerator_flags: Optional[str] = None,
         parallel=True,
         force=True,
+        priority=0,
     ):
+        # the name used at import time is computed from these flags
+        flags = make_accelerator_flags(
+            native, xsimd, openmp, str_accelerator_flags=str_accelerator_flags
+        )
+        self._save_build_flags(path_backend, flags)
+
         if name_ext_file is None:
             name_ext_file = self.name_ext_from_path_backend(path_backend)
 
@@ -460,6 +540,7 @@ class BackendAOT(Backend):
             str_accelerator_flags=str_accelerator_flags,
             parallel=parallel,
             force=force,
+            priority=priority,
         )
         return compiling, process
 
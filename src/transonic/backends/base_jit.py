@@ -12,14 +12,12 @@ Internal API
 
 import re
 from pathlib import Path
-from time import sleep
 
 try:
     import numpy as np
 except ImportError:
     np = None
 
-from transonic.analyses import extast
 from transonic.signatures import make_signatures_from_typehinted_func
 from transonic.log import logger
 from transonic import mpi
@@ -37,19 +35,13 @@ class SubBackendJIT:
         self.name_capitalized = name.capitalize()
         self.type_formatter = type_formatter
 
+        # the directories are created when files are written in them
         self.path_base = Path(path_root) / self.name / "__jit__"
         self.path_class = self.path_base.parent / "__jit_class__"
 
-        if mpi.rank == 0:
-            self.path_base.mkdir(parents=True, exist_ok=True)
-            self.path_class.mkdir(parents=True, exist_ok=True)
-
-        while True:
-            if self.path_base.exists() and self.path_class.exists():
-                break
-            sleep(0.1)
-
     def make_backend_source(self, info_analysis, func, path_backend):
+        from transonic.analyses import extast
+
         func_name = func.__name__
         jitted_dicts = info_analysis["jitted_dicts"]
         src = info_analysis["codes_dependance"][func_name]
@@ -64,8 +56,9 @@ class SubBackendJIT:
             src += "\n" + re.sub(
                 r"@.*?\sdef\s", "def ", get_source_without_decorator(func)
             )
+        # only used by the root process
         has_to_write = True
-        if path_backend.exists() and mpi.rank == 0:
+        if mpi.rank == 0 and mpi.PathSeq(path_backend).exists():
             with open(path_backend) as file:
                 src_old = file.read()
             if src_old == src:
@@ -118,6 +111,10 @@ class SubBackendJIT:
     def _make_header_code(self, header):
         return "\n".join(sorted(header)) + "\n"
 
+    def make_header_code(self, header):
+        """Make the code of a header without merging it with an old one"""
+        return self._make_header_code(header)
+
     def write_new_header(self, path_backend_header, header, arg_types):
         mpi.barrier()
         if mpi.rank == 0:
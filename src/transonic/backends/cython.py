@@ -19,17 +19,23 @@ Internal API
 """
 import copy
 import inspect
+import re
 
 from warnings import warn
 
-from transonic.analyses.extast import unparse, gast, FunctionDef, Name
 from transonic.signatures import make_signatures_from_typehinted_func
 from transonic.typing import format_type_as_backend_type, MemLayout
 
-from .base import BackendAOT, TypeHintRemover, format_str
+from .base import BackendAOT, format_str
 from .base_jit import SubBackendJIT
 from .typing import TypeFormatter
 
+# messages of the errors raised by the buffer checks of the arguments
+_re_buffer_errors = re.compile(
+    r"^(Buffer dtype mismatch|Buffer has wrong number of dimensions|"
+    r"Item size of buffer|ndarray is not (C|Fortran)[ -]contiguous)"
+)
+
 
 def normalize_type_name_for_array(name):
     if name == "bool_":
@@ -94,7 +100,7 @@ def np_ndarray_type(dtype, ndim, mem_layout, positive_indices) -> str:
     if mem_layout is MemLayout.C:
         mode = ', mode="c"'
     elif mem_layout is MemLayout.F:
-        mode = ', mode="f"'
+        mode = ', mode="fortran"'
     else:
         mode = ""
 
@@ -218,6 +224,14 @@ class CythonBackend(BackendAOT):
     keyword_export = "cpdef"
     _SubBackendJIT = SubBackendJITCython
     _TypeFormatter = TypeFormatterCython
+    # the buffer checks (layout, ndim, dtype) raise ValueError
+    exceptions_wrong_types = (TypeError, ValueError)
+
+    def is_wrong_types_error(self, error):
+        # a ValueError can also be raised by the body of the function
+        return isinstance(error, TypeError) or bool(
+            _re_buffer_errors.match(str(error))
+        )
 
     def _make_first_lines_header(self):
         return ["import cython\n\nimport numpy as np\ncimport numpy as np\n"]
@@ -233,6 +247,8 @@ class CythonBackend(BackendAOT):
         inline = decorator_keywords.get("inline", False)
         inline = "inline " if inline else ""
 
+        from transonic.analyses.extast import unparse, gast, FunctionDef, Name
+
         fdef = FunctionDef(name=fdef.name, args=copy.deepcopy(fdef.args), body=[])
 
         assert isinstance(annotations, list)
@@ -373,6 +389,9 @@ class CythonBackend(BackendAOT):
         if decorator_keywords.get("nogil", False):
             parts.append("@cython.nogil")
 
+        from transonic.analyses.extast import unparse
+        from transonic.analyses.util import TypeHintRemover
+
         transformed = TypeHintRemover().visit(fdef)
         # convert the AST back to source code
         parts.append(unparse(transformed))
@@ -12,11 +12,7 @@ from io import BytesIO
 from transonic.signatures import compute_signatures_from_typeobjects
 
 # from transonic.log import logger
-from transonic.util import (
-    get_source_without_decorator,
-    format_str,
-    make_code_from_fdef_node,
-)
+from transonic.util import get_source_without_decorator, format_str
 
 from .typing import base_type_formatter
 
@@ -102,6 +98,8 @@ def make_code_method_jit(cls, func_name):
 
 
 def make_new_code_method_from_nodes(class_def, fdef):
+    from transonic.analyses.util import make_code_from_fdef_node
+
     source = make_code_from_fdef_node(fdef)
     return make_new_code_method_from_source(source, fdef.name, class_def.name)
 
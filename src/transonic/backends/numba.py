@@ -16,7 +16,6 @@ Internal API
 
 from typing import Optional
 
-from transonic.analyses.extast import parse, unparse, CommentLine, gast
 from transonic.util import format_str
 
 from .py import PythonBackend, SubBackendJITPython
@@ -24,6 +23,8 @@ from .py import PythonBackend, SubBackendJITPython
 
 def add_numba_comments(code):
     """Add Numba code in Python comments"""
+    from transonic.analyses.extast import parse, unparse, CommentLine, gast
+
     mod = parse(code)
     new_body = [CommentLine("# __protected__ from numba import njit")]
 
@@ -66,6 +67,7 @@ class NumbaBackend(PythonBackend):
         str_accelerator_flags: Optional[str] = None,
         parallel=True,
         force=True,
+        priority=0,
     ):
         if name_ext_file is None:
             name_ext_file = self.name_ext_from_path_backend(path_backend)
@@ -48,6 +48,7 @@ class PythonBackend(BackendJIT):
         str_accelerator_flags: Optional[str] = None,
         parallel=True,
         force=True,
+        priority=0,
     ):
         if name_ext_file is None:
             name_ext_file = self.name_ext_from_path_backend(path_backend)
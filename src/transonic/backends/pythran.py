@@ -4,13 +4,41 @@
 Internal API
 ------------
 
+.. autoclass:: TypeFormatterPythran
+   :members:
+   :private-members:
+
 .. autoclass:: PythranBackend
    :members:
    :private-members:
 
 """
 
+from transonic.typing import MemLayout
+
 from .base import BackendAOT
+from .typing import TypeFormatter
+
+
+class TypeFormatterPythran(TypeFormatter):
+    """Type formatter for Pythran
+
+    The C layout is the default layout in Pythran so that :code:`order(C)` is
+    not written. This way, the signatures of C-contiguous arrays (computed
+    with :func:`transonic.typing.typeof`) are the same as the signatures
+    obtained from type hints without memory layout (Pythran refuses duplicate
+    exports).
+
+    """
+
+    def make_array_code(
+        self, dtype, ndim, shape, memview, mem_layout, positive_indices
+    ):
+        if mem_layout is MemLayout.C:
+            mem_layout = MemLayout.C_or_F
+        return super().make_array_code(
+            dtype, ndim, shape, memview, mem_layout, positive_indices
+        )
 
 
 class PythranBackend(BackendAOT):
@@ -18,6 +46,7 @@ class PythranBackend(BackendAOT):
 
     backend_name = "pythran"
     suffix_header = ".pythran"
+    _TypeFormatter = TypeFormatterPythran
 
     def check_if_compiled(self, module):
         return hasattr(module, "__pythran__")
@@ -0,0 +1,513 @@
+"""Management of the JIT cache
+=============================
+
+The extensions produced for jitted functions are saved in
+:code:`$TRANSONIC_DIR/<backend>/__jit__/` (see :mod:`transonic.config`). An
+index (:code:`$TRANSONIC_DIR/cache_index.json`) records for each extension its
+size, its last use and the number of times it has been loaded ("hits").
+
+The uses are recorded in memory and written in the index when the process
+exits. If the environment variable :code:`TRANSONIC_CACHE_MAX_SIZE` is set
+(for example to "10G"), the cache is then pruned to this size.
+
+Pruning first removes the superseded extensions (i.e. extensions not used
+since a more recent extension of the same function has been produced) and
+then the least recently used extensions.
+
+The precompiled headers of Pythran (in :code:`$TRANSONIC_DIR/pythran_pch`, see
+:mod:`transonic_cl.cxx_launcher`) are also indexed and pruned with the
+extensions. Their last use is the modification time of their directory. The
+formatted codes (in :code:`$TRANSONIC_DIR/formatted`, see
+:func:`transonic.util.format_str`) are also indexed and pruned.
+
+The compilations of jitted functions that failed are recorded in
+:code:`$TRANSONIC_DIR/compilation_failures.json` (see :class:`FailureIndex`)
+so that the Python function is directly used for these signatures, without
+launching new compilations that would also fail. The interrupted compilations
+(for example killed by a signal) are not recorded and the failures are
+forgotten after one week.
+
+This module is used by the command :code:`transonic --cache
+stats|prune|verify|failures|clear-failures`.
+
+Internal API
+------------
+
+.. autofunction:: parse_size
+
+.. autofunction:: format_size
+
+.. autoclass:: CacheIndex
+   :members:
+   :private-members:
+
+.. autofunction:: record_use
+
+.. autoclass:: FailureIndex
+   :members:
+
+.. autofunction:: is_known_failure
+
+.. autofunction:: record_failure
+
+"""
+
+import atexit
+import json
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import Optional
+
+from transonic_cl.file_lock import FileLock
+
+from transonic import mpi
+from transonic.config import path_root
+from transonic.log import logger
+
+_re_extension = re.compile(
+    r"^(?P<func>.+)_(?P<hex_src>[0-9a-f]{32})_(?P<hex_header>[0-9a-f]{32})"
+    r"(?P<suffix>\..+)$"
+)
+
+# precompiled headers (see transonic_cl.cxx_launcher)
+_glob_pch = "pythran_pch/*/pythonic_pch.hpp.?ch"
+# formatted codes (see transonic.util.format_str)
+_glob_formatted = "formatted/*/*.py"
+
+_units = {"": 1, "k": 1e3, "m": 1e6, "g": 1e9, "t": 1e12}
+
+
+def parse_size(value: Optional[str]):
+    """Convert a size like "500M" or "10G" in bytes"""
+    if not value:
+        return None
+    value = value.strip().lower()
+    if value.endswith("b"):
+        value = value[:-1]
+    unit = value[-1] if value[-1] in _units else ""
+    if unit:
+        value = value[:-1]
+    return int(float(value) * _units[unit])
+
+
+def format_size(size):
+    """Format a size in bytes"""
+    for unit in ("", "k", "M", "G"):
+        if size < 1000:
+            break
+        size /= 1000
+    else:
+        unit = "T"
+    return f"{size:.3g} {unit}B"
+
+
+def _is_pch(key):
+    return key.startswith("pythran_pch/")
+
+
+def _get_backend_name(relative_path):
+    return Path(relative_path).parts[0]
+
+
+class CacheIndex:
+    """Index of the extensions of the JIT cache"""
+
+    def __init__(self, path_dir=path_root):
+        self.path_dir = Path(path_dir)
+        self.path = self.path_dir / "cache_index.json"
+        self._lock = FileLock(self.path_dir / "cache_index.lock")
+        self.entries = {}
+        # uses not yet written in the index
+        self._uses = {}
+        self._flush_registered = False
+
+    def __enter__(self):
+        self.path_dir.mkdir(parents=True, exist_ok=True)
+        self._lock.acquire()
+        self.load()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.save()
+        finally:
+            self._lock.release()
+
+    def load(self):
+        try:
+            with open(self.path) as file:
+                self.entries = json.load(file)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        path_tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}")
+        with open(path_tmp, "w") as file:
+            json.dump(self.entries, file, indent=1, sort_keys=True)
+        os.replace(path_tmp, self.path)
+
+    def _make_key(self, path):
+        return Path(path).absolute().relative_to(self.path_dir).as_posix()
+
+    def _make_entry(self, path):
+        stat = path.stat()
+        return {
+            "size": stat.st_size,
+            "created": stat.st_mtime,
+            "last_use": stat.st_mtime,
+            "hits": 0,
+        }
+
+    def record_use(self, path):
+        """Record (in memory) that an extension has been loaded"""
+        try:
+            key = self._make_key(path)
+        except ValueError:
+            # not in the cache directory
+            return
+        hits, _ = self._uses.get(key, (0, None))
+        self._uses[key] = (hits + 1, time.time())
+        if not self._flush_registered:
+            atexit.register(self.flush)
+            self._flush_registered = True
+
+    def flush(self):
+        """Write the recorded uses in the index (and prune if needed)"""
+        if not self._uses:
+            return
+        max_size = parse_size(os.environ.get("TRANSONIC_CACHE_MAX_SIZE"))
+        try:
+            with self:
+                for key, (hits, last_use) in self._uses.items():
+                    entry = self.entries.get(key)
+                    if entry is None:
+                        path = self.path_dir / key
+                        if not path.exists():
+                            continue
+                        entry = self.entries[key] = self._make_entry(path)
+                    entry["hits"] += hits
+                    entry["last_use"] = max(entry["last_use"], last_use)
+                self._uses.clear()
+                if max_size is not None:
+                    self._sync_pch()
+                    if self.get_total_size() > max_size:
+                        self.prune(max_size)
+        except OSError as error:
+            logger.warning(f"Cannot update the cache index: {error}")
+
+    def _iter_extension_paths(self):
+        for path_jit in self.path_dir.glob("*/__jit__"):
+            for path in path_jit.rglob("*"):
+                if _re_extension.match(path.name) and path.is_file():
+                    yield path
+        yield from self.path_dir.glob(_glob_pch)
+        yield from self.path_dir.glob(_glob_formatted)
+
+    def _sync_path(self, path):
+        key = self._make_key(path)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = self._make_entry(path)
+        else:
+            entry["size"] = path.stat().st_size
+        if _is_pch(key):
+            # its uses touch its directory
+            entry["last_use"] = max(
+                entry["last_use"], path.parent.stat().st_mtime
+            )
+        return key
+
+    def _sync_pch(self):
+        """Synchronize the index with the precompiled headers"""
+        for path in self.path_dir.glob(_glob_pch):
+            self._sync_path(path)
+
+    def sync(self):
+        """Synchronize the index with the files present in the cache"""
+        keys_found = set()
+        for path in self._iter_extension_paths():
+            keys_found.add(self._sync_path(path))
+        for key in set(self.entries) - keys_found:
+            del self.entries[key]
+
+    def get_total_size(self):
+        return sum(entry["size"] for entry in self.entries.values())
+
+    def find_superseded(self):
+        """Find the extensions not used since a newer one has been created
+
+        Only the extensions compiled from another source than the newest
+        extension of the same function are considered, so that the
+        extensions of the incremental mode (one per signature, with the same
+        source) are never superseded by each other.
+
+        """
+        newest = {}
+        for key, entry in self.entries.items():
+            path = Path(key)
+            match = _re_extension.match(path.name)
+            if match is None:
+                # precompiled header or formatted code
+                continue
+            func_key = (path.parent, match["func"])
+            created_hex_src = (entry["created"], match["hex_src"])
+            newest[func_key] = max(
+                newest.get(func_key, created_hex_src), created_hex_src
+            )
+
+        superseded = []
+        for key, entry in self.entries.items():
+            path = Path(key)
+            match = _re_extension.match(path.name)
+            if match is None:
+                continue
+            created_newest, hex_src_newest = newest[(path.parent, match["func"])]
+            if (
+                match["hex_src"] != hex_src_newest
+                and entry["last_use"] < created_newest
+            ):
+                superseded.append(key)
+        return superseded
+
+    def remove(self, key):
+        """Remove an extension (and the files used to compile it)"""
+        path = self.path_dir / key
+        match = _re_extension.match(path.name)
+        if _is_pch(key):
+            shutil.rmtree(path.parent, ignore_errors=True)
+            self.entries.pop(key, None)
+            return
+        if match is None:
+            # formatted code
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            self.entries.pop(key, None)
+            return
+        # input files of the incremental mode
+        name_shard = f"{match['func']}_shard_{match['hex_header']}"
+        for path_file in (
+            path,
+            path.with_name(name_shard + ".py"),
+            path.with_name(name_shard + ".pythran"),
+            path.with_name(name_shard + ".pxd"),
+        ):
+            try:
+                path_file.unlink()
+            except FileNotFoundError:
+                pass
+        self.entries.pop(key, None)
+
+    def prune(self, max_size=None, dry_run=False):
+        """Remove the superseded extensions and then the least recently used
+        ones until the size of the cache is smaller than max_size
+
+        Return the list of the removed extensions.
+
+        """
+        to_remove = self.find_superseded()
+        size = self.get_total_size() - sum(
+            self.entries[key]["size"] for key in to_remove
+        )
+        if max_size is not None and size > max_size:
+            others = sorted(
+                (key for key in self.entries if key not in to_remove),
+                key=lambda key: self.entries[key]["last_use"],
+            )
+            for key in others:
+                if size <= max_size:
+                    break
+                to_remove.append(key)
+                size -= self.entries[key]["size"]
+
+        if not dry_run:
+            for key in to_remove:
+                self.remove(key)
+        return to_remove
+
+    def get_stats(self):
+        """Compute statistics on the cache"""
+        backends = {}
+        for key, entry in self.entries.items():
+            stats_backend = backends.setdefault(
+                _get_backend_name(key), {"number": 0, "size": 0, "hits": 0}
+            )
+            stats_backend["number"] += 1
+            stats_backend["size"] += entry["size"]
+            stats_backend["hits"] += entry["hits"]
+        return {
+            "number": len(self.entries),
+            "size": self.get_total_size(),
+            "nb_superseded": len(self.find_superseded()),
+            "backends": backends,
+        }
+
+    def verify(self):
+        """Check the cache and return a list of problems (as strings)
+
+        The index is synchronized with the files present in the cache.
+
+        """
+        problems = []
+        keys_indexed = set(self.entries)
+        for path in self._iter_extension_paths():
+            key = self._make_key(path)
+            if key not in keys_indexed:
+                problems.append(f"{key}: not indexed")
+                continue
+            size = path.stat().st_size
+            if size != self.entries[key]["size"]:
+                problems.append(f"{key}: size changed")
+            if size == 0:
+                problems.append(f"{key}: empty file")
+            keys_indexed.remove(key)
+
+        for key in keys_indexed:
+            problems.append(f"{key}: indexed but missing")
+
+        # leftovers of interrupted compilations
+        for path_jit in self.path_dir.glob("*/__jit__"):
+            for path in path_jit.rglob("*"):
+                if path.suffix == ".tmp" or (
+                    path.suffix == ".build" and path.is_dir()
+                ):
+                    problems.append(
+                        f"{self._make_key(path)}: temporary file or directory"
+                    )
+
+        self.sync()
+        return problems
+
+
+cache_index = CacheIndex()
+
+
+def record_use(path):
+    """Record that an extension of the JIT cache has been loaded"""
+    if mpi.rank == 0:
+        cache_index.record_use(path)
+
+
+class FailureIndex:
+    """Persistent record of the failed compilations of jitted functions
+
+    A failure is keyed by the hash :code:`hex_src` (computed from the source
+    of the function, the compilation flags and the toolchain, as in the names
+    of the extensions) and by the signature, so that it is forgotten when the
+    source or the compilation options change. The failures older than
+    :code:`max_age` (in s) are ignored so that the compilations are retried.
+
+    """
+
+    max_age = 7 * 24 * 3600.0
+
+    def __init__(self, path_dir=path_root):
+        self.path_dir = Path(path_dir)
+        self.path = self.path_dir / "compilation_failures.json"
+        self._lock = FileLock(self.path_dir / "compilation_failures.lock")
+        # loaded at the first query
+        self.entries = None
+
+    @staticmethod
+    def _make_key(hex_src, signature):
+        return f"{hex_src} {signature}"
+
+    def _read(self):
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, entries):
+        path_tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}")
+        with open(path_tmp, "w") as file:
+            json.dump(entries, file, indent=1, sort_keys=True)
+        os.replace(path_tmp, self.path)
+
+    def load(self):
+        self.entries = self._read()
+
+    def has_failed(self, hex_src, signature):
+        """Check if the compilation for a signature is known to fail"""
+        if self.entries is None:
+            self.load()
+        entry = self.entries.get(self._make_key(hex_src, signature))
+        return entry is not None and time.time() - entry["time"] < self.max_age
+
+    def record(self, hex_src, signature, backend_name, path, save=True):
+        """Record a failed compilation (and save it if :code:`save`)"""
+        if self.entries is None:
+            self.load()
+        key = self._make_key(hex_src, signature)
+        entry = self.entries[key] = {
+            "backend": backend_name,
+            "path": str(path),
+            "signature": signature,
+            "time": time.time(),
+        }
+        if not save:
+            return
+        try:
+            self.path_dir.mkdir(parents=True, exist_ok=True)
+            self._lock.acquire()
+            try:
+                entries = self._read()
+                entries[key] = entry
+                self._write(entries)
+            finally:
+                self._lock.release()
+        except OSError as error:
+            logger.warning(f"Cannot record the compilation failure: {error}")
+
+    def get_failures(self):
+        """Return the failures (sorted by date)"""
+        return sorted(self._read().values(), key=lambda entry: entry["time"])
+
+    def clear(self):
+        """Forget all failures and return their number"""
+        self.path_dir.mkdir(parents=True, exist_ok=True)
+        self._lock.acquire()
+        try:
+            nb_failures = len(self._read())
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+        finally:
+            self._lock.release()
+        self.entries = {}
+        return nb_failures
+
+
+failure_index = FailureIndex()
+
+
+def is_known_failure(hex_src, signature):
+    """Check if the compilation of a signature already failed
+
+    With MPI, the first call is a collective operation (the failures are
+    loaded by the process 0 and broadcast).
+
+    """
+    if failure_index.entries is None and mpi.nb_proc > 1:
+        entries = None
+        if mpi.rank == 0:
+            entries = failure_index._read()
+        failure_index.entries = mpi.bcast(entries)
+    return failure_index.has_failed(hex_src, signature)
+
+
+def record_failure(hex_src, signature, backend_name, path):
+    """Record that the compilation of a signature failed (collective operation
+    with MPI)"""
+    if failure_index.entries is None and mpi.nb_proc > 1:
+        is_known_failure(hex_src, signature)
+    failure_index.record(
+        hex_src, signature, backend_name, path, save=mpi.rank == 0
+    )
@@ -11,6 +11,32 @@ Internal API
 
 .. autofunction:: make_hex
 
+.. autofunction:: make_accelerator_flags
+
+.. autofunction:: get_toolchain_fingerprint
+
+.. autofunction:: get_isa_fingerprint
+
+.. autofunction:: is_native_build
+
+.. autofunction:: make_build_fingerprint
+
+.. autofunction:: get_available_memory
+
+.. autoclass:: CompilationWorker
+   :members:
+
+.. autoclass:: WorkerTask
+   :members:
+
+.. autoclass:: CompilationWorkerPool
+   :members:
+   :private-members:
+
+.. autoclass:: CompilationJob
+   :members:
+   :private-members:
+
 .. autoclass:: SchedulerPopen
    :members:
    :private-members:
@@ -19,24 +45,33 @@ Internal API
 
 """
 
-import multiprocessing
 import subprocess
-import time
+import threading
+import json
+import heapq
+import itertools
 from typing import Union, Optional
 import sysconfig
 import hashlib
+import io
 import sys
 import os
 from datetime import datetime
+from functools import cached_property, lru_cache
 import logging
+import platform
+import shutil
+import time
 
 from transonic import mpi
 from transonic.mpi import Path, PathSeq
 from transonic.log import logger
-from transonic.progress import Progress
+from transonic.config import path_root, strtobool
 
 ext_suffix = sysconfig.get_config_var("EXT_SUFFIX") or ".so"
 
+use_compile_workers = strtobool(os.environ.get("TRANSONIC_COMPILE_WORKERS", "1"))
+
 
 def modification_date(pathfile):
     """Get the modification date of a file"""
@@ -60,52 +95,592 @@ def make_hex(src):
     return hashlib.md5(src.encode("utf8")).hexdigest()
 
 
+def make_accelerator_flags(
+    native=False,
+    xsimd=False,
+    openmp=False,
+    str_accelerator_flags: Optional[str] = None,
+):
+    """Compute the list of flags sent to the accelerator"""
+    if str_accelerator_flags is not None:
+        flags = str_accelerator_flags.strip().split()
+    else:
+        flags = []
+
+    def update_flags(flag):
+        if flag not in flags:
+            flags.append(flag)
+
+    if native and os.name != "nt":
+        update_flags("-march=native")
+
+    if xsimd:
+        update_flags("-DUSE_XSIMD")
+
+    if openmp:
+        update_flags("-fopenmp")
+
+    return flags
+
+
+def _get_version(package):
+    from importlib import metadata
+
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return "not installed"
+
+
+@lru_cache(maxsize=None)
+def get_toolchain_fingerprint(backend: str):
+    """Describe the toolchain used by a backend
+
+    The versions of the backend and of NumPy (major.minor for its ABI), the
+    architecture and the C/C++ compiler are taken into account. To avoid
+    launching a process, the compiler is identified by the path, the size and
+    the date of its executable. For Pythran, the content of the configuration
+    file is also included.
+
+    """
+    numpy_version = ".".join(_get_version("numpy").split(".")[:2])
+    parts = [
+        f"{backend} {_get_version(backend)}",
+        f"numpy {numpy_version}",
+        sysconfig.get_platform(),
+        platform.machine(),
+    ]
+
+    if backend == "pythran":
+        compiler = os.environ.get("CXX", "c++")
+    elif backend == "cython":
+        compiler = os.environ.get("CC") or sysconfig.get_config_var("CC")
+    else:
+        compiler = None
+
+    if compiler:
+        path_compiler = shutil.which(compiler.split()[0])
+        if path_compiler is not None:
+            path_compiler = os.path.realpath(path_compiler)
+            stat = os.stat(path_compiler)
+            parts.append(
+                f"{compiler} {path_compiler} {stat.st_size} {stat.st_mtime}"
+            )
+
+    if backend == "pythran":
+        path_config = os.environ.get(
+            "PYTHRANRC", os.path.join(os.path.expanduser("~"), ".pythranrc")
+        )
+        try:
+            with open(path_config) as file:
+                parts.append(file.read())
+        except OSError:
+            pass
+
+    return "\n".join(parts)
+
+
+@lru_cache(maxsize=None)
+def get_isa_fingerprint():
+    """Describe the instruction set supported by the CPU"""
+    try:
+        with open("/proc/cpuinfo") as file:
+            for line in file:
+                # "flags" on x86, "Features" on ARM
+                if line.startswith(("flags", "Features")):
+                    return " ".join(sorted(line.split(":", 1)[1].split()))
+    except OSError:
+        pass
+    return f"{platform.machine()} {platform.processor()}"
+
+
+def is_native_build(flags: list):
+    """Check if the flags produce code specific to the CPU of the host"""
+    return any("native" in flag for flag in flags)
+
+
+def make_build_fingerprint(backend: str, flags: list, host=True):
+    """Produce a hash of the toolchain, of the flags and of the CPU features
+
+    The CPU features are only taken into account for native builds (and with
+    :code:`host=True`) so that other extensions can be shared between
+    different hosts.
+
+    """
+    src = get_toolchain_fingerprint(backend) + "\n" + " ".join(flags)
+    if host and is_native_build(flags):
+        src += "\n" + get_isa_fingerprint()
+    return make_hex(src)
+
+
+def get_available_memory():
+    """Get the available memory (in bytes) or None if it cannot be known"""
+    try:
+        from psutil import virtual_memory
+    except ImportError:
+        pass
+    else:
+        return virtual_memory().available
+
+    try:
+        with open("/proc/meminfo") as file:
+            for line in file:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class CompilationWorker:
+    """Persistent process running compilations (see :mod:`transonic_cl.worker`)"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.nb_jobs = 0
+        self.time_idle = time.monotonic()
+        self.popen = subprocess.Popen(
+            [sys.executable, "-m", "transonic_cl.worker", backend],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+    def is_alive(self):
+        return self.popen.poll() is None
+
+    def send(self, argv, cwd, env):
+        """Send a compilation request (raise OSError if the worker is dead)"""
+        request = {"argv": argv, "cwd": cwd and str(cwd), "env": env}
+        self.popen.stdin.write(json.dumps(request) + "\n")
+        self.popen.stdin.flush()
+        self.nb_jobs += 1
+
+    def receive(self):
+        """Wait for the result of the compilation (None if the worker died)"""
+        line = self.popen.stdout.readline()
+        if not line:
+            return None
+        return json.loads(line)
+
+    def close(self):
+        """Ask the worker to finish (end of its standard input)"""
+        try:
+            self.popen.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.popen.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.popen.kill()
+            self.popen.wait()
+
+
+class WorkerTask:
+    """Compilation sent to a worker
+
+    Mimics the part of the :class:`subprocess.Popen` API used by
+    :class:`CompilationJob`. The result is received by :meth:`wait`
+    (:meth:`poll` returns None before).
+
+    """
+
+    def __init__(self, pool, worker, capture_output):
+        self.pool = pool
+        self.worker = worker
+        self.capture_output = capture_output
+        self.returncode = None
+        self.stdout = self.stderr = None
+        self.memory_peak = None
+        self._lock = threading.Lock()
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self):
+        with self._lock:
+            if self.returncode is not None:
+                return self.returncode
+            result = self.worker.receive()
+            if result is None:
+                from transonic_cl.run_backend import exit_code_retry
+
+                output = (
+                    "Compilation worker died "
+                    f"(return code {self.worker.popen.wait()})\n"
+                )
+                returncode = exit_code_retry
+            else:
+                returncode = result["returncode"]
+                output = result["output"]
+                self.memory_peak = result["memory_peak"]
+            self.pool.release(self.worker)
+            if self.capture_output:
+                self.stdout = io.StringIO(output)
+            elif output:
+                print(output, end="", flush=True)
+            self.returncode = returncode
+        return returncode
+
+
+class CompilationWorkerPool:
+    """Persistent compilation workers, reused for compilations with the same
+    backend
+
+    A worker is started when a compilation is launched and no idle worker
+    with the same backend is available, so that the number of workers is
+    limited by the scheduler. A worker is stopped after
+    :code:`max_jobs_per_worker` compilations (to release the memory kept by
+    the backend) or when it is idle for more than :code:`idle_timeout` s
+    (checked when a compilation is launched).
+
+    """
+
+    max_jobs_per_worker = 50
+    idle_timeout = 600.0
+
+    def __init__(self):
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _get_idle_worker(self, backend):
+        with self._lock:
+            time_limit = time.monotonic() - self.idle_timeout
+            workers_expired = [
+                worker for worker in self._idle if worker.time_idle < time_limit
+            ]
+            for worker in workers_expired:
+                self._idle.remove(worker)
+            for worker in reversed(self._idle):
+                if worker.backend == backend:
+                    self._idle.remove(worker)
+                    break
+            else:
+                worker = None
+        for worker_expired in workers_expired:
+            worker_expired.close()
+        return worker
+
+    def submit(self, argv, cwd, env, backend, capture_output):
+        """Send a compilation to a worker and return a :class:`WorkerTask`"""
+        worker = self._get_idle_worker(backend)
+        if worker is not None:
+            try:
+                worker.send(argv, cwd, env)
+            except OSError:
+                worker.close()
+                worker = None
+        if worker is None:
+            worker = CompilationWorker(backend)
+            worker.send(argv, cwd, env)
+        return WorkerTask(self, worker, capture_output)
+
+    def release(self, worker):
+        """Make a worker available for other compilations (or stop it)"""
+        if worker.nb_jobs >= self.max_jobs_per_worker or not worker.is_alive():
+            worker.close()
+            return
+        worker.time_idle = time.monotonic()
+        with self._lock:
+            self._idle.append(worker)
+
+    def close(self):
+        """Stop the idle workers"""
+        with self._lock:
+            workers = self._idle
+            self._idle = []
+        for worker in workers:
+            worker.close()
+
+
+worker_pool = CompilationWorkerPool()
+
+
+class CompilationJob:
+    """A compilation command, launched when the scheduler decides it
+
+    Mimics the part of the :class:`subprocess.Popen` API used by
+    :class:`transonic.mpi.ShellProcessMPI` (a job waiting to be launched is
+    considered as alive).
+
+    With :code:`use_worker`, the command has to be of the form
+    :code:`[python, "-m", "transonic_cl.run_backend", *args]` and it is run by
+    a persistent worker of :code:`worker_pool` instead of a new process.
+
+    """
+
+    def __init__(
+        self,
+        words_command,
+        cwd,
+        env,
+        backend,
+        priority=0,
+        parallel=True,
+        use_worker=False,
+    ):
+        self.words_command = words_command
+        self.cwd = cwd
+        self.env = env
+        self.backend = backend
+        self.priority = priority
+        self.parallel = parallel
+        self.use_worker = use_worker
+        self.popen = None
+
+    def start(self):
+        if logger.getEffectiveLevel() <= logging.INFO:
+            stdout = stderr = None
+        else:
+            stdout = stderr = subprocess.PIPE
+
+        if self.use_worker:
+            # the worker environment is the one of its start so the current
+            # environment is always sent
+            env = self.env if self.env is not None else dict(os.environ)
+            self.popen = worker_pool.submit(
+                self.words_command[3:],
+                self.cwd,
+                env,
+                self.backend,
+                capture_output=stdout is not None,
+            )
+            return
+
+        self.popen = subprocess.Popen(
+            self.words_command,
+            cwd=self.cwd,
+            stdout=stdout,
+            stderr=stderr,
+            universal_newlines=True,
+            env=self.env,
+        )
+
+    def poll(self):
+        if self.popen is None:
+            return None
+        return self.popen.poll()
+
+    def wait(self):
+        return self.popen.wait()
+
+    @property
+    def returncode(self):
+        if self.popen is None:
+            return None
+        return self.popen.returncode
+
+    @property
+    def stdout(self):
+        return self.popen.stdout
+
+    @property
+    def stderr(self):
+        return self.popen.stderr
+
+
 class SchedulerPopen:
-    """Limit the number of compilations performed in parallel"""
+    """Limit the number of compilations performed in parallel
+
+    The number of compilations is limited by the number of cores and by the
+    memory: a new compilation is only launched if the estimated memory of the
+    running compilations plus the one of the new compilation fits in the
+    memory available when the scheduler was idle. The memory needed by a
+    compilation is estimated from the peak memory (RSS) of the previous
+    compilations with the same backend.
+
+    The compilations waiting to be launched are served by decreasing priority
+    (and in arrival order for equal priorities).
+
+    With MPI, the compilations are launched by the processes of ranks
+    :code:`mpi.compile_ranks` (only rank 0 by default, one process per node
+    with :code:`TRANSONIC_MPI_DISTRIBUTED_COMPILATION`), in turns. Each of
+    these processes applies the limits for its node.
 
-    deltat = 0.2
+    """
+
+    # default estimations of the memory needed for one compilation (bytes)
+    default_memory_per_backend = {"pythran": 3e9, "cython": 1e9}
+    nb_memory_peaks_kept = 10
 
     def __init__(self, parallel=True):
-        self.progress = Progress(redirect_stdout=False, redirect_stderr=False)
-        if mpi.rank > 0:
+        # used to choose the process launching a compilation
+        self._nb_compilations = itertools.count()
+        if mpi.rank not in mpi.compile_ranks:
             return
         self.processes = []
+        # heap of (-priority, counter, process) for the waiting compilations
+        self._queue = []
+        self._counter = itertools.count()
         if parallel:
-            self.limit_nb_processes = max(1, multiprocessing.cpu_count() // 2)
+            self.limit_nb_processes = max(1, (os.cpu_count() or 1) // 2)
         else:
             self.limit_nb_processes = 1
+        self._condition = threading.Condition()
+        self.memory_budget = None
+        # backend -> peak memory of the last compilations
+        self.memory_peaks = None
+        self._memory_estimations_running = {}
+        self._path_memory_peaks = path_root / "compilation_memory.json"
+
+    @cached_property
+    def progress(self):
+        # created when needed since rich is slow to import
+        from transonic.progress import Progress
+
+        return Progress(redirect_stdout=False, redirect_stderr=False)
+
+    def _load_memory_peaks(self):
+        try:
+            with open(self._path_memory_peaks) as file:
+                self.memory_peaks = json.load(file)
+        except (OSError, ValueError):
+            self.memory_peaks = {}
+
+    def _save_memory_peaks(self):
+        path_tmp = self._path_memory_peaks.with_name(
+            f"{self._path_memory_peaks.name}.{os.getpid()}"
+        )
+        try:
+            with open(path_tmp, "w") as file:
+                json.dump(self.memory_peaks, file)
+            os.replace(path_tmp, self._path_memory_peaks)
+        except OSError:
+            pass
+
+    def estimate_memory(self, backend: str):
+        """Estimate the memory needed for one compilation (in bytes)"""
+        if self.memory_peaks is None:
+            self._load_memory_peaks()
+        peaks = self.memory_peaks.get(backend)
+        if peaks:
+            return max(peaks)
+        return self.default_memory_per_backend.get(backend, 0)
+
+    def _can_launch(self, limit, memory_needed):
+        if not self.processes:
+            # the scheduler is idle: update the memory budget
+            self.memory_budget = get_available_memory()
+            return True
+        if len(self.processes) >= limit:
+            return False
+        if self.memory_budget is None:
+            return True
+        memory_running = sum(self._memory_estimations_running.values())
+        return memory_running + memory_needed <= self.memory_budget
+
+    def _submit(self, process):
+        """Add a compilation to the queue and launch what can be launched"""
+        job = process.process
+        with self._condition:
+            heapq.heappush(
+                self._queue, (-job.priority, next(self._counter), process)
+            )
+            self._launch_queued()
 
-    def block_until_avail(self, parallel=True):
-        if mpi.rank == 0:
-            if parallel:
+    def _launch_queued(self):
+        """Launch the queued compilations (has to be called with the lock)"""
+        while self._queue:
+            job = self._queue[0][2].process
+            if job.parallel:
                 limit = self.limit_nb_processes
             else:
                 limit = 1
+            if not self._can_launch(limit, self.estimate_memory(job.backend)):
+                break
+            _, _, process = heapq.heappop(self._queue)
+            job.start()
+            self._add_process(process, job.backend)
+
+    def set_priority(self, process, priority, only_raise=False):
+        """Change the priority of a compilation waiting to be launched
+
+        Return False if the compilation is not waiting (already launched).
+
+        """
+        if mpi.rank != process.root:
+            return False
+        with self._condition:
+            for index, (_, counter, process_queued) in enumerate(self._queue):
+                if process_queued is process:
+                    break
+            else:
+                return False
+            job = process.process
+            if only_raise and priority <= job.priority:
+                return True
+            job.priority = priority
+            self._queue[index] = (-priority, counter, process)
+            heapq.heapify(self._queue)
+            self._launch_queued()
+        return True
 
-            while len(self.processes) >= limit:
-                time.sleep(self.deltat)
-                self.processes = [
-                    process
-                    for process in self.processes
-                    if process.is_alive_root()
-                ]
-
-        mpi.barrier(timeout=None)
+    def _add_process(self, process, backend):
+        """Register a launched process and reap it in a thread"""
+        self.processes.append(process)
+        self._memory_estimations_running[process] = self.estimate_memory(backend)
+        thread = threading.Thread(
+            target=self._reap, args=(process, backend), daemon=True
+        )
+        thread.start()
+
+    def _reap(self, process, backend):
+        popen = process.process.popen
+        memory_peak = None
+        waitpid_lock = getattr(popen, "_waitpid_lock", None)
+        if hasattr(os, "wait4") and waitpid_lock is not None:
+            # Popen.poll returns None while we hold this lock
+            with waitpid_lock:
+                try:
+                    _, status, rusage = os.wait4(popen.pid, 0)
+                except ChildProcessError:
+                    pass
+                else:
+                    popen.returncode = os.waitstatus_to_exitcode(status)
+                    # ru_maxrss includes the waited descendants (compilers)
+                    memory_peak = rusage.ru_maxrss
+                    if sys.platform != "darwin":
+                        memory_peak *= 1024
+        popen.wait()
+        if memory_peak is None:
+            # compilation run by a worker
+            memory_peak = getattr(popen, "memory_peak", None)
+        # log potential errors
+        process.is_alive_root()
+
+        with self._condition:
+            self.processes.remove(process)
+            del self._memory_estimations_running[process]
+            if memory_peak:
+                self._record_memory_peak(backend, memory_peak)
+            self._launch_queued()
+            self._condition.notify_all()
+
+    def _record_memory_peak(self, backend, memory_peak):
+        self._load_memory_peaks()
+        peaks = self.memory_peaks.setdefault(backend, [])
+        peaks.append(memory_peak)
+        del peaks[: -self.nb_memory_peaks_kept]
+        self._save_memory_peaks()
 
     def wait_for_all_extensions(self):
         """Wait until all compilation processes are done"""
-        if mpi.rank == 0:
-            total = len(scheduler.processes)
-            task = self.progress.add_task("Wait for all extensions", total=total)
-
-            while self.processes:
-                time.sleep(self.deltat)
-                self.processes = [
-                    process
-                    for process in self.processes
-                    if process.is_alive_root()
-                ]
-                self.progress.update(task, completed=total - len(self.processes))
+        if mpi.rank in mpi.compile_ranks:
+            with self._condition:
+                total = len(self.processes) + len(self._queue)
+                if mpi.rank == 0:
+                    task = self.progress.add_task(
+                        "Wait for all extensions", total=total
+                    )
+                while self.processes or self._queue:
+                    self._condition.wait()
+                    if mpi.rank == 0:
+                        self.progress.update(
+                            task,
+                            completed=total
+                            - len(self.processes)
+                            - len(self._queue),
+                        )
 
         mpi.barrier(timeout=None)
 
@@ -120,14 +695,15 @@ class SchedulerPopen:
         str_accelerator_flags: Optional[str] = None,
         parallel=True,
         force=True,
+        priority=0,
     ):
         if not force:
             path_out = path.with_name(name_ext_file)
             if not has_to_build(path_out, path):
                 logger.warning(
                     f"Do not {backend}ize {path} because it seems up-to-date "
-                    "(but the compilation options may have changed). "
-                    "You can force the compilation with the option -f."
+                    "(the name of the extension depends on the compilation "
+                    "options). You can force the compilation with the option -f."
                 )
                 return
 
@@ -140,26 +716,12 @@ class SchedulerPopen:
             if mpi.rank == 0:
                 self.progress.update(task, advance=value)
 
-        if str_accelerator_flags is not None:
-            flags = str_accelerator_flags.strip().split()
-        else:
-            flags = []
-
-        def update_flags(flag):
-            if flag not in flags:
-                flags.append(flag)
-
-        if native and os.name != "nt":
-            update_flags("-march=native")
-
-        if xsimd:
-            update_flags("-DUSE_XSIMD")
+        flags = make_accelerator_flags(
+            native, xsimd, openmp, str_accelerator_flags
+        )
 
-        if openmp:
-            update_flags("-fopenmp")
-
-        if logger.is_enable_for("debug"):
-            update_flags("-v")
+        if logger.is_enable_for("debug") and "-v" not in flags:
+            flags.append("-v")
 
         if logger.getEffectiveLevel() < logging.INFO:
             env = dict(os.environ, TRANSONIC_DEBUG="1")
@@ -182,31 +744,33 @@ class SchedulerPopen:
         cwd = path.parent
 
         advance(10)
-        self.block_until_avail(parallel)
-        advance(20)
 
-        process = None
-        if mpi.rank == 0:
-            if logger.getEffectiveLevel() <= logging.INFO:
-                stdout = stderr = None
-            else:
-                stdout = stderr = subprocess.PIPE
+        root = mpi.compile_ranks[
+            next(self._nb_compilations) % len(mpi.compile_ranks)
+        ]
+        if root != 0:
+            # the files written by the process 0 have to be visible by root
+            mpi.barrier(timeout=None)
 
-            process = subprocess.Popen(
+        job = None
+        if mpi.rank == root:
+            job = CompilationJob(
                 words_command,
-                cwd=cwd,
-                stdout=stdout,
-                stderr=stderr,
-                universal_newlines=True,
-                env=env,
+                cwd,
+                env,
+                backend,
+                priority=priority,
+                parallel=parallel,
+                use_worker=use_compile_workers,
             )
 
-        process = mpi.ShellProcessMPI(process)
+        process = mpi.ShellProcessMPI(job, root=root)
 
-        if mpi.rank == 0:
-            self.processes.append(process)
+        if mpi.rank == root:
+            self._submit(process)
 
-        advance(70)
+        mpi.barrier(timeout=None)
+        advance(90)
 
         return process
 
@@ -229,6 +793,7 @@ def compile_extension(
     str_accelerator_flags: Optional[str] = None,
     parallel=False,
     force=False,
+    priority=0,
 ):
     if not isinstance(path, Path):
         path = Path(path)
@@ -244,4 +809,5 @@ def compile_extension(
         str_accelerator_flags=str_accelerator_flags,
         parallel=parallel,
         force=force,
+        priority=priority,
     )
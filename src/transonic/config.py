@@ -4,7 +4,8 @@
 Transonic is sensible to the environment variables:
 
 - :code:`TRANSONIC_DIR` can be set to control where the cached files are
-  saved.
+  saved (including the flags of the last compilation of the ahead-of-time
+  extensions, in :code:`$TRANSONIC_DIR/aot_builds`).
 
 - :code:`TRANSONIC_COMPILE_AT_IMPORT` can be set to enable a mode for which
   Transonic compiles at import time the Pythran file associated with the
@@ -17,8 +18,65 @@ Transonic is sensible to the environment variables:
 - :code:`FLUID_COMPILE_JIT` can be set to false to disable the
   compilation of jited functions. This can be useful for unittests.
 
+- :code:`TRANSONIC_JIT_INCREMENTAL` can be set to true to compile each new
+  signature of jitted functions in its own extension instead of recompiling
+  all the signatures already seen.
+
+- :code:`TRANSONIC_JIT_HOT_CALLS` and :code:`TRANSONIC_JIT_HOT_TIME` set the
+  number of calls (default 1) and the cumulative time in s (default infinite)
+  spent in the Python function for new types after which a jitted function is
+  compiled for these types.
+
+- :code:`TRANSONIC_JIT_LAZY` can be set to true to defer the analysis of the
+  modules using :code:`@jit` (and the generation of the files) to the first
+  call of their jitted functions, or to "background" to do it in a background
+  thread just after the decoration (not with MPI).
+
+- :code:`TRANSONIC_TYPEOF_FULL_CHECK` can be set to true so that
+  :func:`transonic.typing.typeof` checks that all elements of large lists,
+  dicts and sets are of the same type (by default, only a sample of the
+  elements is checked).
+
+- :code:`TRANSONIC_CACHE_MAX_SIZE` sets the maximum size of the cache of the
+  jitted functions (for example "10G", default no limit). See
+  :mod:`transonic.cache`.
+
+- :code:`TRANSONIC_NO_ANALYSIS_CACHE` can be set to disable the persistent
+  cache of the analyses of the modules (see :mod:`transonic.analyses.cache`).
+
+- :code:`TRANSONIC_FORMAT_CODE` can be set to false to skip the formatting of
+  the generated code (with black or autopep8). The formatted codes are cached
+  in :code:`$TRANSONIC_DIR/formatted`.
+
+- :code:`TRANSONIC_COMPILE_WORKERS` can be set to false to launch a new
+  interpreter for each compilation instead of sending the compilations to
+  persistent workers (see :class:`transonic.compiler.CompilationWorkerPool`).
+
+- :code:`TRANSONIC_CXX_LAUNCHER` sets the compiler cache used for the C++
+  compilations of the Pythran extensions (for example :code:`ccache`, or
+  "auto" for :code:`ccache` or :code:`sccache` if they are found). By default,
+  no compiler cache is used.
+
+- :code:`TRANSONIC_PYTHRAN_PCH` can be set to true to compile the Pythran
+  extensions with a precompiled header of the core pythonic includes (gcc and
+  clang). Only with a compiler cache or a precompiled header, the Pythran
+  compilations are split in C++ generation and C++ compilation (see
+  :mod:`transonic_cl.cxx_launcher`). Otherwise, Pythran compiles the
+  extensions in one invocation.
+
 - :code:`TRANSONIC_MPI_TIMEOUT` sets the MPI timeout (default to 5 s).
 
+- :code:`TRANSONIC_FORCE_MPI` can be set to use MPI even if no environment
+  variable of a known MPI launcher is detected. See :mod:`transonic.mpi`.
+
+- :code:`TRANSONIC_MPI_NODE_LOCAL_DIR` can be set to a node-local directory
+  (for example :code:`/dev/shm`) to load the extensions from node-local copies
+  in MPI jobs. See :mod:`transonic.mpi`.
+
+- :code:`TRANSONIC_MPI_DISTRIBUTED_COMPILATION` can be set to true to
+  distribute the compilations over the nodes of MPI jobs (one process per node
+  launches compilations). See :mod:`transonic.mpi`.
+
 By the way, for performance, it is important to configure Pythran with a file
 `~/.pythranrc
 <https://pythran.readthedocs.io/en/latest/MANUAL.html#customizing-your-pythranrc>`_:
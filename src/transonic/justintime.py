@@ -28,7 +28,8 @@ Serge talked about @jit (see https://gist.github.com/serge-sans-paille/28c86d2b3
 
 It's indeed a good idea!
 
-- At import time, we create one .py file per jit function.
+- At import time, we create one .py file per jit function (with
+  :code:`TRANSONIC_JIT_LAZY`, at the first call of the function).
 
 - At run time, we create (and complete when needed) a corresponding
   .pythran file with signature(s).
@@ -38,8 +39,16 @@ It's indeed a good idea!
   * at the first call, get the types, create the .pythran file and call
     Pythran.
 
-  * then, try to call the pythran function and if it fails with
-    a Pythran TypeError, correct the .pythran file and recompile.
+  * then, compute a cheap key from the types of the arguments and look for
+    it in a dispatch table so that known types directly call the compiled
+    function.
+
+  * for new types, try once to call the pythran function and if it fails
+    with a Pythran TypeError, correct the .pythran file and recompile.
+
+  * if the compilation fails, the signature is recorded (see
+    :class:`transonic.cache.FailureIndex`) and the Python function is then
+    directly used for these types.
 
 Note: During the compilation (the "warmup" of the JIT), the Python function is
 used.
@@ -50,19 +59,24 @@ import inspect
 import itertools
 import os
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
 from functools import wraps
 from pathlib import Path
+from shutil import copyfile
 
-from transonic.analyses.justintime import analysis_jit
 from transonic.aheadoftime import TransonicTemporaryJITMethod
 from transonic.backends import backends, get_backend_name_module
+from transonic.cache import is_known_failure, record_failure, record_use
+from transonic.compiler import make_accelerator_flags, make_build_fingerprint
 from transonic.config import has_to_replace, backend_default
 from transonic.log import logger
 from transonic import mpi
+from transonic.typing import compute_type_key
 from transonic.util import (
     get_module_name,
-    has_to_build,
     path_root,
     get_info_from_ipython,
     make_hex,
@@ -81,6 +95,31 @@ modules_backends = {backend_name: {} for backend_name in backends.keys()}
 modules = modules_backends[backend_default]
 
 _COMPILE_JIT = strtobool(os.environ.get("TRANSONIC_COMPILE_JIT", "True"))
+_JIT_INCREMENTAL = strtobool(os.environ.get("TRANSONIC_JIT_INCREMENTAL", "False"))
+_JIT_HOT_CALLS = int(os.environ.get("TRANSONIC_JIT_HOT_CALLS", "1"))
+_JIT_HOT_TIME = float(os.environ.get("TRANSONIC_JIT_HOT_TIME", "inf"))
+
+_JIT_LAZY = os.environ.get("TRANSONIC_JIT_LAZY", "False").lower()
+if _JIT_LAZY == "background":
+    if mpi.nb_proc > 1:
+        # the preparation involves MPI collective operations
+        _JIT_LAZY = "call"
+else:
+    _JIT_LAZY = "call" if strtobool(_JIT_LAZY) else ""
+
+# the analyses modify global objects so they are not done concurrently
+_lock_analyses = threading.Lock()
+_executor_background = None
+
+
+def _submit_background(func, *args):
+    """Run a function in the background thread used for lazy jit"""
+    global _executor_background
+    if _executor_background is None:
+        _executor_background = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="transonic_jit"
+        )
+    return _executor_background.submit(func, *args)
 
 
 def set_compile_jit(value):
@@ -112,37 +151,90 @@ class ModuleJIT:
         self.used_functions = {}
         self.jit_functions = {}
 
-        (
-            jitted_dicts,
-            codes_dependance,
-            codes_dependance_classes,
-            code_ext,
-            special,
-        ) = analysis_jit(self.get_source(), self.pathfile, backend_name)
-
-        self.info_analysis = {
-            "jitted_dicts": jitted_dicts,
-            "codes_dependance": codes_dependance,
-            "codes_dependance_classes": codes_dependance_classes,
-            "special": special,
-        }
-
-        self.backend = backend = backends[backend_name]
-        path_jit = mpi.Path(backend.jit.path_base)
-        path_jit_class = mpi.Path(backend.jit.path_class)
-
-        # TODO: check if these files have to be written here...
-        # Write exterior code for functions
-        for file_name, code in code_ext["function"].items():
-            path_ext = path_jit / self.module_name.replace(".", os.path.sep)
-            path_ext_file = path_ext / (file_name + ".py")
-            write_if_has_to_write(path_ext_file, format_str(code), logger.info)
-
-        # Write exterior code for classes
-        for file_name, code in code_ext["class"].items():
-            path_ext = path_jit_class / self.module_name.replace(".", os.path.sep)
-            path_ext_file = path_ext / (file_name + ".py")
-            write_if_has_to_write(path_ext_file, format_str(code), logger.info)
+        self.backend = backends[backend_name]
+        relative_path = self.module_name.replace(".", os.path.sep)
+        self.path_jit_module = (
+            mpi.Path(self.backend.jit.path_base) / relative_path
+        )
+        self._snapshot = None
+
+        self._info_analysis = None
+        if not _JIT_LAZY:
+            self.analyse()
+
+    @property
+    def info_analysis(self):
+        """Results of the analysis of the module (computed if needed)"""
+        if self._info_analysis is None:
+            self.analyse()
+        return self._info_analysis
+
+    def analyse(self):
+        """Analyse the module and write the exterior code files
+
+        With :code:`TRANSONIC_JIT_LAZY`, it is called only when needed (at the
+        first call of a jitted function).
+
+        """
+        from transonic.analyses.justintime import analysis_jit
+
+        with _lock_analyses:
+            if self._info_analysis is not None:
+                return
+            (
+                jitted_dicts,
+                codes_dependance,
+                codes_dependance_classes,
+                code_ext,
+                special,
+            ) = analysis_jit(self.get_source(), self.pathfile, self.backend_name)
+
+            path_jit = mpi.Path(self.backend.jit.path_base)
+            path_jit_class = mpi.Path(self.backend.jit.path_class)
+            relative_path = self.module_name.replace(".", os.path.sep)
+
+            # TODO: check if these files have to be written here...
+            # Write exterior code for functions
+            for file_name, code in code_ext["function"].items():
+                path_ext_file = path_jit / relative_path / (file_name + ".py")
+                write_if_has_to_write(
+                    path_ext_file, format_str(code), logger.info
+                )
+
+            # Write exterior code for classes
+            for file_name, code in code_ext["class"].items():
+                path_ext_file = (
+                    path_jit_class / relative_path / (file_name + ".py")
+                )
+                write_if_has_to_write(
+                    path_ext_file, format_str(code), logger.info
+                )
+
+            self._info_analysis = {
+                "jitted_dicts": jitted_dicts,
+                "codes_dependance": codes_dependance,
+                "codes_dependance_classes": codes_dependance_classes,
+                "special": special,
+            }
+
+    def get_snapshot(self):
+        """Snapshot of the files of the module in the JIT directory
+
+        It is computed once for all the jitted functions of the module (only
+        one MPI collective operation) and reset when an extension is
+        compiled.
+
+        """
+        if self._snapshot is None:
+            if mpi.rank == 0:
+                self.path_jit_module.mkdir(parents=True, exist_ok=True)
+            self._snapshot = mpi.FileSystemSnapshot(
+                directories=[self.path_jit_module], paths=[self.pathfile]
+            )
+        return self._snapshot
+
+    def reset_snapshot(self):
+        self._snapshot = None
 
     def get_source(self):
         if self.is_dummy_file:
@@ -184,10 +276,60 @@ def _get_module_jit(backend_name: str = None, depth_frame: int = 2, frame=None):
         return ModuleJIT(backend_name=backend_name, frame=frame)
 
 
-def jit(func=None, backend: str = None, native=False, xsimd=False, openmp=False):
-    """Decorator to record that the function has to be jit compiled"""
+def jit(
+    func=None,
+    backend: str = None,
+    native=False,
+    xsimd=False,
+    openmp=False,
+    incremental: bool = None,
+    hot_calls: int = None,
+    hot_time: float = None,
+    priority: float = None,
+):
+    """Decorator to record that the function has to be jit compiled
+
+    Parameters
+    ----------
+
+    incremental : bool (optional)
+
+      If True, each new signature is compiled in its own extension (a "shard")
+      instead of recompiling all the signatures already seen. The default
+      value is given by the environment variable
+      :code:`TRANSONIC_JIT_INCREMENTAL`.
+
+    hot_calls : int (optional)
+
+      Number of calls with new types after which the compilation is launched
+      (default given by :code:`TRANSONIC_JIT_HOT_CALLS`, 1). Before, the
+      Python function is used.
+
+    hot_time : float (optional)
+
+      Cumulative time (in s) spent in the Python function for new types after
+      which the compilation is launched (default given by
+      :code:`TRANSONIC_JIT_HOT_TIME`, infinite). Not used with MPI.
+
+    priority : float (optional)
+
+      Priority of the compilations of this function relative to the other
+      compilations waiting to be launched (larger is launched first). By
+      default, the number of calls with the new types is used.
+
+    """
     frame = get_frame(1)
-    decor = JIT(frame, backend=backend, native=native, xsimd=xsimd, openmp=openmp)
+    decor = JIT(
+        frame,
+        backend=backend,
+        native=native,
+        xsimd=xsimd,
+        openmp=openmp,
+        incremental=incremental,
+        hot_calls=hot_calls,
+        hot_time=hot_time,
+        priority=priority,
+    )
     if callable(func):
         return decor(func)
     else:
@@ -198,7 +340,16 @@ class JIT:
     """Decorator used internally by the public jit decorator"""
 
     def __init__(
-        self, frame, backend: str, native=False, xsimd=False, openmp=False
+        self,
+        frame,
+        backend: str,
+        native=False,
+        xsimd=False,
+        openmp=False,
+        incremental=None,
+        hot_calls=None,
+        hot_time=None,
+        priority=None,
     ):
         self.mod = _get_module_jit(backend, frame=frame)
 
@@ -206,11 +357,42 @@ class JIT:
         self.native = native
         self.xsimd = xsimd
         self.openmp = openmp
+        if incremental is None:
+            incremental = _JIT_INCREMENTAL
+        # only meaningful for backends using headers (Pythran and Cython)
+        self.incremental = incremental and bool(self.backend.suffix_header)
+
+        if hot_calls is None:
+            hot_calls = _JIT_HOT_CALLS
+        if hot_time is None:
+            hot_time = _JIT_HOT_TIME
+        if mpi.nb_proc > 1 and hot_time != float("inf"):
+            # the decision to compile has to be the same for all processes
+            logger.warning("hot_time is not used with MPI")
+            hot_time = float("inf")
+        self.hot_calls = hot_calls
+        self.hot_time = hot_time
+        self.priority = priority
         self._decorator_no_arg = False
 
+        self._type_collector = None
+        self._lock_preparation = threading.Lock()
+
         self.backend_func = None
+        # compiled functions (one per extension, the most recent first)
+        self.backend_funcs = []
         self.compiling = False
         self.process = None
+        # signature compiled and previous header (restored if the
+        # compilation fails)
+        self._signature_compiling = None
+        self._header_code_old = None
+        # type key -> function (backend or Python function during compilation
+        # or for types whose compilation failed)
+        self.dispatch_table = {}
+        # type key -> [number of calls, cumulative time] for types not
+        # supported by the compiled functions
+        self.calls_stats = {}
 
     def __call__(self, func):
         if not has_to_replace:
@@ -228,28 +410,64 @@ class JIT:
             )
             return func
 
+        self.mod.jit_functions[func.__name__] = self
+
+        if _JIT_LAZY:
+            return self._make_lazy_function(func)
+        return self._make_type_collector(func)
+
+    def _make_lazy_function(self, func):
+        """Return a function preparing the jitted function at its first call
+
+        The analysis of the module, the generation of the files and the search
+        of the extensions are done at the first call (or in a background
+        thread). Then, the name of the function in its module is bound to the
+        jitted function.
+
+        """
+        future = None
+        if _JIT_LAZY == "background":
+            future = _submit_background(self._make_type_collector, func)
+
+        @wraps(func)
+        def lazy_function(*args, **kwargs):
+            type_collector = self._type_collector
+            if type_collector is None:
+                with self._lock_preparation:
+                    if self._type_collector is None:
+                        if future is None:
+                            self._type_collector = self._make_type_collector(func)
+                        else:
+                            self._type_collector = future.result()
+                type_collector = self._type_collector
+                namespace = func.__globals__
+                if namespace.get(func.__name__) is lazy_function:
+                    namespace[func.__name__] = type_collector
+            return type_collector(*args, **kwargs)
+
+        return lazy_function
+
+    def _make_type_collector(self, func):
+        """Prepare the jitted function and return the function called by the
+        user"""
         func_name = func.__name__
 
         backend = self.backend
         mod = self.mod
-        mod.jit_functions[func_name] = self
-        module_name = mod.module_name
 
-        path_jit = mpi.Path(backend.jit.path_base)
-        path_backend = path_jit / module_name.replace(".", os.path.sep)
+        # all ranks get the state of the files with one collective operation
+        snapshot = mod.get_snapshot()
 
-        if mpi.rank == 0:
-            path_backend.mkdir(parents=True, exist_ok=True)
-        mpi.barrier()
-
-        path_backend = (path_backend / func_name).with_suffix(".py")
+        path_backend = (mod.path_jit_module / func_name).with_suffix(".py")
         if backend.suffix_header:
             path_backend_header = path_backend.with_suffix(backend.suffix_header)
         else:
             path_backend_header = False
 
-        if path_backend.exists():
-            if not mod.is_dummy_file and has_to_build(path_backend, mod.pathfile):
+        if snapshot.exists(path_backend):
+            if not mod.is_dummy_file and snapshot.has_to_build(
+                path_backend, mod.pathfile
+            ):
                 has_to_write = True
             else:
                 has_to_write = False
@@ -276,8 +494,10 @@ class JIT:
         hex_src = None
         name_mod = None
         if mpi.rank == 0:
-            # hash from src (to produce the extension name)
-            hex_src = make_hex(src)
+            # hash from src, compilation options and toolchain (to produce
+            # the extension name)
+            flags = make_accelerator_flags(self.native, self.xsimd, self.openmp)
+            hex_src = make_hex(src + make_build_fingerprint(backend.name, flags))
             name_mod = ".".join(
                 path_backend.absolute()
                 .relative_to(path_root)
@@ -285,21 +505,46 @@ class JIT:
                 .parts
             )
 
-        hex_src = mpi.bcast(hex_src)
-        name_mod = mpi.bcast(name_mod)
+        hex_src, name_mod = mpi.bcast((hex_src, name_mod))
 
-        def backenize_with_new_header(arg_types="no types"):
+        def backenize_with_new_header(
+            arg_types="no types", nb_calls=0, signature=None
+        ):
+            mod.reset_snapshot()
             header_object = backend.jit.make_new_header(func, arg_types)
-
-            header_code = backend.jit.merge_old_and_new_header(
-                path_backend_header, header_object, func
-            )
-            backend.jit.write_new_header(
-                path_backend_header, header_code, arg_types
-            )
+            self._signature_compiling = signature
+
+            if self.incremental and path_backend_header:
+                # only the new signature is compiled, in a new extension
+                header_code = backend.jit.make_header_code(header_object)
+                hex_header = make_hex(header_code)
+                path_input = path_backend.with_name(
+                    f"{func_name}_shard_{hex_header}.py"
+                )
+                if mpi.rank == 0:
+                    copyfile(path_backend, path_input)
+                backend.jit.write_new_header(
+                    path_input.with_suffix(backend.suffix_header),
+                    header_code,
+                    arg_types,
+                )
+            else:
+                self._header_code_old = None
+                if mpi.rank == 0 and path_backend_header:
+                    try:
+                        self._header_code_old = path_backend_header.read_text()
+                    except FileNotFoundError:
+                        pass
+                header_code = backend.jit.merge_old_and_new_header(
+                    path_backend_header, header_object, func
+                )
+                backend.jit.write_new_header(
+                    path_backend_header, header_code, arg_types
+                )
+                hex_header = make_hex(header_code)
+                path_input = path_backend
 
             # compute the new path of the extension
-            hex_header = make_hex(header_code)
             # if mpi.nb_proc > 1:
             #     hex_header0 = mpi.bcast(hex_header)
             #     assert hex_header0 == hex_header
@@ -313,79 +558,185 @@ class JIT:
             )
             self.path_extension = path_backend.with_name(name_ext_file)
 
+            if self.priority is None:
+                priority = nb_calls
+            else:
+                priority = self.priority
+
             self.compiling, self.process = backend.compile_extension(
-                path_backend,
+                path_input,
                 name_ext_file,
                 native=self.native,
                 xsimd=self.xsimd,
                 openmp=self.openmp,
+                priority=priority,
             )
 
             # for backend like numba
             if not self.compiling:
                 backend_module = import_from_path(self.path_extension, name_mod)
                 assert backend.check_if_compiled(backend_module)
-                self.backend_func = getattr(backend_module, func_name)
+                record_use(self.path_extension)
+                self._add_backend_func(getattr(backend_module, func_name))
 
-        ext_files = None
-        if mpi.rank == 0:
-            glob_name_ext_file = (
-                func_name + "_" + hex_src + "_*" + backend.suffix_extension
-            )
-            ext_files = list(
-                mpi.PathSeq(path_backend).parent.glob(glob_name_ext_file)
-            )
-        ext_files = mpi.bcast(ext_files)
+        ext_files = snapshot.glob(
+            mod.path_jit_module,
+            func_name + "_" + hex_src + "_*" + backend.suffix_extension,
+        )
 
         if not ext_files:
             if has_to_compile_at_import() and _COMPILE_JIT:
                 backenize_with_new_header()
-            self.backend_func = None
         else:
-            path_ext = max(ext_files, key=lambda p: p.stat().st_ctime)
-            backend_module = import_from_path(path_ext, name_mod)
-            self.backend_func = getattr(backend_module, func_name)
+            ext_files.sort(key=snapshot.change_time)
+            if not self.incremental:
+                # the most recent extension contains all signatures
+                ext_files = ext_files[-1:]
+            for path_ext in ext_files:
+                backend_module = import_from_path(path_ext, name_mod)
+                record_use(path_ext)
+                self._add_backend_func(getattr(backend_module, func_name))
+
+        def forget_waiting_types():
+            """The types for which we were waiting have to be checked again"""
+            for key, value in list(self.dispatch_table.items()):
+                if value is func:
+                    del self.dispatch_table[key]
+            # also the types first seen during the compilation (which have
+            # calls statistics but no dispatch entry)
+            for key in list(self.calls_stats):
+                if key not in self.dispatch_table:
+                    del self.calls_stats[key]
+
+        def on_compilation_done():
+            self.compiling = False
+            time.sleep(0.1)
+            backend_module = import_from_path(self.path_extension, name_mod)
+            assert backend.check_if_compiled(backend_module)
+            record_use(self.path_extension)
+            backend_func_old = self.backend_func
+            self._add_backend_func(getattr(backend_module, func_name))
+            if not self.incremental:
+                # the new extension also supports the types dispatched to the
+                # previous one
+                for key, value in list(self.dispatch_table.items()):
+                    if value is backend_func_old:
+                        self.dispatch_table[key] = self.backend_func
+            forget_waiting_types()
+
+        def on_compilation_failed(returncode):
+            from transonic_cl.run_backend import exit_code_retry
+
+            self.compiling = False
+            signature = self._signature_compiling
+            logger.error(
+                f"Compilation of `{func_name}` failed"
+                + (f" for signature `{signature}`" if signature else "")
+                + ". The Python function is used for these types."
+            )
+            # interrupted compilations (killed or dead worker) are retried
+            if signature is not None and 0 < returncode != exit_code_retry:
+                # next calls with these types do not trigger compilations
+                record_failure(hex_src, signature, backend.name, path_backend)
+            if mpi.rank == 0 and not self.incremental and path_backend_header:
+                # remove the failing signature from the header
+                if self._header_code_old is None:
+                    try:
+                        os.remove(path_backend_header)
+                    except FileNotFoundError:
+                        pass
+                else:
+                    path_backend_header.write_text(self._header_code_old)
+            forget_waiting_types()
 
         # this is the function that will be called by the user
         @wraps(func)
         def type_collector(*args, **kwargs):
-            if self.compiling:
-                if not self.process.is_alive(raise_if_error=True):
-                    self.compiling = False
-                    time.sleep(0.1)
-                    backend_module = import_from_path(
-                        self.path_extension, name_mod
-                    )
-                    assert backend.check_if_compiled(backend_module)
-                    self.backend_func = getattr(backend_module, func_name)
-
-            try:
-                return self.backend_func(*args, **kwargs)
-            except TypeError as err:
-                # need to compiled or recompile
-                error = False
-                if self.backend_func:
-                    error = str(err)
-                    if (
-                        error.startswith("Invalid call to pythranized function `")
-                        and " (reshaped)" in error
-                    ):
-                        logger.error(
-                            "It seems that a jitted Pythran function has been called "
-                            'with a "reshaped" array which is not supported by Pythran.'
-                        )
-                        raise
-                    logger.debug(error)
+            if self.compiling and not self.process.is_alive():
+                returncode = self.process.returncode
+                if returncode:
+                    on_compilation_failed(returncode)
+                else:
+                    on_compilation_done()
+
+            key = tuple(map(compute_type_key, args))
+            if kwargs:
+                key += tuple(
+                    (name, compute_type_key(value))
+                    for name, value in kwargs.items()
+                )
 
-            if self.compiling or not _COMPILE_JIT:
+            func_to_call = self.dispatch_table.get(key)
+            if func_to_call is func:
+                return func(*args, **kwargs)
+            if func_to_call is not None:
+                try:
+                    return func_to_call(*args, **kwargs)
+                except backend.exceptions_wrong_types as err:
+                    if not backend.is_wrong_types_error(err):
+                        raise
+                    # the keys of the containers are computed from their
+                    # first element so the other elements can be of other
+                    # types
+                    self.dispatch_table.pop(key, None)
+
+            return dispatch_new_types(key, args, kwargs)
+
+        def dispatch_new_types(key, args, kwargs):
+            """Slow path for types not yet in the dispatch table"""
+            stats = self.calls_stats.get(key)
+            if stats is None:
+                for backend_func in self.backend_funcs:
+                    try:
+                        result = backend_func(*args, **kwargs)
+                    except backend.exceptions_wrong_types as err:
+                        if not backend.is_wrong_types_error(err):
+                            raise
+                        # need to compiled or recompile
+                        error = str(err)
+                        if (
+                            error.startswith(
+                                "Invalid call to pythranized function `"
+                            )
+                            and " (reshaped)" in error
+                        ):
+                            logger.error(
+                                "It seems that a jitted Pythran function has been called "
+                                'with a "reshaped" array which is not supported by Pythran.'
+                            )
+                            raise
+                        logger.debug(error)
+                    else:
+                        self.dispatch_table[key] = backend_func
+                        return result
+                # these types are not supported by the compiled functions
+                stats = self.calls_stats[key] = [0, 0.0]
+
+            if not _COMPILE_JIT:
                 return func(*args, **kwargs)
 
-            if (
-                self.backend_func
-                and error
-                and error.startswith("Invalid call to pythranized function `")
+            stats[0] += 1
+            if self.compiling or (
+                stats[0] < self.hot_calls and stats[1] < self.hot_time
             ):
-                logger.debug(error)
+                # the Python function is used (and timed) while the types
+                # are not hot enough to be compiled
+                time_start = perf_counter()
+                result = func(*args, **kwargs)
+                stats[1] += perf_counter() - time_start
+                return result
+
+            arg_types = [
+                backend.jit.compute_typename_from_object(arg)
+                for arg in itertools.chain(args, kwargs.values())
+            ]
+            signature = f"{func_name}({', '.join(arg_types)})"
+            if is_known_failure(hex_src, signature):
+                # the compilation already failed for these types
+                self.dispatch_table[key] = func
+                return func(*args, **kwargs)
+
+            if self.backend_func:
                 logger.info(
                     f"{backend.name_capitalized} function `{func_name}` called with new types."
                 )
@@ -393,12 +744,22 @@ class JIT:
                     "Transonic is going to recompute the function for the new types."
                 )
 
-            arg_types = [
-                backend.jit.compute_typename_from_object(arg)
-                for arg in itertools.chain(args, kwargs.values())
-            ]
-
-            backenize_with_new_header(arg_types)
+            backenize_with_new_header(
+                arg_types, nb_calls=stats[0], signature=signature
+            )
+            if self.compiling:
+                # the Python function is used until the end of the compilation
+                self.dispatch_table[key] = func
+            else:
+                # the extension is already available (for example with Numba)
+                del self.calls_stats[key]
             return func(*args, **kwargs)
 
         return type_collector
+
+    def _add_backend_func(self, backend_func):
+        self.backend_func = backend_func
+        if self.incremental:
+            self.backend_funcs.insert(0, backend_func)
+        else:
+            self.backend_funcs = [backend_func]
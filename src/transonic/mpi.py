@@ -1,16 +1,75 @@
 """Minimalist MPI module
 ========================
 
+The collective operations (:code:`bcast` and :code:`barrier`) are
+non-blocking MPI operations waited with a timeout (environment variable
+:code:`TRANSONIC_MPI_TIMEOUT`).
+
+MPI (i.e. mpi4py) is only used if mpi4py is already imported or if an
+environment variable set by the MPI launchers is detected (for example
+:code:`OMPI_COMM_WORLD_SIZE` or :code:`PMI_SIZE`, see
+:code:`_env_vars_mpi_launchers`). For other launchers, the environment variable
+:code:`TRANSONIC_FORCE_MPI` can be set. Sequential processes thus do not pay
+the import of mpi4py and the initialization of MPI.
+
+If the environment variable :code:`TRANSONIC_MPI_NODE_LOCAL_DIR` is set (for
+example to :code:`/dev/shm` or :code:`$TMPDIR`), the extensions are copied by
+one process per node in this node-local directory and the processes of the
+node load them from there (see :func:`localize_extension`). This avoids that
+thousands of processes load the same files from a parallel file system. To
+test this mode on one machine, :code:`TRANSONIC_MPI_FAKE_NODE_SIZE` can be set
+to the number of processes of fake nodes.
+
+If :code:`TRANSONIC_MPI_DISTRIBUTED_COMPILATION` is set to true, the
+compilations are distributed over the nodes: they are launched by one process
+per node (:code:`compile_ranks`), each one limiting the number of
+compilations running on its node.
+
+Internal API
+------------
+
+.. autoclass:: FileSystemSnapshot
+   :members:
+
+.. autofunction:: localize_extension
+
+
 """
 
+import fnmatch
+import getpass
+import hashlib
 import os
+import shutil
+import sys
 from pathlib import Path
 from time import time, sleep
 
 mpi_timeout = float(os.environ.get("TRANSONIC_MPI_TIMEOUT", "5"))
 
 
-if "TRANSONIC_NO_MPI" in os.environ:
+# environment variables set by the MPI launchers (mpirun, mpiexec, srun, ...)
+_env_vars_mpi_launchers = (
+    "OMPI_COMM_WORLD_SIZE",
+    "PMI_SIZE",
+    "PMI_RANK",
+    "PMIX_RANK",
+    "MV2_COMM_WORLD_SIZE",
+    "MPIRUN_RANK",
+    "SLURM_PROCID",
+    "TRANSONIC_FORCE_MPI",
+)
+
+
+def _is_launched_by_mpi():
+    """Check if the process may be part of a MPI job"""
+    return "mpi4py.MPI" in sys.modules or any(
+        name in os.environ for name in _env_vars_mpi_launchers
+    )
+
+
+if "TRANSONIC_NO_MPI" in os.environ or not _is_launched_by_mpi():
+    # importing mpi4py (and initializing MPI) is expensive
     nb_proc = 1
     rank = 0
 else:
@@ -38,74 +97,193 @@ if nb_proc > 1:
 
 if nb_proc == 1:
 
-    def bcast(value, root=0):
+    def bcast(value, root=0, timeout=None, communicator=None):
         return value
 
     def barrier(timeout=None):
         pass
 
 else:
-    _tag = 3 * 7 * 9 * sum(ord(letter) for letter in "mpi transonic")
+    import pickle
+
+    from mpi4py import MPI
+
+    # size of the buffer of the first broadcast (values smaller than this
+    # are broadcast with only one collective operation)
+    _size_buffer = 4096
+    _size_header = 8
+    _max_delay = 0.01
+
+    def _wait(request, timeout, time_start, value=None):
+        """Wait for a non-blocking collective operation
 
-    def bcast(value, root=0, timeout=mpi_timeout, tag=_tag):
+        The request is tested with an adaptive backoff: the delay between
+        tests starts very small (so that we wake up as soon as the operation
+        is completed) and grows up to :code:`_max_delay`.
+
+        """
+        delay = 1e-5
+        while not request.Test():
+            if timeout is not None and time() - time_start > timeout:
+                raise TimeoutError(f"rank = {rank}, value = {value}")
+            sleep(delay)
+            delay = min(2 * delay, _max_delay)
+
+    def bcast(value, root=0, timeout=mpi_timeout, communicator=None):
         """MPI broadcast
 
         Should do something similar to::
 
           value = comm.bcast(value, root=root)
 
-        but with a timeout
+        but with a timeout. The broadcast is non-blocking (:code:`Ibcast`,
+        implemented with trees by MPI) and no acknowledgement is needed.
 
         """
+        if communicator is None:
+            communicator = comm
+        rank = communicator.Get_rank()
+        time_start = time()
 
-        time_comm = time()
+        buffer = bytearray(_size_buffer)
+        if rank == root:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            size = len(data)
+            buffer[:_size_header] = size.to_bytes(_size_header, "little")
+            first = data[: _size_buffer - _size_header]
+            buffer[_size_header : _size_header + len(first)] = first
+
+        _wait(
+            communicator.Ibcast([buffer, MPI.BYTE], root=root),
+            timeout,
+            time_start,
+            value,
+        )
+
+        size = int.from_bytes(buffer[:_size_header], "little")
+        size_first = min(size, _size_buffer - _size_header)
+
+        if size > size_first:
+            # the value is too large for the first buffer
+            if rank == root:
+                rest = bytearray(data[size_first:])
+            else:
+                rest = bytearray(size - size_first)
+            _wait(
+                communicator.Ibcast([rest, MPI.BYTE], root=root),
+                timeout,
+                time_start,
+                value,
+            )
 
-        requests = []
         if rank == root:
-            for irank in range(nb_proc):
-                if irank == rank:
-                    continue
-                requests.append(comm.isend(value, dest=irank, tag=tag))
+            return value
+
+        data = buffer[_size_header : _size_header + size_first]
+        if size > size_first:
+            data += rest
+        return pickle.loads(data)
+
+    def barrier(timeout=mpi_timeout):
+        """MPI barrier with a timeout (none if timeout is None)"""
+        if timeout is None:
+            comm.Barrier()
         else:
-            requests.append(comm.irecv(source=root, tag=tag))
+            _wait(comm.Ibarrier(), timeout, time(), "barrier")
+
+
+comm_node = None
+rank_node = 0
+node_local_dir = os.environ.get("TRANSONIC_MPI_NODE_LOCAL_DIR")
+distributed_compilation = os.environ.get(
+    "TRANSONIC_MPI_DISTRIBUTED_COMPILATION", "0"
+).lower() in ("1", "true", "yes", "on")
+# ranks of the processes launching the compilations
+compile_ranks = [0]
+
+if nb_proc > 1 and (node_local_dir or distributed_compilation):
+    _fake_node_size = int(os.environ.get("TRANSONIC_MPI_FAKE_NODE_SIZE", "0"))
+    if _fake_node_size:
+        comm_node = comm.Split(rank // _fake_node_size, rank)
+    else:
+        comm_node = comm.Split_type(MPI.COMM_TYPE_SHARED, key=rank)
+    rank_node = comm_node.Get_rank()
+
+if nb_proc > 1 and distributed_compilation:
+    # one process per node (the "node leader") launches compilations
+    compile_ranks = [
+        rank_leader
+        for rank_leader in comm.allgather(rank if rank_node == 0 else None)
+        if rank_leader is not None
+    ]
+
+if nb_proc > 1 and node_local_dir:
+    try:
+        _user = getpass.getuser()
+    except (KeyError, OSError):
+        _user = str(os.getuid())
+    _path_node_local = Path(node_local_dir) / f"transonic_{_user}"
+    if _fake_node_size:
+        # on one machine, the fake nodes have to use different directories
+        _path_node_local /= f"fake_node{rank // _fake_node_size}"
 
-        for request in requests:
-            while True:
-                ready, received = request.test()
-                if ready:
-                    break
-                if time() - time_comm > timeout:
-                    raise TimeoutError(f"rank = {rank}, value = {value}")
-                sleep(0.1)
 
-        if rank != root:
-            value = received
+def _copy_if_needed(path, path_local):
+    stat = path.stat()
+    try:
+        stat_local = path_local.stat()
+    except FileNotFoundError:
+        pass
+    else:
+        if (stat_local.st_size, stat_local.st_mtime) == (
+            stat.st_size,
+            stat.st_mtime,
+        ):
+            return
+    path_local.parent.mkdir(parents=True, exist_ok=True)
+    path_tmp = path_local.with_name(f"{path_local.name}.{os.getpid()}.tmp")
+    shutil.copy2(path, path_tmp)
+    os.replace(path_tmp, path_local)
 
-        # send back something small to say that we received the value
-        requests = []
-        if rank == root:
-            for irank in range(nb_proc):
-                if irank == rank:
-                    continue
-                requests.append(comm.irecv(source=irank, tag=tag + 100))
-        else:
-            requests.append(comm.isend("ok", dest=0, tag=tag + 100))
 
-        for request in requests:
-            while True:
-                ready, received = request.test()
-                if ready:
-                    break
-                if time() - time_comm > timeout:
-                    raise TimeoutError(f"rank = {rank}, value = {value}")
-                sleep(0.1)
+def localize_extension(path):
+    """Return the path of a node-local copy of an extension
 
-        return value
+    Only one process per node copies the file (if needed) and the others wait
+    for it. This function is a collective operation for the processes of a
+    node. The initial path is returned if the node-local mode is not enabled
+    or if the copy failed.
 
-    def barrier(timeout=mpi_timeout):
-        if timeout is not None:
-            bcast("barrier", timeout=timeout, tag=_tag + 4)
-        comm.barrier()
+    """
+    if not node_local_dir or comm_node is None:
+        return path
+
+    from transonic.config import path_root
+
+    path = PathSeq(path).absolute()
+    try:
+        relative_path = path.relative_to(path_root)
+    except ValueError:
+        relative_path = (
+            PathSeq(hashlib.md5(str(path.parent).encode()).hexdigest())
+            / path.name
+        )
+    path_local = _path_node_local / relative_path
+
+    copied = None
+    if rank_node == 0:
+        try:
+            _copy_if_needed(path, path_local)
+        except OSError as error:
+            print(f"Cannot copy {path} in {path_local}: {error}", flush=True)
+            copied = False
+        else:
+            copied = True
+    copied = bcast(copied, timeout=None, communicator=comm_node)
+
+    if copied:
+        return path_local
+    return path
 
 
 class ShellProcessMPI:
@@ -123,6 +301,14 @@ class ShellProcessMPI:
             is_alive = None
         return bcast(is_alive, self.root)
 
+    @property
+    def returncode(self):
+        """Return code of the process (broadcast from the root process)"""
+        returncode = None
+        if rank == self.root:
+            returncode = self.process.returncode
+        return bcast(returncode, self.root)
+
     def is_alive_root(self, raise_if_error=False):
         process = self.process
         is_alive_ = process.poll() is None
@@ -145,6 +331,119 @@ class ShellProcessMPI:
 
 PathSeq = Path
 
+
+class FileSystemSnapshot:
+    """State of files computed by the root process and broadcast once
+
+    Under MPI, each query of the file system (existence, modification date,
+    glob) needs a collective operation. With a snapshot, the root process
+    lists some directories and stats some paths in one pass and the result
+    is broadcast with only one collective operation.
+
+    The snapshot is not updated: it has to be recomputed after
+    modifications of the files. For sequential runs, there is no collective
+    operation to save so nothing is computed in advance and the file system
+    is queried only for the paths actually needed.
+
+    Parameters
+    ----------
+
+    directories :
+
+      Directories whose files are included (not recursively).
+
+    paths :
+
+      Other paths to be included.
+
+    """
+
+    def __init__(self, directories=(), paths=()):
+        if nb_proc == 1:
+            self._listings = self._stats = None
+            return
+        state = None
+        if rank == 0:
+            state = self._compute_state(directories, paths)
+        self._listings, self._stats = bcast(state)
+
+    @staticmethod
+    def _compute_state(directories, paths):
+        listings = {}
+        stats = {}
+
+        def add_stat(path, stat):
+            stats[path] = (stat.st_mtime, stat.st_ctime)
+
+        for directory in directories:
+            directory = str(directory)
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            add_stat(directory, os.stat(directory))
+            listings[directory] = names = []
+            for entry in entries:
+                names.append(entry.name)
+                try:
+                    add_stat(os.path.join(directory, entry.name), entry.stat())
+                except OSError:
+                    pass
+
+        for path in paths:
+            path = str(path)
+            try:
+                add_stat(path, os.stat(path))
+            except OSError:
+                pass
+
+        return listings, stats
+
+    def _get_stat(self, path):
+        if self._stats is not None:
+            return self._stats.get(str(path))
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_ctime
+
+    def exists(self, path):
+        return self._get_stat(path) is not None
+
+    def modification_time(self, path):
+        """Modification time (or None if the path does not exist)"""
+        stat = self._get_stat(path)
+        return None if stat is None else stat[0]
+
+    def change_time(self, path):
+        """Change time (or None if the path does not exist)"""
+        stat = self._get_stat(path)
+        return None if stat is None else stat[1]
+
+    def has_to_build(self, output_file, input_file):
+        """Check if a file has to be (re)built"""
+        time_output = self.modification_time(output_file)
+        if time_output is None:
+            return True
+        time_input = self.modification_time(input_file)
+        return time_input is not None and time_output < time_input
+
+    def glob(self, directory, pattern):
+        """Paths of the files in a directory matching a pattern (not
+        recursive)"""
+        if self._listings is not None:
+            names = self._listings.get(str(directory), ())
+        else:
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                names = ()
+        return [
+            PathSeq(directory) / name for name in fnmatch.filter(names, pattern)
+        ]
+
+
 if nb_proc > 1:
 
     class PathMPI(type(Path())):
@@ -153,15 +452,7 @@ if nb_proc > 1:
             if rank == 0:
                 answer = super().exists()
 
-            ret = bcast(("exists", answer), tag=_tag + 1)
-
-            if len(ret) != 2 and ret[0] != "exists":
-                print(rank, "bug!!!!", ret, flush=1)
-                raise RuntimeError
-
-            kind, answer = ret
-
-            return answer
+            return bcast(answer)
 
         def unlink(self):
             if rank == 0:
@@ -176,7 +467,7 @@ if nb_proc > 1:
         ret = None
         if rank == 0:
             ret = util.has_to_build(output_file, input_file)
-        return bcast(ret, tag=_tag + 2)
+        return bcast(ret)
 
     def modification_date(pathfile):
         from . import util
@@ -184,7 +475,7 @@ if nb_proc > 1:
         ret = None
         if rank == 0:
             ret = util.modification_date(pathfile)
-        return bcast(ret, tag=_tag + 3)
+        return bcast(ret)
 
 
 if __name__ == "__main__":
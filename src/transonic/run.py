@@ -8,18 +8,22 @@ Internal API
 
 .. autofunction:: parse_args
 
+.. autofunction:: run_cache
+
 """
 
 import argparse
+import os
 from pathlib import Path
 from glob import glob
 import sys
+import time
 
-from transonic import __version__
+from transonic.cache import CacheIndex, FailureIndex, format_size, parse_size
 
 from transonic.compiler import wait_for_all_extensions, scheduler
 
-from .backends import backends
+from .backends import backends, make_backend_files_parallel
 from transonic.config import backend_default
 from transonic.log import logger
 from transonic.util import (
@@ -27,11 +31,14 @@ from transonic.util import (
     clear_cached_extensions,
     can_import_accelerator,
 )
-from transonic.analyses import analyse_files
 
 doc = """
 transonic: easily speedup your Python code with Pythran
 
+The JIT cache can be managed with `transonic --cache stats|prune|verify`. The
+failed compilations of jitted functions can be listed with
+`transonic --cache failures`.
+
 """
 
 
@@ -43,9 +50,15 @@ def run():
     args = parse_args()
 
     if args.version:
+        from transonic import __version__
+
         print(__version__)
         return
 
+    if args.cache:
+        run_cache(args=args)
+        return
+
     if not args.path and not args.clear_cache:
         logger.warning("No python files given. Nothing to do! ✨ 🍰 ✨.")
         return
@@ -78,27 +91,40 @@ def run():
         else:
             paths = glob(str(path))
 
+    paths = list(paths)
     if not paths:
         logger.error(f"No input file found (args.path = {args.path})")
         sys.exit(1)
 
-    analyses = analyse_files(paths)
-
     if "," in args.backend:
         backend_names = args.backend.split(",")
     else:
         backend_names = [args.backend]
 
+    if args.jobs == 1:
+        from transonic.analyses import analyse_files
+
+        analyses = analyse_files(paths)
+        for backend_name in backend_names:
+            backends[backend_name].make_backend_files(
+                paths, force=args.force, analyses=analyses, for_meson=args.meson
+            )
+    else:
+        make_backend_files_parallel(
+            paths,
+            backend_names,
+            nb_jobs=args.jobs or None,
+            force=args.force,
+            log_level=logger.get_level(),
+            for_meson=args.meson,
+        )
+
     for backend_name in backend_names:
         backend = backends[backend_name]
-        run_1_backend(paths, backend, args, analyses)
+        run_1_backend(paths, backend, args)
 
 
-def run_1_backend(paths, backend, args, analyses):
-    backend.make_backend_files(
-        paths, force=args.force, analyses=analyses, for_meson=args.meson
-    )
-
+def run_1_backend(paths, backend, args):
     if args.meson:
         path_meson_build = Path("meson.build")
         if not path_meson_build.exists():
@@ -163,7 +189,9 @@ def run_1_backend(paths, backend, args, analyses):
         path = Path(path)
         backend_path = path.parent / str(f"__{backend.name}__") / path.name
         ext_path = backend_path.with_name(
-            backend.name_ext_from_path_backend(backend_path)
+            backend.name_ext_from_path_backend(
+                backend_path, args.accelerator_flags
+            )
         )
         if backend_path.exists() and has_to_build(ext_path, backend_path):
             backends_paths.append(backend_path)
@@ -180,7 +208,7 @@ def run_1_backend(paths, backend, args, analyses):
             wait_for_all_extensions()
 
 
-def parse_args():
+def parse_args(argv=None):
     """Parse the arguments"""
     parser = argparse.ArgumentParser(
         description=doc, formatter_class=argparse.RawDescriptionHelpFormatter
@@ -253,13 +281,53 @@ def parse_args():
         # default="",
     )
 
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help=(
+            "number of processes used to analyse the files and produce the "
+            "backend files (0 for the number of CPUs, default 1)"
+        ),
+        type=int,
+        default=1,
+    )
+
     parser.add_argument(
         "--meson",
         help="Only prepare the backend directory for Meson",
         action="store_true",
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--cache",
+        choices=["stats", "prune", "verify", "failures", "clear-failures"],
+        help=(
+            "manage the JIT cache. "
+            "stats: print statistics; "
+            "prune: remove superseded and least recently used extensions; "
+            "verify: check the cache and synchronize the index; "
+            "failures: list the signatures whose compilation failed; "
+            "clear-failures: forget these failures (to retry the compilations)"
+        ),
+    )
+
+    parser.add_argument(
+        "--max-size",
+        help=(
+            "maximum size of the cache for --cache prune (for example 500M or "
+            "10G, default given by TRANSONIC_CACHE_MAX_SIZE)"
+        ),
+        type=str,
+        default=os.environ.get("TRANSONIC_CACHE_MAX_SIZE"),
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        help="only print what --cache prune would remove",
+        action="store_true",
+    )
+
+    args = parser.parse_args(argv)
     if args.pythran_flags != "":
         raise DeprecationWarning("-pf is deprecated. Use -af instead!")
 
@@ -269,5 +337,63 @@ def parse_args():
     return args
 
 
+def run_cache(argv=None, args=None):
+    """Run the command :code:`transonic --cache`"""
+    if args is None:
+        args = parse_args(argv)
+
+    with CacheIndex() as index:
+        if args.cache == "stats":
+            index.sync()
+            stats = index.get_stats()
+            print(
+                f"{stats['number']} extensions in {index.path_dir} "
+                f"({format_size(stats['size'])}, "
+                f"{stats['nb_superseded']} superseded)"
+            )
+            for backend_name, stats_backend in sorted(stats["backends"].items()):
+                print(
+                    f"  {backend_name}: {stats_backend['number']} extensions, "
+                    f"{format_size(stats_backend['size'])}, "
+                    f"{stats_backend['hits']} hits"
+                )
+        elif args.cache == "prune":
+            index.sync()
+            sizes = {key: entry["size"] for key, entry in index.entries.items()}
+            size_before = sum(sizes.values())
+            removed = index.prune(parse_size(args.max_size), args.dry_run)
+            for key in removed:
+                print(key)
+            size_after = size_before - sum(sizes[key] for key in removed)
+            print(
+                f"{len(removed)} extensions "
+                + ("would be " if args.dry_run else "")
+                + f"removed (size {format_size(size_before)} -> "
+                f"{format_size(size_after)})"
+            )
+        elif args.cache == "verify":
+            problems = index.verify()
+            for problem in problems:
+                print(problem)
+            if problems:
+                print(f"{len(problems)} problems found (index synchronized)")
+            else:
+                print("No problem found")
+        elif args.cache == "failures":
+            failures = FailureIndex(index.path_dir).get_failures()
+            for failure in failures:
+                date = time.strftime(
+                    "%Y-%m-%d %H:%M", time.localtime(failure["time"])
+                )
+                print(
+                    f"{date} {failure['backend']}: {failure['signature']} "
+                    f"({failure['path']})"
+                )
+            print(f"{len(failures)} failed compilations")
+        elif args.cache == "clear-failures":
+            nb_failures = FailureIndex(index.path_dir).clear()
+            print(f"{nb_failures} failed compilations forgotten")
+
+
 if __name__ == "__main__":
     run()
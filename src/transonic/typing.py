@@ -61,17 +61,24 @@ Internal API
 
 .. autofunction:: format_type_as_backend_type
 
+.. autofunction:: compute_type_key
+
+.. autofunction:: compute_mem_layout
+
 .. autoclass:: ConstType
    :members:
    :private-members:
 
 """
+
+import os
 import re
 from enum import Enum, auto
 import itertools
 
 import numpy as np
 
+from transonic.config import strtobool
 from transonic.util import get_name_calling_module
 
 names_template_variables = {}
@@ -934,7 +941,35 @@ def str2type(str_type):
 _simple_types = (int, float, complex, str)
 
 
-def typeof(obj):
+_typeof_full_check = strtobool(
+    os.environ.get("TRANSONIC_TYPEOF_FULL_CHECK", "False")
+)
+# number of elements checked for large containers
+_typeof_nb_samples = 32
+
+
+def _sample(elements, full_check):
+    """Return elements of a container to be checked by typeof
+
+    Only a sample of the elements of large containers is returned: the
+    first elements and the last one (and for lists, evenly spaced elements)
+    so that the cost does not depend on the size of the container.
+
+    """
+    if full_check or len(elements) <= _typeof_nb_samples:
+        return elements
+    if isinstance(elements, list):
+        return elements[:: len(elements) // _typeof_nb_samples] + elements[-1:]
+    samples = list(itertools.islice(elements, _typeof_nb_samples))
+    try:
+        samples.append(next(reversed(elements)))
+    except TypeError:
+        # sets are not reversible
+        pass
+    return samples
+
+
+def typeof(obj, full_check: bool = None):
     """Compute the Transonic type corresponding to a Python object
 
     Supports:
@@ -943,14 +978,27 @@ def typeof(obj):
     - homogeneous list, dict and set
     - tuple
     - numpy scalars
-    - numpy arrays
+    - numpy arrays (with their memory layout, see :func:`compute_mem_layout`)
+
+    Parameters
+    ----------
+
+    full_check : bool (optional)
+
+      If True, all the elements of the lists, dicts and sets are checked to
+      be of the same type. By default (value given by the environment variable
+      :code:`TRANSONIC_TYPEOF_FULL_CHECK`, False), only a sample of the
+      elements of large containers is checked.
 
     """
     if isinstance(obj, _simple_types):
         return type(obj)
 
+    if full_check is None:
+        full_check = _typeof_full_check
+
     if isinstance(obj, tuple):
-        return Tuple[tuple(typeof(elem) for elem in obj)]
+        return Tuple[tuple(typeof(elem, full_check) for elem in obj)]
 
     if isinstance(obj, (list, dict, set)) and not obj:
         raise ValueError(
@@ -959,25 +1007,31 @@ def typeof(obj):
 
     if isinstance(obj, list):
         type_elem = type(obj[0])
-        if not all(isinstance(elem, type_elem) for elem in obj):
+        if not all(
+            isinstance(elem, type_elem) for elem in _sample(obj, full_check)
+        ):
             raise ValueError(f"The list {obj} is not homogeneous in type")
 
-        return List[typeof(obj[0])]
+        return List[typeof(obj[0], full_check)]
 
     if isinstance(obj, (dict, set)):
         key = next(iter(obj))
         type_key = type(key)
-        if not all(isinstance(key, type_key) for key in obj):
+        if not all(isinstance(key, type_key) for key in _sample(obj, full_check)):
             raise ValueError("The dict {obj} is not homogeneous in type")
 
         if isinstance(obj, dict):
-            value = next(iter(obj.values()))
+            values = obj.values()
+            value = next(iter(values))
             type_value = type(value)
-            if not all(isinstance(value, type_value) for value in obj.values()):
+            if not all(
+                isinstance(value, type_value)
+                for value in _sample(values, full_check)
+            ):
                 raise ValueError("The dict {obj} is not homogeneous in type")
-            return Dict[typeof(key), typeof(value)]
+            return Dict[typeof(key, full_check), typeof(value, full_check)]
         else:
-            return Set[typeof(key)]
+            return Set[typeof(key, full_check)]
 
     # TODO: Tuple
     if isinstance(obj, tuple):
@@ -987,8 +1041,9 @@ def typeof(obj):
         if np.isscalar(obj):
             return obj.dtype.type
 
-        # TODO: deeper analysis
-        return Array[obj.dtype, f"{obj.ndim}d"]
+        if obj.ndim == 0:
+            return Array[obj.dtype, "0d"]
+        return Array[obj.dtype, f"{obj.ndim}d", compute_mem_layout(obj).name]
 
     if isinstance(obj, np.generic):
         return type(obj)
@@ -998,6 +1053,65 @@ def typeof(obj):
     )
 
 
+def compute_mem_layout(array):
+    """Compute the memory layout of a Numpy array
+
+    Returns :code:`MemLayout.C` for C-contiguous arrays (in particular
+    contiguous 1d arrays), :code:`MemLayout.F` for Fortran-contiguous arrays
+    (for example transposed arrays) and :code:`MemLayout.strided` for other
+    views (for example sliced arrays).
+
+    """
+    flags = array.flags
+    if flags.c_contiguous:
+        return MemLayout.C
+    if flags.f_contiguous:
+        return MemLayout.F
+    return MemLayout.strided
+
+
+def compute_type_key(obj):
+    """Compute a cheap hashable key characterizing the type of an object
+
+    Contrary to :func:`typeof`, this function does not check that containers
+    are homogeneous so that its cost does not depend on the size of the
+    object. It is used to dispatch the calls of jitted functions.
+
+    """
+    cls = type(obj)
+
+    if cls is list:
+        if obj:
+            return (cls, compute_type_key(obj[0]))
+        return cls
+
+    if cls is tuple:
+        return (cls,) + tuple(compute_type_key(elem) for elem in obj)
+
+    if cls is dict:
+        if obj:
+            key, value = next(iter(obj.items()))
+            return (cls, compute_type_key(key), compute_type_key(value))
+        return cls
+
+    if cls is set:
+        if obj:
+            return (cls, compute_type_key(next(iter(obj))))
+        return cls
+
+    if isinstance(obj, np.ndarray):
+        flags = obj.flags
+        return (
+            cls,
+            obj.dtype.num,
+            obj.ndim,
+            flags.c_contiguous,
+            flags.f_contiguous,
+        )
+
+    return cls
+
+
 class ConstType(Type):
     """Private API class for const"""
 
@@ -19,12 +19,6 @@ Internal API
 
 .. autofunction:: get_source_without_decorator
 
-.. autoclass:: TypeHintRemover
-   :members:
-   :private-members:
-
-.. autofunction:: strip_typehints
-
 .. autofunction:: get_ipython_input
 
 .. autofunction:: get_info_from_ipython
@@ -43,6 +37,8 @@ Internal API
 
 .. autofunction:: write_if_has_to_write
 
+.. autofunction:: format_str
+
 """
 
 import os
@@ -52,32 +48,56 @@ import re
 from pathlib import Path
 import importlib.util
 import shutil
+from functools import lru_cache
 from textwrap import dedent
 from typing import Callable
 
-import gast as ast
-
 from transonic.config import backend_default
+from transonic import mpi
 
-try:
-    # since black is still beta (in 03/2019), we cannot impose a version :-(
-    import black
-except ImportError:
-    import autopep8
+from transonic.compiler import (
+    ext_suffix,
+    make_hex,
+    modification_date,
+    has_to_build,
+)
 
-    def format_str(src_contents):
-        try:
-            return autopep8.fix_code(src_contents)
-        except AttributeError:
-            # workaround https://github.com/hhatto/autopep8/issues/689
-            return src_contents
+from transonic.config import path_root, strtobool
+
+__all__ = ["modification_date", "has_to_build", "path_root"]
+
+_has_to_format = strtobool(os.environ.get("TRANSONIC_FORMAT_CODE", "True"))
+_path_cache_formatted = path_root / "formatted"
+
+
+@lru_cache(maxsize=None)
+def _get_formatter():
+    """Return an identifier of the formatter and the function formatting code
+
+    The formatter (black or autopep8) is only imported when needed since its
+    import is slow.
+
+    """
+    try:
+        # since black is still beta (in 03/2019), we cannot impose a version :-(
+        import black
+    except ImportError:
+        import autopep8
+
+        def _format_str(src_contents):
+            try:
+                return autopep8.fix_code(src_contents)
+            except AttributeError:
+                # workaround https://github.com/hhatto/autopep8/issues/689
+                return src_contents
+
+        return f"autopep8 {autopep8.__version__}", _format_str
 
-else:
     try:
-        _mode = black.FileMode(line_length=82)
+        mode = black.FileMode(line_length=82)
     except TypeError:
 
-        def format_str(src_contents: str):
+        def _format_str(src_contents: str):
             try:
                 return black.format_str(src_contents, line_length=82)
             except black.InvalidInput:
@@ -86,33 +106,53 @@ else:
 
     else:
 
-        def format_str(src_contents: str):
+        def _format_str(src_contents: str):
             try:
-                return black.format_str(src_contents, mode=_mode)
+                return black.format_str(src_contents, mode=mode)
             except black.InvalidInput:
                 print("black.InvalidInput\n" + src_contents)
                 raise
 
+    return f"black {black.__version__} 82", _format_str
 
-try:
-    from IPython.core.getipython import get_ipython
-except ImportError:
-    pass
 
-from transonic import __version__
-from transonic.analyses import extast
+@lru_cache(maxsize=1024)
+def format_str(src_contents: str):
+    """Format generated code (with black or autopep8)
 
-from transonic.compiler import (
-    ext_suffix,
-    make_hex,
-    modification_date,
-    has_to_build,
-)
+    The formatted codes are cached in memory and on disk (in
+    :code:`$TRANSONIC_DIR/formatted`, keyed by a hash of the code and of the
+    formatter version, and pruned with the JIT cache, see
+    :mod:`transonic.cache`) so that the same code is formatted only once. The
+    formatting is skipped if the environment variable
+    :code:`TRANSONIC_FORMAT_CODE` is false.
 
-from transonic.config import path_root, strtobool
+    """
+    if not _has_to_format:
+        return src_contents
 
+    formatter_id, _format_str = _get_formatter()
+    hex_src = make_hex(formatter_id + "\n" + src_contents)
+    path = _path_cache_formatted / hex_src[:2] / (hex_src + ".py")
+    try:
+        formatted = path.read_text(encoding="utf-8")
+    except OSError:
+        pass
+    else:
+        from transonic.cache import record_use
 
-__all__ = ["modification_date", "has_to_build", "path_root"]
+        record_use(path)
+        return formatted
+
+    formatted = _format_str(src_contents)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path_tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        path_tmp.write_text(formatted, encoding="utf-8")
+        os.replace(path_tmp, path)
+    except OSError:
+        pass
+    return formatted
 
 
 def can_import_accelerator(backend: str = backend_default):
@@ -139,6 +179,8 @@ def can_import_accelerator(backend: str = backend_default):
 
 
 def print_versions(accelerators=None):
+    from transonic import __version__
+
     print(f"Transonic {__version__}")
 
     if accelerators is None or "pythran" in accelerators:
@@ -252,61 +294,17 @@ def get_frame(depth=1):
 
 def get_source_without_decorator(func: Callable):
     """Get the source of a function without its decorator"""
+    from transonic.analyses.util import strip_typehints
+
     src = inspect.getsource(func)
     src = dedent(src)
     return strip_typehints(re.sub(r"@.*?\sdef\s", "def ", src))
 
 
-class TypeHintRemover(ast.NodeTransformer):
-    """Strip the type hints
-
-    from https://stackoverflow.com/a/42734810/1779806
-    """
-
-    def visit_FunctionDef(self, fdef):
-        # remove the return type defintion
-        fdef.returns = None
-        # remove all argument annotations
-        if fdef.args.args:
-            for arg in fdef.args.args:
-                arg.annotation = None
-
-        body = []
-        for node in fdef.body:
-            if isinstance(node, ast.AnnAssign):
-                if node.value is None:
-                    continue
-                node = ast.Assign(
-                    targets=[node.target], value=node.value, type_comment=None
-                )
-            body.append(node)
-        fdef.body = body
-
-        return fdef
-
-
-def strip_typehints(source):
-    """Strip the type hints from a function"""
-    source = format_str(source)
-    # parse the source code into an AST
-    parsed_source = ast.parse(source)
-    # remove all type annotations, function return type definitions
-    # and import statements from 'typing'
-    transformed = TypeHintRemover().visit(parsed_source)
-    # convert the AST back to source code
-    striped_code = extast.unparse(transformed)
-    return striped_code
-
-
-def make_code_from_fdef_node(fdef):
-    transformed = TypeHintRemover().visit(fdef)
-    # convert the AST back to source code
-    code = extast.unparse(transformed)
-    return format_str(code)
-
-
 def get_ipython_input(last=True):
     """Get the input code when called from IPython"""
+    from IPython.core.getipython import get_ipython
+
     ip = get_ipython()
 
     hist_raw = ip.history_manager.input_hist_raw
@@ -348,6 +346,11 @@ def import_from_path(path: Path, module_name: str):
             f"[path.name for path in path.parent.glob('*')]:\n{[path.name for path in path.parent.glob('*')]}\n"
         )
 
+    if path.name.endswith(ext_suffix):
+        # for large MPI jobs, the extension can be loaded from a node-local
+        # copy (see transonic.mpi.localize_extension)
+        path = mpi.localize_extension(path)
+
     if "." in module_name:
         package_name, mod_name = module_name.rsplit(".", 1)
         name_file = path.name.split(".", 1)[0]
@@ -0,0 +1,213 @@
+"""C++ compiler launcher for Pythran
+====================================
+
+When the compilation of a Pythran extension is split in two stages (see
+:func:`transonic_cl.run_backend.compile_pythran_split`), this module is used by
+Pythran as C++ compiler (through a small script set in the environment
+variable :code:`CXX`, since Pythran only accepts an executable). It runs the
+real compiler:
+
+- through a compiler cache (for example :code:`ccache` or :code:`sccache`) so
+  that identical translation units are not compiled twice,
+
+- optionally with a precompiled header of the core pythonic includes (gcc and
+  clang). The precompiled header is built with exactly the flags of the first
+  compilation using it and is saved in :code:`$TRANSONIC_DIR/pythran_pch`.
+  The modification time of its directory is updated at each use so that the
+  precompiled headers can be pruned with the JIT cache (see
+  :mod:`transonic.cache`).
+
+The launcher is configured by the environment variables (set by
+:mod:`transonic_cl.run_backend`) :code:`TRANSONIC_CXX_REAL` (JSON list, the
+real compiler command), :code:`TRANSONIC_CXX_LAUNCHER` (the compiler cache,
+possibly empty) and :code:`TRANSONIC_PYTHRAN_PCH`.
+
+Internal API
+------------
+
+.. autofunction:: get_path_script
+
+.. autofunction:: split_compile_command
+
+.. autofunction:: get_mtime_pythonic
+
+.. autofunction:: make_pch
+
+.. autofunction:: record_use
+
+.. autofunction:: main
+
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from importlib import metadata
+from importlib.util import find_spec
+
+from transonic.config import path_root, strtobool
+from transonic_cl.file_lock import FileLock
+
+path_pch = path_root / "pythran_pch"
+
+code_pch = "#include <pythonic/core.hpp>\n#include <pythonic/python/core.hpp>\n"
+
+cxx_suffixes = (".cpp", ".cxx", ".cc")
+
+
+def get_path_script():
+    """Create (if needed) the script used as compiler and return its path"""
+    code = (
+        f'#!/bin/sh\nexec "{sys.executable}" -m transonic_cl.cxx_launcher "$@"\n'
+    )
+    hex_code = hashlib.md5(code.encode("utf8")).hexdigest()
+    path = path_root / "cxx_launcher" / f"c++-{hex_code}"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path_tmp = path.with_name(f"{path.name}.{os.getpid()}")
+        path_tmp.write_text(code)
+        path_tmp.chmod(0o755)
+        os.replace(path_tmp, path)
+    return path
+
+
+def split_compile_command(args):
+    """Get the flags of a compilation command (None for other commands)
+
+    The compilation commands are of the form :code:`-c <source> -o <object>`
+    plus the flags. Link commands are not compilation commands.
+
+    """
+    if "-c" not in args:
+        return None
+    flags = []
+    sources = []
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg == "-o":
+            index += 2
+            continue
+        if arg.endswith(cxx_suffixes) and not arg.startswith("-"):
+            sources.append(arg)
+        elif arg != "-c":
+            flags.append(arg)
+        index += 1
+    if len(sources) != 1:
+        return None
+    return flags
+
+
+def get_mtime_pythonic():
+    """Modification time of the directory of the pythonic headers"""
+    spec = find_spec("pythran")
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    path_pythonic = os.path.join(spec.submodule_search_locations[0], "pythonic")
+    try:
+        return os.stat(path_pythonic).st_mtime
+    except OSError:
+        return None
+
+
+def make_pch(compiler, flags):
+    """Build (if needed) a precompiled header and return the header path
+
+    None is returned if the precompiled header cannot be built.
+
+    """
+    try:
+        version_pythran = metadata.version("pythran")
+    except metadata.PackageNotFoundError:
+        return None
+    # the headers can change without new version (development installs)
+    mtime_pythonic = get_mtime_pythonic()
+    src_key = json.dumps(
+        [compiler, flags, code_pch, version_pythran, mtime_pythonic]
+    )
+    hex_key = hashlib.md5(src_key.encode("utf8")).hexdigest()
+    path_dir = path_pch / hex_key
+    path_header = path_dir / "pythonic_pch.hpp"
+    # clang also finds precompiled headers with the suffix .pch
+    suffix = ".pch" if "clang" in os.path.basename(compiler[0]) else ".gch"
+    path_compiled = path_header.with_name(path_header.name + suffix)
+    if path_compiled.exists():
+        record_use(path_dir)
+        return path_header
+
+    path_dir.mkdir(parents=True, exist_ok=True)
+    lock = FileLock(path_dir / "pch.lock")
+    lock.acquire()
+    try:
+        if path_compiled.exists():
+            return path_header
+        path_header.write_text(code_pch)
+        path_tmp = path_dir / f"tmp_{os.getpid()}{suffix}"
+        completed_process = subprocess.run(
+            [*compiler, *flags, "-x", "c++-header", str(path_header)]
+            + ["-o", str(path_tmp)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+        )
+        if completed_process.returncode or not path_tmp.exists():
+            print(
+                "Warning: precompiled header not built:\n"
+                + completed_process.stdout,
+                file=sys.stderr,
+            )
+            if path_tmp.exists():
+                path_tmp.unlink()
+            return None
+        os.replace(path_tmp, path_compiled)
+    finally:
+        lock.release()
+    return path_header
+
+
+def record_use(path_dir):
+    """Record the use of a precompiled header (modification time of its
+    directory, used by the cache index)"""
+    try:
+        os.utime(path_dir)
+    except OSError:
+        pass
+
+
+def main():
+    """Run the real compiler with the compiler cache and the precompiled header"""
+    args = sys.argv[1:]
+    compiler = json.loads(os.environ["TRANSONIC_CXX_REAL"])
+    launcher = os.environ.get("TRANSONIC_CXX_LAUNCHER", "").split()
+
+    flags = split_compile_command(args)
+    if flags is not None and strtobool(
+        os.environ.get("TRANSONIC_PYTHRAN_PCH", "0")
+    ):
+        path_header = make_pch(compiler, flags)
+        if path_header is not None:
+            args = ["-include", str(path_header)] + args
+            if launcher and os.path.basename(launcher[0]) == "ccache":
+                # needed by ccache to cache compilations using a precompiled
+                # header (see the ccache documentation)
+                sloppiness = os.environ.get("CCACHE_SLOPPINESS", "")
+                os.environ["CCACHE_SLOPPINESS"] = ",".join(
+                    value
+                    for value in (sloppiness, "pch_defines,time_macros")
+                    if value
+                )
+                if "clang" not in os.path.basename(compiler[0]):
+                    args.insert(0, "-fpch-preprocess")
+
+    command = launcher + compiler + args
+    try:
+        os.execvp(command[0], command)
+    except OSError as error:
+        print(f"Cannot execute {command[0]}: {error}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,19 @@
 import sys
-from distutils.core import setup
 
-from Cython.Build import cythonize
-import numpy as np
 
-path = sys.argv.pop()
-sys.argv.extend(("build_ext", "--inplace"))
+def cythonize_file(path):
+    """Build in place the extension corresponding to a Cython file"""
+    from distutils.core import setup
 
-setup(
-    ext_modules=cythonize(path, language_level=3), include_dirs=[np.get_include()]
-)
+    from Cython.Build import cythonize
+    import numpy as np
+
+    setup(
+        ext_modules=cythonize(path, language_level=3),
+        include_dirs=[np.get_include()],
+        script_args=["build_ext", "--inplace"],
+    )
+
+
+if __name__ == "__main__":
+    cythonize_file(sys.argv.pop())
@@ -0,0 +1,120 @@
+"""Inter-process file locks
+===========================
+
+Advisory locks based on :code:`fcntl.flock` (:code:`msvcrt.locking` on
+Windows). A lock is owned by a process and is released by the OS when this
+process dies, so a lock left by a crashed compilation is never mistaken for a
+compilation in progress.
+
+Internal API
+------------
+
+.. autoclass:: FileLock
+   :members:
+   :private-members:
+
+"""
+
+import os
+from pathlib import Path
+from time import sleep
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    import msvcrt
+
+    fcntl = None
+
+
+class FileLock:
+    """Exclusive lock associated with a file
+
+    The lock file is removed when the lock is released (except on Windows).
+
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fd = None
+
+    @property
+    def is_locked(self):
+        return self._fd is not None
+
+    def _lock_fd(self, fd, blocking):
+        if fcntl is not None:
+            flags = fcntl.LOCK_EX
+            if not blocking:
+                flags |= fcntl.LOCK_NB
+            try:
+                fcntl.flock(fd, flags)
+            except BlockingIOError:
+                return False
+            return True
+
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            except OSError:
+                if not blocking:
+                    return False
+                sleep(0.05)
+            else:
+                return True
+
+    def acquire(self, blocking=True):
+        """Acquire the lock
+
+        Return False if the lock is owned by another process and
+        :code:`blocking` is False.
+
+        """
+        if self._fd is not None:
+            raise RuntimeError(f"Lock {self.path} already acquired")
+
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+            if not self._lock_fd(fd, blocking):
+                os.close(fd)
+                return False
+            # the lock file could have been removed by the previous owner
+            # between our open and our lock, in which case we own a lock
+            # which protects nothing
+            try:
+                same_file = os.path.samestat(os.fstat(fd), os.stat(self.path))
+            except FileNotFoundError:
+                same_file = False
+            if same_file:
+                break
+            os.close(fd)
+
+        self._fd = fd
+        os.truncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        return True
+
+    def release(self):
+        """Release the lock"""
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            # remove the file while we still own the lock (see acquire)
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
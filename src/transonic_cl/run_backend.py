@@ -6,32 +6,77 @@ Internal API
 
 .. autofunction:: main
 
+.. autofunction:: compile_and_publish
+
+.. autofunction:: get_cxx_launcher
+
+.. autofunction:: has_to_split_pythran
+
+.. autofunction:: get_real_cxx
+
+.. autofunction:: compile_pythran_split
+
+.. autofunction:: run_command
+
+.. autofunction:: run_in_process
+
 """
 
+import json
+import shlex
 import subprocess
 import sys
 import logging
 from pathlib import Path
 import sysconfig
-from time import time, sleep
-from shutil import copyfile
+from shutil import copyfile, rmtree, which
 import os
+import traceback
+
+from transonic_cl.file_lock import FileLock
 
 logger = logging.getLogger("transonic")
 logger.setLevel(logging.INFO)
 
 ext_suffix = sysconfig.get_config_var("EXT_SUFFIX") or ".so"
 
+# exit code of the compilations interrupted before their end (backend killed
+# by a signal, dead worker, ...), which can succeed if they are retried
+# (EX_TEMPFAIL of sysexits.h)
+exit_code_retry = 75
+
+
+def main(argv=None, in_process=False):
+    """Minimal layer above the Pythran commandline
+
+    Parameters
+    ----------
+
+    argv : list, optional
+
+      The arguments (by default, the ones of the command line).
+
+    in_process : bool
+
+      Run the backend in this process instead of in a subprocess (used by the
+      compilation workers, see :mod:`transonic_cl.worker`).
 
-def main():
-    """Minimal layer above the Pythran commandline"""
+    """
 
-    if "-b" in sys.argv:
-        if sys.argv[sys.argv.index("-b") + 1]:
-            index = sys.argv.index("-b")
-            backend = sys.argv[index + 1]
-            del sys.argv[index]
-            del sys.argv[index]
+    if argv is None:
+        assert sys.argv[0].endswith(
+            os.path.sep.join(("transonic_cl", "run_backend.py"))
+        )
+        argv = sys.argv[1:]
+
+    args = list(argv)
+
+    if "-b" in args:
+        if args[args.index("-b") + 1]:
+            index = args.index("-b")
+            backend = args[index + 1]
+            del args[index]
+            del args[index]
         else:
             raise ValueError("No backend is specified afert -b")
     else:
@@ -40,15 +85,7 @@ def main():
     if backend in ("python", "numba"):
         return
 
-    compiling_name = backend.capitalize() + "izing"
-
-    assert sys.argv[0].endswith(
-        os.path.sep.join(("transonic_cl", "run_backend.py"))
-    )
-
-    args = sys.argv[1:]
     name = args[0]
-    path = Path.cwd() / name
 
     if "-o" in args:
         index_output = args.index("-o") + 1
@@ -59,53 +96,91 @@ def main():
     name_out_base = name_out.split(".", 1)[0]
 
     if "-o" in args:
-        if backend == "pythran":
-            name_tmp = name_out_base + ".tmp"
-            args[index_output] = name_tmp
-        elif backend == "cython":
-            name_tmp = name_out_base + ".py"
-            copyfile(name, name_tmp)
-            copyfile(name.split(".", 1)[0] + ".pxd", name_out_base + ".pxd")
-            name = name_tmp
-
-        path_tmp = Path(name_tmp)
-        path_out = path_tmp.with_suffix(ext_suffix)
+        path_out = Path(name_out_base + ext_suffix)
     else:
         path_out = Path(name_out)
 
-    name_lock = Path(name_out_base + ".lock")
-
-    if name_lock.exists():
+    # Only one process compiles a given extension (for the JIT, its name
+    # contains hashes of the source and of the header). The lock is released
+    # by the OS as soon as the compiling process finishes or dies.
+    lock = FileLock(name_out_base + ".lock")
+    if not lock.acquire(blocking=False):
         print(
-            f"lock file {name_lock.absolute()} present: "
+            f"lock file {lock.path.absolute()} owned by another process: "
             "waiting for completion of the compilation",
             flush=True,
         )
-        time_out_lock = 3600  # (s) let's hope it's enough
-        time_start = time()
-        while name_lock.exists() and time() - time_start < time_out_lock:
-            sleep(1)
-        if time() - time_start >= time_out_lock:
-            logger.error(f"Remove lock file {name_lock.absolute()}")
-            name_lock.unlink()
-            raise TimeoutError(
-                f"Stop waiting for a lock file to be deleted {name_lock.absolute()}"
-            )
+        lock.acquire()
+        if path_out.exists():
+            lock.release()
+            return
+        print(
+            f"File {path_out.absolute()} not created by the other process",
+            flush=True,
+        )
 
-        assert not name_lock.exists()
-        sleep(1)
-        if not path_out.exists():
-            raise RuntimeError(
-                f"After lock file were deleted, {path_out.absolute()} not created"
-            )
+    try:
+        completed_process = compile_and_publish(
+            backend, name, name_out_base, args, in_process
+        )
+    finally:
+        lock.release()
 
-        return
+    def log_completed_process():
+        if completed_process is None:
+            return
+        if completed_process.stdout:
+            print(f"{backend.capitalize()} stdout:\n{completed_process.stdout}")
+        if completed_process.stderr:
+            logger.error(
+                f"{backend.capitalize()} stderr:\n{completed_process.stderr}"
+            )
 
-    if "-v" in args:
-        # no capture_output
-        stdout = stderr = None
+    if path_out.exists():
+        print(f"File {path_out.absolute()} created by {backend}", flush=True)
+        if os.getenv("TRANSONIC_DEBUG"):
+            log_completed_process()
     else:
-        stdout = stderr = subprocess.PIPE
+        logger.error(
+            f"Error! File {path_out.absolute()} has not been created by {backend}"
+        )
+        log_completed_process()
+        if completed_process is not None and completed_process.returncode < 0:
+            sys.exit(exit_code_retry)
+        sys.exit(1)
+
+
+def compile_and_publish(backend, name, name_out_base, args, in_process=False):
+    """Compile an extension and atomically move it to its final path
+
+    The extension is produced under a temporary name (or in a temporary
+    directory for Cython) so that other processes never see a partially
+    written file. With :code:`in_process`, the backend is run by
+    :func:`run_in_process`.
+
+    """
+    compiling_name = backend.capitalize() + "izing"
+    path = Path.cwd() / name
+
+    cwd = path_tmp = None
+    if "-o" in args:
+        path_out = Path(name_out_base + ext_suffix)
+        index_output = args.index("-o") + 1
+        if backend == "pythran":
+            path_tmp = Path(name_out_base + ".tmp")
+            args[index_output] = path_tmp.name
+        elif backend == "cython":
+            # the module name is given by the file name
+            cwd = Path(name_out_base + ".build")
+            cwd.mkdir(exist_ok=True)
+            copyfile(name, cwd / (name_out_base + ".py"))
+            copyfile(
+                name.split(".", 1)[0] + ".pxd", cwd / (name_out_base + ".pxd")
+            )
+            name = name_out_base + ".py"
+            path_tmp = cwd / path_out.name
+
+    capture_output = "-v" not in args
 
     print(f"{compiling_name} {path}", flush=True)
     if backend == "pythran":
@@ -115,47 +190,213 @@ def main():
     elif backend == "cython":
         args = [sys.executable, "-m", "transonic_cl.cythonize", name]
 
-    name_lock.touch()
+    completed_process = None
     try:
-        completed_process = subprocess.run(
-            args, stdout=stdout, stderr=stderr, universal_newlines=True
-        )
+        if backend == "pythran" and has_to_split_pythran():
+            completed_process = compile_pythran_split(
+                args, name_out_base, in_process, capture_output
+            )
+        else:
+            completed_process = run_command(
+                args, cwd, in_process=in_process, capture_output=capture_output
+            )
     except Exception:
         pass
     finally:
-        name_lock.unlink()
-    if backend == "pythran" and "-o" in args and path_tmp.exists():
-        path_tmp.rename(path_out)
-    elif backend == "cython":
-        path_tmp.with_suffix(".c").unlink()
-        path_tmp.with_suffix(".pxd").unlink()
-        path_tmp.unlink()
+        if path_tmp is not None and path_tmp.exists():
+            os.replace(path_tmp, path_out)
+        if cwd is not None:
+            rmtree(cwd, ignore_errors=True)
 
-    def log_completed_process():
-        try:
-            completed_process
-        except NameError:
-            pass
-        else:
-            if completed_process.stdout:
-                print(
-                    f"{backend.capitalize()} stdout:\n{completed_process.stdout}"
-                )
-            if completed_process.stderr:
-                logger.error(
-                    f"{backend.capitalize()} stderr:\n{completed_process.stderr}"
-                )
+    return completed_process
 
-    if path_out.exists():
-        print(f"File {path_out.absolute()} created by {backend}", flush=True)
-        if os.getenv("TRANSONIC_DEBUG"):
-            log_completed_process()
+
+def get_cxx_launcher():
+    """Get the compiler cache used for the C++ compilations of Pythran
+
+    Given by the environment variable :code:`TRANSONIC_CXX_LAUNCHER` (no
+    compiler cache by default, "auto" for ccache or sccache if they are
+    found).
+
+    """
+    launcher = os.environ.get("TRANSONIC_CXX_LAUNCHER", "").strip()
+    if launcher.lower() == "auto":
+        for name in ("ccache", "sccache"):
+            if which(name):
+                return name
+        return ""
+    if launcher.lower() == "none":
+        return ""
+    return launcher
+
+
+def has_to_split_pythran():
+    """Check if the Pythran compilations have to be split in two stages
+
+    The split is only used if a compiler cache or a precompiled header is
+    requested (see :mod:`transonic.config`).
+
+    """
+    if os.name == "nt":
+        return False
+    from transonic.config import strtobool
+
+    return bool(
+        get_cxx_launcher()
+        or strtobool(os.environ.get("TRANSONIC_PYTHRAN_PCH", "0"))
+    )
+
+
+def get_real_cxx():
+    """Get the C++ compiler command that Pythran would use"""
+    cxx = os.environ.get("CXX")
+    if not cxx:
+        from pythran.config import compiler
+
+        cxx = compiler() or sysconfig.get_config_var("CXX") or "c++"
+    return shlex.split(cxx)
+
+
+def compile_pythran_split(args, name_out_base, in_process, capture_output):
+    """Compile a Pythran extension in two stages
+
+    The C++ code is first generated with :code:`pythran -E` (in a temporary
+    directory, in a file named as the module). It is then compiled by Pythran
+    with the compiler launcher :mod:`transonic_cl.cxx_launcher`, which uses a
+    compiler cache (ccache, sccache, see :func:`get_cxx_launcher`) and
+    optionally a precompiled header (environment variable
+    :code:`TRANSONIC_PYTHRAN_PCH`).
+
+    """
+    from transonic_cl.cxx_launcher import get_path_script
+
+    path_build = Path(name_out_base + ".build")
+    path_build.mkdir(exist_ok=True)
+    # Pythran uses the name of the output file for the name of the module
+    path_cpp = path_build / (name_out_base + ".cpp")
+
+    args_cpp = list(args)
+    if "-o" in args_cpp:
+        args_cpp[args_cpp.index("-o") + 1] = str(path_cpp)
     else:
-        logger.error(
-            f"Error! File {path_out.absolute()} has not been created by {backend}"
+        args_cpp.extend(("-o", str(path_cpp)))
+    args_cpp.insert(1, "-E")
+
+    launcher = get_cxx_launcher()
+    cxx = get_real_cxx()
+    if launcher and os.path.basename(cxx[0]) == os.path.basename(
+        launcher.split()[0]
+    ):
+        # the compiler cache is already used
+        launcher = ""
+    env = dict(
+        os.environ,
+        CXX=str(get_path_script()),
+        TRANSONIC_CXX_REAL=json.dumps(cxx),
+        TRANSONIC_CXX_LAUNCHER=launcher,
+    )
+    args_ext = list(args)
+    args_ext[1] = str(path_cpp)
+
+    try:
+        completed_process = run_command(
+            args_cpp, in_process=in_process, capture_output=capture_output
         )
-        log_completed_process()
-        sys.exit(1)
+        if completed_process.returncode or not path_cpp.exists():
+            return completed_process
+        return run_command(
+            args_ext,
+            env=env,
+            in_process=in_process,
+            capture_output=capture_output,
+        )
+    finally:
+        rmtree(path_build, ignore_errors=True)
+
+
+def run_command(args, cwd=None, env=None, in_process=False, capture_output=False):
+    """Run a backend command (in a subprocess or with :func:`run_in_process`)"""
+    if in_process:
+        return run_in_process(args, cwd, env)
+    if capture_output:
+        stdout = stderr = subprocess.PIPE
+    else:
+        stdout = stderr = None
+    return subprocess.run(
+        args,
+        stdout=stdout,
+        stderr=stderr,
+        universal_newlines=True,
+        cwd=cwd,
+        env=env,
+    )
+
+
+def run_in_process(args, cwd=None, env=None):
+    """Run a backend command in this process
+
+    The command (as built by :func:`compile_and_publish`) is run without
+    launching a new interpreter and the outputs are not captured. The
+    configuration of Pythran is read again from its files (which can have
+    changed since Pythran was imported) and the global state modified by
+    Pythran (level of its logger and configuration) is restored so that this
+    function can be called many times in one process.
+
+    """
+    argv_before = sys.argv
+    cwd_before = os.getcwd()
+    environ_before = None
+    if env is not None:
+        environ_before = dict(os.environ)
+        os.environ.clear()
+        os.environ.update(env)
+    if cwd is not None:
+        os.chdir(cwd)
+    try:
+        if args[0] == "pythran":
+            import pythran.config
+            from pythran.run import run
+
+            logger_pythran = logging.getLogger("pythran")
+            level_before = logger_pythran.level
+            cfg = pythran.config.cfg
+            cfg_before = {section: dict(cfg[section]) for section in cfg}
+            cfg_files = pythran.config.init_cfg(
+                "pythran.cfg", f"pythran-{sys.platform}.cfg", ".pythranrc"
+            )
+            cfg.clear()
+            cfg.read_dict(cfg_files)
+            sys.argv = list(args)
+            try:
+                run()
+            finally:
+                logger_pythran.setLevel(level_before)
+                cfg.clear()
+                cfg.read_dict(cfg_before)
+        else:
+            from transonic_cl.cythonize import cythonize_file
+
+            cythonize_file(args[-1])
+        returncode = 0
+    except SystemExit as error:
+        if error.code is None or isinstance(error.code, int):
+            returncode = error.code or 0
+        else:
+            print(error.code, file=sys.stderr)
+            returncode = 1
+    except Exception:
+        traceback.print_exc()
+        returncode = 1
+    finally:
+        sys.argv = argv_before
+        os.chdir(cwd_before)
+        if environ_before is not None:
+            os.environ.clear()
+            os.environ.update(environ_before)
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+    return subprocess.CompletedProcess(args, returncode)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+"""Persistent compilation worker
+================================
+
+A worker is a process launched (with :code:`python -m transonic_cl.worker
+<backend>`) and reused by the compilation scheduler of Transonic (see
+:class:`transonic.compiler.CompilationWorkerPool`). The backend (Pythran or
+Cython) is imported once when the worker starts, so that the compilations do
+not pay the start of a new interpreter and the import of the backend.
+
+The worker reads the compilation requests on its standard input (one JSON
+object per line with the keys :code:`argv`, :code:`cwd` and :code:`env`) and
+runs them one after the other with :func:`transonic_cl.run_backend.main`
+(without subprocess for the backend). When possible (POSIX), each compilation
+is run in a child forked from the worker (which has already imported the
+backend), so that the peak memory of each compilation is measured (with
+:func:`os.wait4`) and the state of the worker is not modified. For each
+request, the worker writes on its standard output a JSON line with the keys
+:code:`returncode`, :code:`output` (standard output and error of the
+compilation) and :code:`memory_peak` (in bytes, or null if it cannot be
+known). The worker exits at the end of its standard input.
+
+Internal API
+------------
+
+.. autofunction:: main
+
+.. autofunction:: run_job
+
+.. autofunction:: run_job_in_child
+
+"""
+
+import json
+import os
+import sys
+import tempfile
+import traceback
+
+from transonic_cl import run_backend
+
+
+def run_job(argv, cwd=None, env=None):
+    """Run one compilation and return its return code and its output
+
+    During the compilation, the file descriptors 1 and 2 are redirected to a
+    temporary file (so that the outputs of the compilers launched by the
+    backend are also captured), the current directory is :code:`cwd` and the
+    environment is :code:`env`.
+
+    """
+    environ_before = dict(os.environ)
+    cwd_before = os.getcwd()
+    fds_before = [os.dup(1), os.dup(2)]
+
+    with tempfile.TemporaryFile(mode="w+") as file_output:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(file_output.fileno(), 1)
+        os.dup2(file_output.fileno(), 2)
+        if env is not None:
+            os.environ.clear()
+            os.environ.update(env)
+        try:
+            if cwd is not None:
+                os.chdir(cwd)
+            run_backend.main(argv, in_process=True)
+            returncode = 0
+        except SystemExit as error:
+            if error.code is None or isinstance(error.code, int):
+                returncode = error.code or 0
+            else:
+                print(error.code, file=sys.stderr)
+                returncode = 1
+        except Exception:
+            traceback.print_exc()
+            returncode = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for fd, fd_before in enumerate(fds_before, start=1):
+                os.dup2(fd_before, fd)
+                os.close(fd_before)
+            os.chdir(cwd_before)
+            os.environ.clear()
+            os.environ.update(environ_before)
+
+        file_output.seek(0)
+        output = file_output.read()
+
+    return {"returncode": returncode, "output": output}
+
+
+def run_job_in_child(argv, cwd=None, env=None):
+    """Run one compilation in a forked child and measure its peak memory"""
+    fd_read, fd_write = os.pipe()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        os.close(fd_read)
+        try:
+            result = run_job(argv, cwd, env)
+            with os.fdopen(fd_write, "w") as file:
+                json.dump(result, file)
+        finally:
+            os._exit(0)
+
+    os.close(fd_write)
+    with os.fdopen(fd_read) as file:
+        data = file.read()
+    _, status, rusage = os.wait4(pid, 0)
+
+    if data:
+        result = json.loads(data)
+    else:
+        returncode = os.waitstatus_to_exitcode(status)
+        result = {
+            "returncode": run_backend.exit_code_retry,
+            "output": f"Compilation process died (return code {returncode})\n",
+        }
+    # ru_maxrss includes the waited descendants (compilers)
+    memory_peak = rusage.ru_maxrss
+    if sys.platform != "darwin":
+        memory_peak *= 1024
+    result["memory_peak"] = memory_peak
+    return result
+
+
+def main():
+    """Preload the backend and run the compilation requests"""
+    backend = sys.argv[1]
+
+    # the protocol uses a copy of the initial standard output and what is
+    # written on fd 1 outside of the compilations goes to the standard error
+    protocol = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+
+    if backend == "pythran":
+        import pythran.run  # noqa: F401
+    elif backend == "cython":
+        import transonic_cl.cythonize  # noqa: F401
+        from Cython.Build import cythonize  # noqa: F401
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        args = (request["argv"], request["cwd"], request["env"])
+        if hasattr(os, "fork") and hasattr(os, "wait4"):
+            result = run_job_in_child(*args)
+        else:
+            result = run_job(*args)
+            result["memory_peak"] = None
+        try:
+            protocol.write(json.dumps(result) + "\n")
+            protocol.flush()
+        except BrokenPipeError:
+            # the parent process is dead
+            break
+
+
+if __name__ == "__main__":
+    main()
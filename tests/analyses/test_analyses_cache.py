@@ -0,0 +1,49 @@
+import pytest
+
+from transonic import mpi
+from transonic.analyses import cache
+from transonic.analyses.justintime import analysis_jit
+
+code = """
+from transonic import jit
+
+from dep import func_dep
+
+
+@jit
+def func(a):
+    return func_dep(a)
+"""
+
+
+@pytest.mark.skipif(mpi.nb_proc > 1, reason="Sequential test")
+def test_cached_analysis(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "path_cache", tmp_path / "analyses")
+    monkeypatch.setattr(cache, "use_cache", True)
+
+    path_dep = tmp_path / "dep.py"
+    path_dep.write_text("def func_dep(a):\n    return a\n")
+    pathfile = str(tmp_path / "mod.py")
+
+    result = analysis_jit(code, pathfile, "pythran")
+    paths_cached = list((tmp_path / "analyses" / "jit").glob("*.pkl"))
+    assert len(paths_cached) == 1
+    mtime = paths_cached[0].stat().st_mtime_ns
+
+    # second analysis loaded from the cache
+    result_cached = analysis_jit(code, pathfile, "pythran")
+    assert paths_cached[0].stat().st_mtime_ns == mtime
+    assert result_cached[1] == result[1]
+    assert result_cached[3] == result[3]
+    assert list(result_cached[0]["functions"]) == ["func"]
+
+    # a modification of the imported module invalidates the cache
+    path_dep.write_text("def func_dep(a):\n    return 2 * a\n")
+    result_new = analysis_jit(code, pathfile, "pythran")
+    assert result_new[3] != result[3]
+    assert "2 * a" in str(result_new[3])
+
+    # the source, the path and the backend are part of the key
+    analysis_jit(code + "\n", pathfile, "pythran")
+    analysis_jit(code, pathfile, "python")
+    assert len(list((tmp_path / "analyses" / "jit").glob("*.pkl"))) == 3
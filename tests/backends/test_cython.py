@@ -1,6 +1,7 @@
 import numpy as np
+import pytest
 
-from transonic import Array, const
+from transonic import Array, const, typeof
 from transonic.backends import backends
 
 backend = backends["cython"]
@@ -24,7 +25,11 @@ def test_array():
     compare('np.ndarray[np.int_t, ndim=2, mode="c"]', int, "2d", memview, "C")
     compare("np.ndarray[np.int_t, ndim=3]", int, "3d", memview, "strided")
     compare(
-        'np.ndarray[np.int32_t, ndim=2, mode="f"]', np.int32, "2d", memview, "F"
+        'np.ndarray[np.int32_t, ndim=2, mode="fortran"]',
+        np.int32,
+        "2d",
+        memview,
+        "F",
     )
     compare(
         "np.ndarray[np.int_t, ndim=2, negative_indices=False]",
@@ -40,3 +45,32 @@ def test_const():
     assert "const " + A.format_as_backend_type(type_formatter) == const(
         A
     ).format_as_backend_type(type_formatter)
+
+
+def test_compile_array_layouts(tmp_path):
+    pytest.importorskip("Cython")
+    from Cython.Compiler.Main import compile as cython_compile
+
+    arr = np.ones((4, 6))
+    for array in (arr, arr.T, arr[::2, ::3]):
+        type_code = typeof(array).format_as_backend_type(type_formatter)
+        path = tmp_path / "mod.pyx"
+        path.write_text(
+            f"cimport numpy as np\n\ndef func({type_code} a):\n    return a[0, 0]\n"
+        )
+        result = cython_compile(str(path), language_level=3)
+        assert result.num_errors == 0, type_code
+
+
+def test_is_wrong_types_error():
+    assert backend.is_wrong_types_error(TypeError("an integer is required"))
+    # raised by the buffer checks of the arguments
+    for message in (
+        "ndarray is not C-contiguous",
+        "ndarray is not Fortran contiguous",
+        "Buffer dtype mismatch, expected 'double' but got 'long'",
+        "Buffer has wrong number of dimensions (expected 1, got 2)",
+    ):
+        assert backend.is_wrong_types_error(ValueError(message))
+    # raised by the body of the function
+    assert not backend.is_wrong_types_error(ValueError("math domain error"))
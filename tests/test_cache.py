@@ -0,0 +1,185 @@
+import os
+import time
+
+from transonic.cache import CacheIndex, FailureIndex, parse_size
+from transonic.run import run_cache
+
+hex_src = "a" * 32
+hex_src_new = "b" * 32
+
+
+def create_extension(path_dir, name, size, mtime):
+    path = path_dir / name
+    path.write_bytes(b"0" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_parse_size():
+    assert parse_size(None) is None
+    assert parse_size("1000") == 1000
+    assert parse_size("2k") == 2000
+    assert parse_size("1.5G") == 1_500_000_000
+    assert parse_size("10MB") == 10_000_000
+
+
+def test_cache_index(tmp_path, capsys, monkeypatch):
+    path_jit = tmp_path / "pythran" / "__jit__" / "mod"
+    path_jit.mkdir(parents=True)
+    now = time.time()
+
+    # old extension superseded by an extension for a new source
+    create_extension(path_jit, f"func_{hex_src}_{'0' * 32}.so", 100, now - 100)
+    path_new = create_extension(
+        path_jit, f"func_{hex_src_new}_{'0' * 32}.so", 100, now - 50
+    )
+    # shards of the incremental mode, both used
+    path_shard0 = create_extension(
+        path_jit, f"other_{hex_src}_{'1' * 32}.so", 200, now - 40
+    )
+    path_shard1 = create_extension(
+        path_jit, f"other_{hex_src}_{'2' * 32}.so", 300, now - 30
+    )
+    path_input_shard0 = path_jit / f"other_shard_{'1' * 32}.py"
+    path_input_shard0.write_text("")
+
+    index = CacheIndex(tmp_path)
+    for path in (path_shard0, path_shard0, path_new, path_shard1):
+        index.record_use(path)
+    index.flush()
+
+    with CacheIndex(tmp_path) as index:
+        assert len(index.entries) == 3
+        assert index.entries[index._make_key(path_shard0)]["hits"] == 2
+        index.sync()
+        assert index.get_total_size() == 700
+        assert index.verify() == []
+
+        assert index.find_superseded() == [
+            f"pythran/__jit__/mod/func_{hex_src}_{'0' * 32}.so"
+        ]
+
+        removed = index.prune(max_size=400, dry_run=True)
+        assert len(removed) == 2
+        assert index.get_total_size() == 700
+
+        # shard0 is the least recently used
+        removed = index.prune(max_size=400)
+        assert removed[1] == index._make_key(path_shard0)
+        assert index.get_total_size() == 400
+        assert not path_shard0.exists()
+        assert not path_input_shard0.exists()
+
+    monkeypatch.setattr("transonic.run.CacheIndex", lambda: CacheIndex(tmp_path))
+    run_cache(["--cache", "stats"])
+    assert "2 extensions" in capsys.readouterr().out
+
+    path_shard1.unlink()
+    (path_jit / "foo.tmp").write_text("")
+    with CacheIndex(tmp_path) as index:
+        problems = index.verify()
+        assert len(problems) == 2
+        assert len(index.entries) == 1
+
+
+def test_cache_index_shards(tmp_path):
+    path_jit = tmp_path / "pythran" / "__jit__" / "mod"
+    path_jit.mkdir(parents=True)
+    now = time.time()
+
+    # the older shard is not used after the creation of the newer one
+    create_extension(path_jit, f"func_{hex_src}_{'1' * 32}.so", 100, now - 100)
+    create_extension(path_jit, f"func_{hex_src}_{'2' * 32}.so", 100, now - 50)
+    # shard of an older source, not used after the creation of the newer shard
+    create_extension(
+        path_jit, f"func_{hex_src_new}_{'3' * 32}.so", 100, now - 200
+    )
+
+    with CacheIndex(tmp_path) as index:
+        index.sync()
+        assert len(index.entries) == 3
+        assert index.find_superseded() == [
+            f"pythran/__jit__/mod/func_{hex_src_new}_{'3' * 32}.so"
+        ]
+        index.prune()
+        assert len(index.entries) == 2
+
+
+def test_cache_index_pch(tmp_path):
+    path_jit = tmp_path / "pythran" / "__jit__" / "mod"
+    path_jit.mkdir(parents=True)
+    now = time.time()
+    create_extension(path_jit, f"func_{hex_src}_{'0' * 32}.so", 100, now - 50)
+
+    # precompiled headers, the older one used recently (directory touched)
+    paths_pch = []
+    for index_pch, mtime in enumerate((now - 100, now - 200)):
+        path_dir = tmp_path / "pythran_pch" / (str(index_pch) * 32)
+        path_dir.mkdir(parents=True)
+        (path_dir / "pythonic_pch.hpp").write_text("")
+        paths_pch.append(
+            create_extension(path_dir, "pythonic_pch.hpp.gch", 1000, mtime)
+        )
+        os.utime(path_dir, (mtime, mtime))
+    os.utime(paths_pch[1].parent, (now - 10, now - 10))
+
+    with CacheIndex(tmp_path) as index:
+        index.sync()
+        assert len(index.entries) == 3
+        assert index.get_total_size() == 2100
+        assert index.find_superseded() == []
+        assert index.verify() == []
+
+        removed = index.prune(max_size=1500)
+        assert removed == [index._make_key(paths_pch[0])]
+        assert not paths_pch[0].parent.exists()
+        assert paths_pch[1].exists()
+        assert index.get_total_size() == 1100
+
+
+def test_cache_index_formatted(tmp_path, monkeypatch):
+    now = time.time()
+    path_dir = tmp_path / "formatted" / "ab"
+    path_dir.mkdir(parents=True)
+    path_old = create_extension(path_dir, "ab" + "0" * 30 + ".py", 10, now - 100)
+    path_new = create_extension(path_dir, "ab" + "1" * 30 + ".py", 10, now - 50)
+
+    index = CacheIndex(tmp_path)
+    index.record_use(path_old)
+    index.flush()
+
+    with CacheIndex(tmp_path) as index:
+        index.sync()
+        assert len(index.entries) == 2
+        assert index.find_superseded() == []
+        removed = index.prune(max_size=10)
+        assert removed == [index._make_key(path_new)]
+        assert not path_new.exists() and path_old.exists()
+        assert path_dir.exists()
+
+    monkeypatch.setattr("transonic.run.CacheIndex", lambda: CacheIndex(tmp_path))
+    run_cache(["--cache", "stats"])
+
+
+def test_failure_index(tmp_path, capsys, monkeypatch):
+    index = FailureIndex(tmp_path)
+    assert not index.has_failed(hex_src, "func(int)")
+    index.record(hex_src, "func(int)", "pythran", tmp_path / "func.py")
+
+    index = FailureIndex(tmp_path)
+    assert index.has_failed(hex_src, "func(int)")
+    assert not index.has_failed(hex_src_new, "func(int)")
+    assert not index.has_failed(hex_src, "func(float)")
+    # the old failures are retried
+    index.max_age = 0.0
+    assert not index.has_failed(hex_src, "func(int)")
+
+    monkeypatch.setattr("transonic.run.CacheIndex", lambda: CacheIndex(tmp_path))
+    run_cache(["--cache", "failures"])
+    out = capsys.readouterr().out
+    assert "pythran: func(int)" in out
+    assert "1 failed compilations" in out
+
+    run_cache(["--cache", "clear-failures"])
+    assert "1 failed compilations forgotten" in capsys.readouterr().out
+    assert not FailureIndex(tmp_path).has_failed(hex_src, "func(int)")
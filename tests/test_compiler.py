@@ -0,0 +1,225 @@
+import os
+import sys
+
+import pytest
+
+from transonic import mpi
+from transonic.backends import backends
+from transonic.compiler import (
+    CompilationJob,
+    CompilationWorkerPool,
+    SchedulerPopen,
+    get_available_memory,
+    get_isa_fingerprint,
+    make_accelerator_flags,
+    make_build_fingerprint,
+)
+from transonic.util import can_import_accelerator
+from transonic_cl.run_backend import exit_code_retry
+
+
+def test_get_available_memory():
+    memory = get_available_memory()
+    assert memory is None or memory > 0
+
+
+def test_make_build_fingerprint(monkeypatch):
+    flags = make_accelerator_flags(xsimd=True, str_accelerator_flags="-O3")
+    assert flags == ["-O3", "-DUSE_XSIMD"]
+
+    fingerprint = make_build_fingerprint("pythran", flags)
+    assert fingerprint == make_build_fingerprint("pythran", flags)
+    assert fingerprint != make_build_fingerprint("pythran", [])
+    assert fingerprint != make_build_fingerprint("cython", flags)
+
+    flags_native = ["-march=native"]
+    fingerprint_native = make_build_fingerprint("pythran", flags_native)
+    monkeypatch.setattr(
+        "transonic.compiler.get_isa_fingerprint", lambda: "another cpu"
+    )
+    # only native builds depend on the CPU
+    assert fingerprint == make_build_fingerprint("pythran", flags)
+    assert fingerprint_native != make_build_fingerprint("pythran", flags_native)
+    assert get_isa_fingerprint()
+
+    # "native" in the toolchain (path, configuration) is not a native build
+    monkeypatch.setattr(
+        "transonic.compiler.get_toolchain_fingerprint",
+        lambda backend: "/opt/native/bin/c++",
+    )
+    fingerprint = make_build_fingerprint("pythran", flags)
+    monkeypatch.setattr(
+        "transonic.compiler.get_isa_fingerprint", lambda: "a third cpu"
+    )
+    assert fingerprint == make_build_fingerprint("pythran", flags)
+
+
+@pytest.mark.skipif(mpi.nb_proc > 1, reason="Files written by rank 0")
+def test_name_ext_build_record(tmp_path, monkeypatch):
+    backend = backends["pythran"]
+    monkeypatch.setattr("transonic.backends.base.path_root", tmp_path / "root")
+    path_backend = tmp_path / "mod.py"
+    path_backend.write_text("def func():\n    return 1\n")
+
+    name_default = backend.name_ext_from_path_backend(path_backend)
+    assert name_default == backend.name_ext_from_path_backend(path_backend, "")
+
+    # the flags are recorded in the Transonic directory and not reused for
+    # the next compilations
+    calls = []
+    monkeypatch.setattr(
+        "transonic.backends.base.compile_extension",
+        lambda *args, **kwargs: calls.append(kwargs),
+    )
+    backend.compile_extension(path_backend, str_accelerator_flags="-O3")
+    name = backend.name_ext_from_path_backend(path_backend)
+    assert name == backend.name_ext_from_path_backend(path_backend, "-O3")
+    assert name != name_default
+    assert sorted(path.name for path in tmp_path.glob("mod*")) == ["mod.py"]
+    backend.compile_extension(path_backend)
+    assert calls[1]["str_accelerator_flags"] is None
+    assert backend.name_ext_from_path_backend(path_backend) == name_default
+
+    # the extensions built with another toolchain are not selected
+    backend._save_build_flags(path_backend, ["-O3"])
+    monkeypatch.setattr(
+        "transonic.compiler.get_toolchain_fingerprint",
+        lambda backend: "another compiler",
+    )
+    assert backend.name_ext_from_path_backend(path_backend) != name
+
+    # only the names of native builds depend on the CPU of the host
+    name = backend.name_ext_from_path_backend(path_backend)
+    backend._save_build_flags(path_backend, ["-march=native"])
+    name_native = backend.name_ext_from_path_backend(path_backend)
+    monkeypatch.setattr(
+        "transonic.compiler.get_isa_fingerprint", lambda: "another cpu"
+    )
+    assert backend.name_ext_from_path_backend(path_backend) != name_native
+    backend._save_build_flags(path_backend, ["-O3"])
+    assert backend.name_ext_from_path_backend(path_backend) == name
+
+
+@pytest.mark.skipif(mpi.nb_proc > 1, reason="The scheduler uses collectives")
+def test_scheduler_memory(tmp_path):
+    scheduler = SchedulerPopen()
+    scheduler._path_memory_peaks = tmp_path / "compilation_memory.json"
+    assert scheduler.estimate_memory("pythran") == 3e9
+
+    code = "import time; data = bytearray(50_000_000); time.sleep(0.2)"
+    job = CompilationJob([sys.executable, "-c", code], None, None, "pythran")
+    process = mpi.ShellProcessMPI(job)
+    scheduler._submit(process)
+    assert process.is_alive()
+    scheduler.wait_for_all_extensions()
+    assert not process.is_alive()
+    assert job.returncode == 0
+
+    if sys.platform.startswith("linux"):
+        memory_peak = scheduler.estimate_memory("pythran")
+        assert 50e6 < memory_peak < 3e9
+        # the memory peaks are saved on disk
+        assert scheduler.estimate_memory("cython") == 1e9
+        scheduler.memory_peaks = None
+        assert scheduler.estimate_memory("pythran") == memory_peak
+
+    # no compilation is launched if the memory is not sufficient
+    scheduler.processes.append("fake process")
+    scheduler._memory_estimations_running["fake process"] = 2e9
+    scheduler.memory_budget = 4e9
+    assert not scheduler._can_launch(10, 3e9)
+    assert scheduler._can_launch(10, 1e9)
+    assert not scheduler._can_launch(1, 1e9)
+
+
+@pytest.mark.skipif(mpi.nb_proc > 1, reason="The scheduler uses collectives")
+def test_scheduler_priority(tmp_path):
+    scheduler = SchedulerPopen(parallel=False)
+    scheduler._path_memory_peaks = tmp_path / "compilation_memory.json"
+
+    def submit(duration, priority):
+        job = CompilationJob(
+            [sys.executable, "-c", f"import time; time.sleep({duration})"],
+            None,
+            None,
+            "test",
+            priority=priority,
+        )
+        process = mpi.ShellProcessMPI(job)
+        scheduler._submit(process)
+        return process
+
+    process_running = submit(0.5, 0)
+    process_low = submit(0, 0)
+    process_high = submit(0, 5)
+
+    assert process_running.process.popen is not None
+    assert process_low.is_alive() and process_low.process.popen is None
+    assert scheduler._queue[0][2] is process_high
+
+    assert scheduler.set_priority(process_low, 10)
+    assert scheduler._queue[0][2] is process_low
+    assert scheduler.set_priority(process_high, 1, only_raise=True)
+    assert process_high.process.priority == 5
+    assert not scheduler.set_priority(process_running, 10)
+
+    scheduler.wait_for_all_extensions()
+    for process in (process_running, process_low, process_high):
+        assert process.process.returncode == 0
+
+
+@pytest.mark.skipif(
+    not can_import_accelerator("pythran"), reason="Pythran is needed"
+)
+def test_worker_pool(tmp_path):
+    (tmp_path / "mod.py").write_text(
+        "# pythran export add(int, int)\ndef add(a, b):\n    return a + b\n"
+    )
+    (tmp_path / "bad.py").write_text(
+        "# pythran export bad(int)\ndef bad(a):\n    return type(a).__name__\n"
+    )
+    pool = CompilationWorkerPool()
+
+    def compile(name_file, name_ext):
+        argv = [name_file, "-b", "pythran", "-o", name_ext]
+        task = pool.submit(argv, tmp_path, None, "pythran", capture_output=True)
+        assert task.poll() is None
+        return task, task.wait()
+
+    try:
+        task, returncode = compile("mod.py", "mod0.so")
+        assert returncode == 0
+        worker = task.worker
+        assert "created by pythran" in task.stdout.read()
+        assert task.memory_peak is None or task.memory_peak > 0
+
+        # the worker is reused, also after a failed compilation
+        task, returncode = compile("bad.py", "bad.so")
+        assert returncode == 1
+        assert "has not been created" in task.stdout.read()
+        task, returncode = compile("mod.py", "mod1.so")
+        assert returncode == 0
+        # the peak memory is measured for each compilation of a worker
+        if hasattr(os, "wait4"):
+            assert task.memory_peak > 0
+        assert task.worker is worker and worker.nb_jobs == 3
+
+        # the environment and the Pythran configuration are those of the job
+        path_pythranrc = tmp_path / "pythranrc"
+        path_pythranrc.write_text("[compiler]\ncxx=/nonexistent/c++\n")
+        argv = ["mod.py", "-b", "pythran", "-o", "mod2.so"]
+        env = dict(os.environ, PYTHRANRC=str(path_pythranrc))
+        task = pool.submit(argv, tmp_path, env, "pythran", capture_output=True)
+        assert task.wait() != 0
+        assert task.worker is worker
+        assert pool._idle == [worker]
+        assert len(list(tmp_path.glob("mod?.*"))) == 2
+
+        # a compilation interrupted by the death of the worker can be retried
+        task = pool.submit(argv, tmp_path, None, "pythran", capture_output=True)
+        task.worker.popen.kill()
+        assert task.wait() == exit_code_retry
+        assert "worker died" in task.stdout.read()
+    finally:
+        pool.close()
+    assert not worker.is_alive()
@@ -0,0 +1,79 @@
+import os
+from importlib.util import module_from_spec, spec_from_file_location
+
+import pytest
+
+from transonic import mpi
+from transonic.util import can_import_accelerator
+from transonic_cl import cxx_launcher
+from transonic_cl.cxx_launcher import split_compile_command
+from transonic_cl.run_backend import (
+    ext_suffix,
+    get_cxx_launcher,
+    has_to_split_pythran,
+    main,
+)
+
+
+def test_split_compile_command():
+    flags = split_compile_command(
+        ["-O2", "-Ifoo", "-c", "mod.cpp", "-o", "/tmp/mod.o", "-std=c++17"]
+    )
+    assert flags == ["-O2", "-Ifoo", "-std=c++17"]
+    assert split_compile_command(["-shared", "mod.o", "-o", "mod.so"]) is None
+
+
+def test_split_opt_in(monkeypatch):
+    monkeypatch.delenv("TRANSONIC_CXX_LAUNCHER", raising=False)
+    monkeypatch.delenv("TRANSONIC_PYTHRAN_PCH", raising=False)
+    # the single invocation of Pythran is the default (even with ccache)
+    assert get_cxx_launcher() == ""
+    assert not has_to_split_pythran()
+
+    monkeypatch.setenv("TRANSONIC_CXX_LAUNCHER", "ccache")
+    assert get_cxx_launcher() == "ccache"
+    assert has_to_split_pythran() == (os.name != "nt")
+
+
+@pytest.mark.skipif(
+    not can_import_accelerator("pythran"), reason="Pythran is needed"
+)
+def test_get_mtime_pythonic():
+    # part of the key of the precompiled headers
+    assert cxx_launcher.get_mtime_pythonic() > 0
+
+
+@pytest.mark.skipif(
+    not can_import_accelerator("pythran"), reason="Pythran is needed"
+)
+@pytest.mark.skipif(os.name == "nt", reason="Not implemented on Windows")
+@pytest.mark.skipif(mpi.nb_proc > 1, reason="No MPI needed")
+def test_compile_pythran_split(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TRANSONIC_DIR", str(tmp_path))
+    monkeypatch.setattr(cxx_launcher, "path_root", tmp_path)
+
+    # a fake compiler cache recording the commands
+    path_launcher = tmp_path / "launcher.sh"
+    path_launcher.write_text('#!/bin/sh\necho "$@" >> launcher.log\nexec "$@"\n')
+    path_launcher.chmod(0o755)
+    monkeypatch.setenv("TRANSONIC_CXX_LAUNCHER", str(path_launcher))
+    monkeypatch.setenv("TRANSONIC_PYTHRAN_PCH", "1")
+
+    (tmp_path / "mod.py").write_text(
+        "# pythran export add(int, int)\ndef add(a, b):\n    return a + b\n"
+    )
+    main(["mod.py", "-b", "pythran", "-o", "mod_abc.so"], in_process=True)
+
+    assert (tmp_path / ("mod_abc" + ext_suffix)).exists()
+    assert not (tmp_path / "mod_abc.build").exists()
+    # compilation and link
+    commands = (tmp_path / "launcher.log").read_text().splitlines()
+    assert len(commands) == 2
+    assert "pythonic_pch.hpp" in commands[0]
+    assert list((tmp_path / "pythran_pch").glob("*/pythonic_pch.hpp.?ch"))
+
+    spec = spec_from_file_location("mod_abc", tmp_path / ("mod_abc" + ext_suffix))
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    assert module.add(1, 2) == 3
@@ -0,0 +1,56 @@
+import subprocess
+import sys
+
+from transonic_cl.file_lock import FileLock
+
+code_try_lock = """
+import sys
+from transonic_cl.file_lock import FileLock
+lock = FileLock(sys.argv[1])
+sys.exit(0 if lock.acquire(blocking=False) else 1)
+"""
+
+code_hold_lock = """
+import sys, time
+from transonic_cl.file_lock import FileLock
+lock = FileLock(sys.argv[1])
+lock.acquire()
+print("locked", flush=True)
+time.sleep(100)
+"""
+
+
+def try_lock_in_other_process(path):
+    return subprocess.call([sys.executable, "-c", code_try_lock, str(path)])
+
+
+def test_file_lock(tmp_path):
+    path = tmp_path / "foo.lock"
+    lock = FileLock(path)
+
+    with lock:
+        assert lock.is_locked
+        assert path.exists()
+        assert try_lock_in_other_process(path) == 1
+
+    assert not lock.is_locked
+    assert try_lock_in_other_process(path) == 0
+
+
+def test_file_lock_dead_owner(tmp_path):
+    path = tmp_path / "foo.lock"
+    process = subprocess.Popen(
+        [sys.executable, "-c", code_hold_lock, str(path)],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert process.stdout.readline().strip() == "locked"
+
+    lock = FileLock(path)
+    assert not lock.acquire(blocking=False)
+
+    process.kill()
+    process.wait()
+
+    assert lock.acquire(blocking=False)
+    lock.release()
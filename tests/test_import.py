@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from transonic import mpi
+
+# modules slow to import, only needed for the analyses, the code generation,
+# the formatting, the compilations or with MPI
+heavy_modules = {
+    "autopep8",
+    "black",
+    "gast",
+    "importlib.metadata",
+    "IPython",
+    "mpi4py",
+    "rich",
+    "transonic.analyses",
+    "unittest.mock",
+}
+
+# import times (s), much larger than the measured times to avoid false failures
+budgets = {"import transonic": 0.05, "from transonic import boost, jit": 0.5}
+
+pytestmark = pytest.mark.skipif(
+    mpi.nb_proc > 1, reason="The subprocesses would be MPI processes"
+)
+
+
+def run_python(code, env=None):
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+
+
+def get_modules_imported(code):
+    process = run_python(
+        code + "\nimport json, sys\nprint(json.dumps(sorted(sys.modules)))"
+    )
+    return set(json.loads(process.stdout.splitlines()[-1]))
+
+
+def measure_import_time(code):
+    """Wall time (s) of the statement, including the lazy imports it triggers"""
+    process = run_python(
+        "from time import perf_counter\n"
+        "time_start = perf_counter()\n"
+        f"{code}\n"
+        "print(perf_counter() - time_start)"
+    )
+    return float(process.stdout.splitlines()[-1])
+
+
+def test_import_transonic():
+    modules = get_modules_imported("import transonic")
+    assert {name for name in modules if name.startswith("transonic.")} == set()
+
+
+def test_namespace_transonic():
+    process = run_python(
+        "import transonic\nprint(' '.join(sorted(vars(transonic))))"
+    )
+    names = process.stdout.split()
+    assert "TYPE_CHECKING" not in names
+    assert "import_module" not in names
+
+
+def test_import_backends_no_directories(tmp_path):
+    path_dir = tmp_path / ".transonic"
+    env = dict(os.environ, TRANSONIC_DIR=str(path_dir))
+    run_python("from transonic.backends import backends", env=env)
+    assert not path_dir.exists() or not any(path_dir.iterdir())
+
+
+def test_import_user_api():
+    modules = get_modules_imported(
+        "from transonic import boost, jit, Array, NDim, Type"
+    )
+    assert heavy_modules.isdisjoint(modules), heavy_modules & modules
+
+
+@pytest.mark.parametrize("code", budgets)
+def test_import_time(code):
+    # minimum of few measurements to limit the effect of the noise
+    import_time = min(measure_import_time(code) for _ in range(3))
+    assert import_time < budgets[code], f"{code}: {import_time:.3f} s"
@@ -151,6 +151,11 @@ class TestsInit(unittest.TestCase):
         assert not ts.is_compiling
         assert ts.is_compiled
 
+        # the names are rebound to the native functions (without wrapper)
+        assert for_test_init.func is ts.module_backend.func
+        method = for_test_init.Transmitter.__dict__["other_func"]
+        assert method.__code__.co_name == "new_method"
+
         for_test_init.func(1, 3.14)
         for_test_init.func1(1.1, 2.2)
         for_test_init.check_class()
@@ -12,6 +12,7 @@ from transonic.justintime import modules
 from transonic import mpi
 from transonic.util import can_import_accelerator
 from transonic.config import backend_default
+from transonic.typing import compute_type_key
 
 backend = backends[backend_default]
 scheduler.nb_cpus = 2
@@ -102,6 +103,124 @@ def test_jit_array_bool():
     wait_for_all_extensions()
     assert np.allclose(a, func_identity(a))
 
+    if not can_import_accelerator():
+        return
+
+    cjit = modules[module_name].jit_functions["func_identity"]
+    func_identity(a)
+    assert cjit.dispatch_table[compute_type_key(a),] is cjit.backend_func
+
+
+def test_jit_dispatch_wrong_types():
+    from _transonic_testing.for_test_justintime import func_identity
+
+    if not can_import_accelerator():
+        return
+
+    cjit = modules[module_name].jit_functions["func_identity"]
+    assert func_identity(1) == 1
+
+    def backend_func_wrong(arg):
+        raise TypeError("for example a list with elements of other types")
+
+    # the calls not supported by the dispatched function use the slow path
+    cjit.dispatch_table[(int,)] = backend_func_wrong
+    assert func_identity(1) == 1
+    assert cjit.dispatch_table.get((int,)) is not backend_func_wrong
+
+
+def test_jit_incremental():
+    from _transonic_testing.for_test_justintime import func_incremental
+
+    assert func_incremental(1) == 2
+    wait_for_all_extensions()
+    assert func_incremental(1) == 2
+    assert func_incremental(1.5) == 3.0
+    wait_for_all_extensions()
+    assert func_incremental(1.5) == 3.0
+
+    if not can_import_accelerator() or not backend.suffix_header:
+        return
+
+    cjit = modules[module_name].jit_functions["func_incremental"]
+    assert cjit.incremental
+    assert len(cjit.backend_funcs) == 2
+    func_int = cjit.dispatch_table[(int,)]
+    func_float = cjit.dispatch_table[(float,)]
+    assert func_int is not func_float
+    assert func_int in cjit.backend_funcs and func_float in cjit.backend_funcs
+
+
+def test_jit_hot_calls():
+    from _transonic_testing.for_test_justintime import func_hot
+
+    if not can_import_accelerator():
+        return
+
+    cjit = modules[module_name].jit_functions["func_hot"]
+    key = (int,)
+
+    for _ in range(2):
+        assert func_hot(1) == 2
+        assert not cjit.compiling and cjit.backend_func is None
+
+    nb_calls, duration = cjit.calls_stats[key]
+    assert nb_calls == 2 and duration > 0
+
+    assert func_hot(1) == 2
+    assert cjit.compiling or cjit.backend_func is not None
+    # a type first seen during the compilation
+    key_int64 = (compute_type_key(np.int64(1)),)
+    assert func_hot(np.int64(1)) == 2
+    if cjit.compiling:
+        assert key_int64 in cjit.calls_stats
+        assert key_int64 not in cjit.dispatch_table
+    wait_for_all_extensions()
+    assert func_hot(1) == 2
+    # it is checked again with the new extension
+    assert key_int64 not in cjit.calls_stats
+
+
+def test_jit_mem_layout():
+    from _transonic_testing.for_test_justintime import func_mem_layout
+
+    # copy since Pythran does not support views of reshaped arrays
+    arr = np.arange(24.0).reshape(4, 6).copy()
+    # C-contiguous, Fortran-contiguous and strided arrays
+    arrays = [arr, arr.T, arr[::2, ::3]]
+    for array in arrays:
+        result = array.sum() + array[0, 1]
+        assert func_mem_layout(array) == result
+        wait_for_all_extensions()
+        assert func_mem_layout(array) == result
+
+    if not can_import_accelerator():
+        return
+
+    # each layout is dispatched to the compiled function
+    cjit = modules[module_name].jit_functions["func_mem_layout"]
+    for array in arrays:
+        assert cjit.dispatch_table[compute_type_key(array),] is cjit.backend_func
+
+
+@pytest.mark.skipif(backend_default != "pythran", reason="Pythran specific")
+def test_jit_compilation_failure():
+    from _transonic_testing.for_test_justintime import func_fail
+
+    assert func_fail(1) == "int"
+    wait_for_all_extensions()
+    assert func_fail(1) == "int"
+
+    if not can_import_accelerator():
+        return
+
+    cjit = modules[module_name].jit_functions["func_fail"]
+    assert not cjit.compiling
+    # the failure is recorded and the Python function is directly used
+    assert cjit.dispatch_table[(int,)] is func_fail.__wrapped__
+    assert func_fail(1) == "int"
+    assert not cjit.compiling
+
 
 @pytest.mark.skipif(backend_default == "numba", reason="Not supported by Numba")
 def test_jit_dict():
@@ -195,3 +314,39 @@ def test_jit_imported():
     result = jitted_func_import()
     wait_for_all_extensions()
     assert result == jitted_func_import() == func_import()
+
+
+@pytest.mark.parametrize("mode", ["call", "background"])
+def test_jit_lazy(tmp_path, monkeypatch, mode):
+    from transonic import justintime
+    from transonic.util import import_from_path
+
+    if mode == "background" and mpi.nb_proc > 1:
+        pytest.skip("background mode not used with MPI")
+
+    monkeypatch.setattr(justintime, "_JIT_LAZY", mode)
+    monkeypatch.setattr(justintime, "_COMPILE_JIT", False)
+
+    tmp_path = mpi.PathSeq(mpi.bcast(tmp_path))
+    path_module = tmp_path / f"for_test_jit_lazy_{mode}.py"
+    if mpi.rank == 0:
+        path_module.write_text(
+            "from transonic import jit\n\n\n"
+            "@jit\n"
+            "def add(a, b):\n"
+            "    return a + b\n"
+        )
+    mpi.barrier()
+
+    module = import_from_path(path_module, path_module.stem)
+    mod = modules[path_module.stem]
+    lazy_function = module.add
+    if mode == "call":
+        # nothing has been analysed at import time
+        assert mod._info_analysis is None
+
+    assert module.add(1, 2) == 3
+    assert mod._info_analysis is not None
+    # the name in the module is bound to the jitted function
+    assert module.add is not lazy_function
+    assert module.add(1, 2) == lazy_function(1, 2) == 3
@@ -0,0 +1,106 @@
+import pytest
+
+from transonic import mpi
+from transonic.compiler import SchedulerPopen, ext_suffix
+from transonic.util import can_import_accelerator, import_from_path
+
+
+def test_bcast():
+    for value in (None, 1, "small", ("exists", True), list(range(10_000))):
+        value_root = value if mpi.rank == 0 else None
+        assert mpi.bcast(value_root) == value
+
+
+def test_barrier():
+    mpi.barrier()
+    mpi.barrier(timeout=None)
+
+
+def test_file_system_snapshot(tmp_path):
+    # the directory of the root process (shared file system)
+    tmp_path = mpi.PathSeq(mpi.bcast(tmp_path))
+    path_input = tmp_path / "foo.py"
+    path_ext = tmp_path / "foo_0123.so"
+    if mpi.rank == 0:
+        path_input.write_text("")
+        path_ext.write_text("")
+    mpi.barrier()
+
+    snapshot = mpi.FileSystemSnapshot(
+        directories=[tmp_path, tmp_path / "missing"], paths=[__file__]
+    )
+    assert snapshot.exists(path_ext)
+    assert snapshot.exists(__file__)
+    assert not snapshot.exists(tmp_path / "bar.py")
+    assert snapshot.modification_time(tmp_path / "bar.py") is None
+    assert snapshot.glob(tmp_path, "foo_*.so") == [path_ext]
+    assert snapshot.glob(tmp_path / "missing", "*") == []
+    assert not snapshot.has_to_build(path_ext, tmp_path / "bar.py")
+    assert snapshot.has_to_build(tmp_path / "bar.so", path_input)
+    if mpi.nb_proc == 1:
+        # sequential: the directories are not scanned in advance
+        assert snapshot._stats is None
+
+
+def test_localize_extension(tmp_path):
+    tmp_path = mpi.PathSeq(mpi.bcast(tmp_path))
+    path = tmp_path / f"foo{ext_suffix}"
+    if mpi.rank == 0:
+        path.write_text("extension")
+    mpi.barrier()
+
+    path_local = mpi.localize_extension(path)
+    if mpi.comm_node is None or not mpi.node_local_dir:
+        assert path_local == path
+    else:
+        assert path_local != path
+        assert path_local.read_text() == "extension"
+        assert mpi.localize_extension(path) == path_local
+
+
+def test_compile_ranks():
+    assert mpi.compile_ranks[0] == 0
+    assert mpi.compile_ranks == sorted(set(mpi.compile_ranks))
+    if not mpi.distributed_compilation:
+        assert mpi.compile_ranks == [0]
+    else:
+        assert (mpi.rank in mpi.compile_ranks) == (mpi.rank_node == 0)
+
+
+@pytest.mark.skipif(
+    not can_import_accelerator("pythran"), reason="Pythran is needed"
+)
+def test_compile_ranks_extensions(tmp_path, monkeypatch):
+    tmp_path = mpi.PathSeq(mpi.bcast(tmp_path))
+    if not mpi.distributed_compilation:
+        # each process plays the role of a node leader
+        monkeypatch.setattr(mpi, "compile_ranks", list(range(mpi.nb_proc)))
+    scheduler = SchedulerPopen()
+    if mpi.rank in mpi.compile_ranks:
+        scheduler._path_memory_peaks = tmp_path / f"memory{mpi.rank}.json"
+
+    # one compilation per node leader, in turns
+    names = [f"mod{index}" for index in range(max(2, len(mpi.compile_ranks)))]
+    if mpi.rank == 0:
+        for index, name in enumerate(names):
+            (tmp_path / f"{name}.py").write_text(
+                f"# pythran export add(int, int)\n"
+                f"def add(a, b):\n    return a + b + {index}\n"
+            )
+    processes = [
+        scheduler.compile_extension(
+            tmp_path / f"{name}.py", "pythran", f"{name}{ext_suffix}"
+        )
+        for name in names
+    ]
+    roots = [process.root for process in processes]
+    assert set(roots) == set(mpi.compile_ranks)
+    scheduler.wait_for_all_extensions()
+    assert [process.returncode for process in processes] == [0] * len(names)
+
+    # the extensions produced by each leader are used by all processes
+    for index, name in enumerate(names):
+        # (loaded from a node-local copy with TRANSONIC_MPI_NODE_LOCAL_DIR)
+        path_ext = tmp_path / f"{name}{ext_suffix}"
+        module = import_from_path(path_ext, f"compile_ranks.{name}")
+        assert module.add(1, 2) == 3 + index
@@ -9,7 +9,7 @@ from transonic import util
 from transonic.config import backend_default
 from transonic.mpi import nb_proc
 from transonic.path_data_tests import path_data_tests
-from transonic.run import run
+from transonic.run import parse_args, run
 
 
 path_dir_out = path_data_tests / f"__{backend_default}__"
@@ -93,6 +93,14 @@ def test_create_pythran_simple():
     run()
 
 
+def test_parse_args_cache():
+    # a file or a directory named cache can still be processed
+    args = parse_args(["cache"])
+    assert args.path == ["cache"] and args.cache is None
+    args = parse_args(["--cache", "prune", "--max-size", "1G", "--dry-run"])
+    assert args.cache == "prune" and args.max_size == "1G" and args.dry_run
+
+
 @pytest.mark.skipif(not path_data_tests.exists(), reason="no data tests")
 @pytest.mark.skipif(nb_proc > 1, reason="No commandline in MPI")
 def test_create_trans_classic():
@@ -136,3 +144,38 @@ def test_create_pythran_subpackages():
     path_file = path_data_tests / "subpackages.py"
     sys.argv = f"transonic -nc {path_file}".split()
     run()
+
+
+@pytest.mark.skipif(not path_data_tests.exists(), reason="no data tests")
+@pytest.mark.skipif(nb_proc > 1, reason="No commandline in MPI")
+def test_create_files_parallel(tmp_path):
+    names = ["classic.py", "methods.py", "boosted_func_use_import.py"]
+    names_deps = ["exterior_import_boost.py", "exterior_import_boost_2.py"]
+    path_serial = tmp_path / "serial"
+    path_parallel = tmp_path / "parallel"
+    for path_dir in (path_serial, path_parallel):
+        path_dir.mkdir()
+        for name in names + names_deps:
+            (path_dir / name).write_text((path_data_tests / name).read_text())
+
+    for path_dir, option in ((path_serial, "-j 1"), (path_parallel, "-j 2")):
+        paths = [str(path_dir / name) for name in names]
+        sys.argv = f"transonic -nc -b pythran,python {option}".split() + paths
+        run()
+
+    paths_serial = sorted(
+        path.relative_to(path_serial)
+        for path in path_serial.glob("__*__/*")
+        if path.is_file()
+    )
+    paths_parallel = sorted(
+        path.relative_to(path_parallel)
+        for path in path_parallel.glob("__*__/*")
+        if path.is_file()
+    )
+    assert paths_serial
+    assert paths_parallel == paths_serial
+    for path in paths_serial:
+        assert (path_parallel / path).read_text() == (
+            path_serial / path
+        ).read_text(), path
@@ -1,4 +1,5 @@
 import numpy as np
+import pytest
 
 from transonic.typing import (
     Array,
@@ -16,8 +17,10 @@ from transonic.typing import (
     MemLayout,
     Optional,
     const,
+    compute_type_key,
 )
 
+from transonic.backends import backends
 from transonic.backends.typing import base_type_formatter
 
 
@@ -119,11 +122,62 @@ def test_typeof_set():
     assert S.format_as_backend_type(base_type_formatter) == "str set"
 
 
+def test_typeof_sample():
+    # only a sample of the elements of large containers is checked
+    ints = list(range(1000))
+    ints[1] = "foo"
+    assert repr(typeof(ints)) == "List[int]"
+    with pytest.raises(ValueError):
+        typeof(ints, full_check=True)
+
+    ints[-1] = "foo"
+    with pytest.raises(ValueError):
+        typeof(ints)
+
+    dict_large = {index: float(index) for index in range(1000)}
+    dict_large[-1] = "foo"
+    with pytest.raises(ValueError):
+        typeof(dict_large)
+    dict_large[-1] = 1.0
+    dict_large[500] = "foo"
+    assert repr(typeof(dict_large)) == "Dict[int, float]"
+    with pytest.raises(ValueError):
+        typeof(dict_large, full_check=True)
+
+    assert repr(typeof(set(range(1000)))) == "Set[int]"
+
+
 def test_typeof_array():
     A = typeof(np.ones((2, 2)))
     compare_array_types(A, Array[np.float64, "2d"])
 
 
+def test_typeof_array_mem_layout():
+    arr = np.ones((4, 6))
+    assert typeof(arr).mem_layout is MemLayout.C
+    assert typeof(arr.T).mem_layout is MemLayout.F
+    assert typeof(np.asfortranarray(arr)).mem_layout is MemLayout.F
+    assert typeof(arr[::2, ::2]).mem_layout is MemLayout.strided
+    assert typeof(arr[:, 1:]).mem_layout is MemLayout.strided
+    assert typeof(arr[1:]).mem_layout is MemLayout.C
+    assert typeof(np.ones(4)).mem_layout is MemLayout.C
+    assert typeof(np.ones(4)[::2]).mem_layout is MemLayout.strided
+
+    formatter = backends["pythran"].type_formatter
+    assert typeof(arr).format_as_backend_type(formatter) == "float64[:, :]"
+    assert (
+        typeof(arr.T).format_as_backend_type(formatter)
+        == "float64[:, :] order(F)"
+    )
+    assert typeof(arr[::2]).format_as_backend_type(formatter) == "float64[::, ::]"
+
+    formatter = backends["cython"].type_formatter
+    assert (
+        typeof(arr).format_as_backend_type(formatter)
+        == 'np.ndarray[np.float64_t, ndim=2, mode="c"]'
+    )
+
+
 def test_typeof_np_scalar():
     T = typeof(np.ones(1)[0])
     assert T is np.float64
@@ -164,3 +218,16 @@ def test_const():
         base_type_formatter
     ) == B.format_as_backend_type(base_type_formatter)
     assert repr(B) == 'const(Array[int, "1d"])'
+
+
+def test_compute_type_key():
+    assert compute_type_key(1) is int
+    assert compute_type_key([1, 2]) != compute_type_key([1.0, 2.0])
+    assert compute_type_key({"a": 1}) == compute_type_key({"b": 2})
+    assert compute_type_key((1, "a")) == (tuple, int, str)
+
+    a = np.ones((2, 3))
+    assert compute_type_key(a) == compute_type_key(np.zeros((4, 5)))
+    assert compute_type_key(a) != compute_type_key(a.T)
+    assert compute_type_key(a) != compute_type_key(a[:, ::2])
+    assert compute_type_key(a) != compute_type_key(a.astype(np.int32))
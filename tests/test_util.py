@@ -30,3 +30,27 @@ def test_timeit_verbose():
 
 def test_print_versions():
     print_versions()
+
+
+def test_format_str(tmp_path, monkeypatch):
+    monkeypatch.setattr(util, "_path_cache_formatted", tmp_path)
+    monkeypatch.setattr(util, "_has_to_format", True)
+    util.format_str.cache_clear()
+
+    code = "def f(a,b):\n  return a+b\n"
+    formatted = util.format_str(code)
+    _, format_code = util._get_formatter()
+    assert formatted == format_code(code)
+    paths = list(tmp_path.glob("*/*.py"))
+    assert len(paths) == 1
+    assert paths[0].read_text() == formatted
+
+    # the formatted code is read from the disk cache
+    util.format_str.cache_clear()
+    paths[0].write_text("cached")
+    assert util.format_str(code) == "cached"
+
+    monkeypatch.setattr(util, "_has_to_format", False)
+    util.format_str.cache_clear()
+    assert util.format_str(code) == code
+    util.format_str.cache_clear()